@@ -5,7 +5,8 @@ from flask_smorest import Api
 import os
 from dotenv import load_dotenv
 import logging
-from logging.handlers import RotatingFileHandler
+from .services.log_writer import BufferedRotatingFileHandler, RedactSecretsFilter, install_log_writer, get_log_writer
+from .services.log_archive import install_log_archiver
 
 load_dotenv()  # take environment variables from .env file
 
@@ -21,6 +22,8 @@ def create_app(config_class=Config):
         app,
         resources={r"/*": {"origins": origins}},
         supports_credentials=True,
+        # pagination cursor of GET /projects/
+        expose_headers=["X-Next-Cursor"],
     )
 
     # OpenAPI / Swagger settings
@@ -40,51 +43,59 @@ def create_app(config_class=Config):
         logs_dir = os.path.join(app.root_path, "logs")
         os.makedirs(logs_dir, exist_ok=True)
 
+        root = logging.getLogger()
+        root.setLevel(logging.INFO)
+        frontend_logger = logging.getLogger("frontend")
+        frontend_logger.setLevel(logging.INFO)
+        # allow frontend logger messages to propagate to root (console, backend file)
+        frontend_logger.propagate = True
+
+        # avoid a second writer (and duplicate handlers) when the app is created again
+        if get_log_writer() is not None:
+            return
+
+        # rotated-out backups are gzipped (frontend ones compacted into a
+        # columnar archive) in the background (see services/log_archive.py)
+        archiver = install_log_archiver(logs_dir)
+
         # common formatter
         formatter = logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s")
 
         # --- Backend file handler ---
         backend_log_path = os.path.join(logs_dir, "backend_logs.txt")
-        backend_handler = RotatingFileHandler(
-            backend_log_path, maxBytes=2_000_000, backupCount=5, encoding="utf-8"
+        backend_handler = BufferedRotatingFileHandler(
+            backend_log_path, maxBytes=2_000_000, backupCount=5, encoding="utf-8", archiver=archiver
         )
         backend_handler.setLevel(logging.INFO)
         backend_handler.setFormatter(formatter)
 
-        # --- Root (console) handler ---
-        console_handler_present = False
-        root = logging.getLogger()
-        # avoid duplicate stream handlers when reloading
-        for h in getattr(root, "handlers", []):
-            if isinstance(h, logging.StreamHandler):
-                console_handler_present = True
-                break
+        # --- Frontend file handler (incoming browser logs) ---
+        # only records of the "frontend" logger, written as-is: one JSON object per line
+        frontend_log_path = os.path.join(logs_dir, "frontend_logs.txt")
+        frontend_handler = BufferedRotatingFileHandler(
+            frontend_log_path, maxBytes=2_000_000, backupCount=5, encoding="utf-8", archiver=archiver
+        )
+        frontend_handler.setLevel(logging.INFO)
+        frontend_handler.setFormatter(logging.Formatter("%(message)s"))
+        frontend_handler.addFilter(logging.Filter("frontend"))
+
+        handlers = [backend_handler, frontend_handler]
 
-        if not console_handler_present:
+        # --- Console handler (unless the server already installed one) ---
+        if not any(isinstance(h, logging.StreamHandler) for h in root.handlers):
             stream_handler = logging.StreamHandler()
             stream_handler.setLevel(logging.INFO)
             stream_handler.setFormatter(formatter)
-            root.addHandler(stream_handler)
-
-        # set root level and add backend file handler if not already added
-        root.setLevel(logging.INFO)
-        if not any(getattr(h, "baseFilename", None) == backend_log_path for h in getattr(root, "handlers", [])):
-            root.addHandler(backend_handler)
+            handlers.append(stream_handler)
 
-        # --- Frontend file handler (incoming browser logs) ---
-        frontend_log_path = os.path.join(logs_dir, "frontend_logs.txt")
-        frontend_handler = RotatingFileHandler(
-            frontend_log_path, maxBytes=2_000_000, backupCount=5, encoding="utf-8"
-        )
-        frontend_handler.setLevel(logging.INFO)
-        frontend_handler.setFormatter(formatter)
+        # no credential passed in a URL ends up in a log file
+        redact = RedactSecretsFilter()
+        for handler in handlers:
+            handler.addFilter(redact)
 
-        frontend_logger = logging.getLogger("frontend")
-        frontend_logger.setLevel(logging.INFO)
-        if not any(getattr(h, "baseFilename", None) == frontend_log_path for h in getattr(frontend_logger, "handlers", [])):
-            frontend_logger.addHandler(frontend_handler)
-        # allow frontend logger messages to propagate to root (console)
-        frontend_logger.propagate = True
+        # request threads only enqueue; one background thread writes and
+        # commits the files in groups (see services/log_writer.py)
+        install_log_writer(handlers)
 
 
     api = Api(app)
@@ -98,11 +109,17 @@ def create_app(config_class=Config):
     from .api.logs import logs_blp
     from app.api.canvas import canvas_blp
     from .api.projects import projects_blp
+    from .api.tasks import tasks_blp
     api.register_blueprint(users_blp)
     api.register_blueprint(auth_blp)
     api.register_blueprint(default_blp)
     api.register_blueprint(logs_blp)
     api.register_blueprint(canvas_blp)
     api.register_blueprint(projects_blp)
+    api.register_blueprint(tasks_blp)
+
+    # optional periodic Canvas snapshot sync (CANVAS_SYNC_INTERVAL seconds)
+    from .services.canvas_sync import start_periodic_sync
+    start_periodic_sync()
 
     return app
\ No newline at end of file
@@ -13,7 +13,15 @@ from ..schemas.auth import (
 )
 
 from ..auth.supabase_client import supabase_client
+from ..auth.jwt_verifier import jwt_verifier, claims_to_user, LocalVerificationUnavailable, supabase_config
+from ..auth.token_cache import token_cache
+from ..services.singleflight import SingleFlight
+from cachetools import TTLCache
 from functools import wraps
+import hashlib
+import threading
+import time
+import jwt
 from ..schemas.users import UserSchema
 
 
@@ -166,6 +174,8 @@ def refresh_token(data):
     if not refresh_token_value:
         abort(401, message="Refresh token missing")
 
+    # the access token being replaced must not keep resolving from the cache
+    token_cache.invalidate(request.cookies.get("access_token"))
     try:
         resp = supabase.auth.refresh_session(refresh_token_value)
         session = resp.session
@@ -239,6 +249,7 @@ def password_reset_confirm(data):
 def signout():
     # Attempt to revoke session on Supabase (best-effort)
     token = request.cookies.get("access_token")
+    token_cache.invalidate(token)
     try:
         if token:
             try:
@@ -284,6 +295,21 @@ def signout():
 # -------------------------------------
 # Auth decorator
 # -------------------------------------
+def _resolve_user(token):
+    """
+    Validate an access token and return the user it belongs to: locally
+    when possible, otherwise (if allowed) through Supabase auth.get_user.
+    """
+    if supabase_config.SUPABASE_AUTH_LOCAL_VERIFY:
+        try:
+            return claims_to_user(jwt_verifier.verify(token))
+        except LocalVerificationUnavailable as e:
+            if not supabase_config.SUPABASE_AUTH_REMOTE_FALLBACK:
+                raise
+            current_app.logger.debug(f"{e}; falling back to Supabase")
+    return supabase_client.auth.get_user(token).user
+
+
 def require_auth(f):
     @wraps(f)
     def wrapped(*args, **kwargs):
@@ -295,16 +321,110 @@ def require_auth(f):
         if not token:
             abort(401, message="Authentication required")
         try:
-            user_resp = supabase_client.auth.get_user(token)
-            print("Authenticated user:", user_resp)
-            request.current_user = user_resp.user
+            user = token_cache.get_or_validate(token, _resolve_user)
+        except jwt.InvalidTokenError as e:
+            current_app.logger.info(f"Token validation error: {e}")
+            abort(401, message="Invalid or expired token")
         except Exception as e:
             current_app.logger.error(f"Token validation error: {e}")
             abort(401, message="Invalid or expired token")
+        if not user:
+            abort(401, message="Invalid or expired token")
+        request.current_user = user
         return f(*args, **kwargs)
     return wrapped
 
 
+# -------------------------------------
+# Sliding session refresh
+# -------------------------------------
+# concurrent requests near expiry share one refresh; the result is kept
+# briefly so requests still carrying the old cookies get the same session
+# instead of replaying a refresh token Supabase has already rotated
+_session_refresh = SingleFlight()
+_recent_refreshes = TTLCache(maxsize=1024, ttl=30)
+_recent_refreshes_lock = threading.Lock()
+
+
+def _refresh_session_once(refresh_token_value):
+    key = hashlib.sha256(refresh_token_value.encode("utf-8")).hexdigest()
+    with _recent_refreshes_lock:
+        session = _recent_refreshes.get(key)
+    if session is not None:
+        return session
+
+    def do_refresh():
+        session = supabase_client.auth.refresh_session(refresh_token_value).session
+        if session:
+            with _recent_refreshes_lock:
+                _recent_refreshes[key] = session
+        return session
+
+    return _session_refresh.do(key, do_refresh)
+
+
+@auth_blp.after_app_request
+def refresh_expiring_session(response):
+    """
+    When an authenticated request carries an access token that expires
+    within SUPABASE_SESSION_REFRESH_WINDOW seconds, refresh the session
+    with the refresh_token cookie and set the new cookies on this response,
+    so the client never has to take a 401 and call /auth/refresh itself.
+    """
+    window = supabase_config.SUPABASE_SESSION_REFRESH_WINDOW
+    access_token = request.cookies.get("access_token")
+    refresh_token_value = request.cookies.get("refresh_token")
+    if (
+        window <= 0
+        or not access_token
+        or not refresh_token_value
+        or getattr(request, "current_user", None) is None
+        or response.status_code == 401
+    ):
+        return response
+    # login/refresh/signout already set (or cleared) the cookies
+    if any(h.startswith("access_token=") for h in response.headers.getlist("Set-Cookie")):
+        return response
+
+    try:
+        exp = jwt.decode(access_token, options={"verify_signature": False}).get("exp")
+    except jwt.InvalidTokenError:
+        return response
+    if exp is None or exp - time.time() > window:
+        return response
+
+    try:
+        session = _refresh_session_once(refresh_token_value)
+    except Exception as e:
+        # the current token is still valid; the client can refresh later
+        current_app.logger.warning(f"Sliding session refresh failed: {e}")
+        return response
+    if not session:
+        return response
+
+    token_cache.invalidate(access_token)
+    secure_flag = not current_app.config.get("DEBUG", False)
+    response.set_cookie(
+        "access_token",
+        session.access_token,
+        httponly=True,
+        secure=secure_flag,
+        samesite="Lax",
+        max_age=3600,
+        path="/",
+    )
+    response.set_cookie(
+        "refresh_token",
+        session.refresh_token,
+        httponly=True,
+        secure=secure_flag,
+        samesite="Lax",
+        max_age=604800,
+        path="/",
+    )
+    return response
+
+
 # -------------------------------------
 # Verify OTP (email code)
 # -------------------------------------
@@ -425,6 +545,15 @@ def me():
 
 
 
+# -------------------------------------
+# Token cache stats
+# -------------------------------------
+@auth_blp.get("/stats")
+def auth_stats():
+    """Token-validation cache metrics (hit ratio, latency saved)."""
+    return {"token_cache": token_cache.stats()}
+
+
 # -------------------------------------
 # Get current user ID utility
 # -------------------------------------
@@ -1,4 +1,12 @@
+import os
+import hmac
+import json
+import hashlib
+from itertools import chain, islice
+from urllib.parse import quote
+from flask import g, request, current_app, Response, send_file, stream_with_context
 from flask_smorest import Blueprint, abort
+from flask_smorest.exceptions import NotModified
 from ..services.canvas_service import (
     get_user_information,
     get_user_courses,
@@ -9,16 +17,38 @@ from ..services.canvas_service import (
     get_course_quizzes,
     get_course_files,
     get_course_pages,
+    get_file,
+    open_file_content,
+    iter_course_assignments,
+    iter_course_files,
+    iter_course_pages,
+    get_full_course,
+    get_stats,
+    track_staleness,
+)
+from ..services.canvas_files import CANVAS_FILE_CHUNK_SIZE, get_file_cache
+from ..services.canvas_sync import (
+    CANVAS_READ_SOURCE,
+    get_sync_engine,
+    start_sync,
+    read_snapshot,
+    read_snapshot_item,
 )
 from ..schemas.canvas import (
     UserSchema,
     CourseSchema,
+    FullCourseSchema,
     ModuleSchema,
     ModuleItemSchema,
     AssignmentSchema,
     QuizSchema,
     FileSchema,
+    ListQuerySchema,
+    ModuleItemsQuerySchema,
+    SourceQuerySchema,
+    SyncRequestSchema,
 )
+from .errors import abort_upstream
 
 canvas_blp = Blueprint(
     "canvas",
@@ -27,6 +57,79 @@ canvas_blp = Blueprint(
     description="Canvas proxy endpoints"
 )
 
+
+def _conditional(data):
+    """
+    Tag `data` with a content-hash ETag and answer 304 Not Modified, before
+    anything is serialized, when the client already holds that version.
+    """
+    etag = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    g.canvas_etag = etag
+    if etag in request.if_none_match:
+        raise NotModified
+    return data
+
+
+def _from_snapshot(args) -> bool:
+    return args.get("source", CANVAS_READ_SOURCE) == "snapshot"
+
+
+def _snapshot_list(args, kind, course_id=None, parent_id=None):
+    """Snapshot rows when the request reads from the snapshot, else None (read live)."""
+    if not _from_snapshot(args):
+        return None
+    return read_snapshot(kind, course_id=course_id, parent_id=parent_id, limit=args.get("limit"))
+
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def _wants_ndjson() -> bool:
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def _ndjson_response(items, schema=None):
+    """
+    Stream `items` as newline-delimited JSON, serializing and flushing one
+    item at a time as pages arrive from Canvas. The first item is fetched
+    up front so an upstream failure still turns into a proper error status.
+    Live listings are read with cache_pages=False: a long stream must not
+    end up held in the response cache.
+    """
+    items = iter(items)
+    try:
+        head = list(islice(items, 1))
+    except Exception as e:
+        abort_upstream(e)
+
+    def generate():
+        try:
+            for item in chain(head, items):
+                yield json.dumps(schema.dump(item) if schema else item) + "\n"
+        except Exception as e:
+            # headers are already sent: end the stream and leave a trace
+            current_app.logger.error(f"Canvas NDJSON stream aborted: {e}")
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+@canvas_blp.before_request
+def _start_staleness_tracking():
+    g.canvas_staleness = track_staleness()
+
+
+@canvas_blp.after_request
+def _add_staleness_headers(response):
+    """Flag responses built from stale Canvas data (SWR or upstream failure)."""
+    record = getattr(g, "canvas_staleness", None)
+    if record and record["stale_age"] is not None:
+        response.headers["Age"] = str(int(record["stale_age"]))
+        response.headers["X-Canvas-Stale"] = "true"
+    etag = getattr(g, "canvas_etag", None)
+    if etag and response.status_code in (200, 304):
+        response.set_etag(etag)
+    return response
+
 # ---------------------------
 # User Information
 # ---------------------------
@@ -38,84 +141,132 @@ def user_information():
     Returns information about the current user.
     """
     try:
-        return get_user_information()
+        data = get_user_information()
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 # ---------------------------
 # Courses
 # ---------------------------
 @canvas_blp.route("/courses", methods=["GET"])
+@canvas_blp.arguments(ListQuerySchema, location="query")
 @canvas_blp.response(200, CourseSchema(many=True))
-def list_courses():
+def list_courses(args):
     """GET /canvas/courses
     
     Returns all courses for the current user.
     """
+    rows = _snapshot_list(args, "course")
+    if rows is not None:
+        return _conditional(rows)
     try:
         user = get_user_information()
-        return get_user_courses(user["id"])
+        data = get_user_courses(user["id"], limit=args.get("limit"))
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 @canvas_blp.route("/courses/<int:course_id>", methods=["GET"])
+@canvas_blp.arguments(SourceQuerySchema, location="query")
 @canvas_blp.response(200, CourseSchema)
-def get_single_course(course_id):
+def get_single_course(args, course_id):
     """GET /canvas/courses/<course_id>
     
     Returns a single course with syllabus information.
     """
+    if _from_snapshot(args):
+        course = read_snapshot_item("course", course_id)
+        if course is not None:
+            return _conditional(course)
+    try:
+        data = get_course(course_id, include_syllabus=True)
+    except Exception as e:
+        abort_upstream(e)
+    return _conditional(data)
+
+
+@canvas_blp.route("/courses/<int:course_id>/full", methods=["GET"])
+@canvas_blp.response(200, FullCourseSchema)
+def get_full_single_course(course_id):
+    """GET /canvas/courses/<course_id>/full
+    
+    Returns a course with its modules, assignments, quizzes and files,
+    fetched concurrently. Sections that fail upstream are null and listed
+    under `errors`.
+    """
     try:
-        return get_course(course_id, include_syllabus=True)
+        data = get_full_course(course_id)
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 # ---------------------------
 # Modules
 # ---------------------------
 @canvas_blp.route("/courses/<int:course_id>/modules", methods=["GET"])
+@canvas_blp.arguments(ListQuerySchema, location="query")
 @canvas_blp.response(200, ModuleSchema(many=True))
-def list_modules(course_id):
+def list_modules(args, course_id):
     """GET /canvas/courses/<course_id>/modules
     
     Returns all modules for a given course.
     """
+    rows = _snapshot_list(args, "module", course_id=course_id)
+    if rows is not None:
+        return _conditional(rows)
     try:
-        return get_course_modules(course_id)
+        data = get_course_modules(course_id, limit=args.get("limit"))
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 @canvas_blp.route("/modules/<int:module_id>/items", methods=["GET"])
+@canvas_blp.arguments(ModuleItemsQuerySchema, location="query")
 @canvas_blp.response(200, ModuleItemSchema(many=True))
-def list_module_items(module_id):
+def list_module_items(args, module_id):
     """GET /canvas/modules/<module_id>/items
     
     Returns all items within a module.
     """
+    rows = _snapshot_list(args, "module_item", course_id=args["course_id"], parent_id=module_id)
+    if rows is not None:
+        return _conditional(rows)
     try:
-        return get_module_items(module_id)
+        data = get_module_items(args["course_id"], module_id, limit=args.get("limit"))
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 # ---------------------------
 # Assignments
 # ---------------------------
 @canvas_blp.route("/courses/<int:course_id>/assignments", methods=["GET"])
+@canvas_blp.arguments(ListQuerySchema, location="query")
 @canvas_blp.response(200, AssignmentSchema(many=True))
-def list_assignments(course_id):
+def list_assignments(args, course_id):
     """GET /canvas/courses/<course_id>/assignments
     
     Returns all assignments for a course.
+    Send `Accept: application/x-ndjson` to stream them one per line.
     """
+    rows = _snapshot_list(args, "assignment", course_id=course_id)
+    if _wants_ndjson():
+        if rows is None:
+            rows = iter_course_assignments(course_id, limit=args.get("limit"), cache_pages=False)
+        return _ndjson_response(rows, AssignmentSchema())
+    if rows is not None:
+        return _conditional(rows)
     try:
-        return get_course_assignments(course_id)
+        data = get_course_assignments(course_id, limit=args.get("limit"))
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 @canvas_blp.route("/courses/<int:course_id>/assignments/<int:assignment_id>", methods=["GET"])
@@ -126,25 +277,31 @@ def get_assignment(course_id, assignment_id):
     Returns a single assignment.
     """
     try:
-        return get_course_assignments(course_id, assignment_id)
+        data = get_course_assignments(course_id, assignment_id)
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 # ---------------------------
 # Quizzes
 # ---------------------------
 @canvas_blp.route("/courses/<int:course_id>/quizzes", methods=["GET"])
+@canvas_blp.arguments(ListQuerySchema, location="query")
 @canvas_blp.response(200, QuizSchema(many=True))
-def list_quizzes(course_id):
+def list_quizzes(args, course_id):
     """GET /canvas/courses/<course_id>/quizzes
     
     Returns all quizzes for a course.
     """
+    rows = _snapshot_list(args, "quiz", course_id=course_id)
+    if rows is not None:
+        return _conditional(rows)
     try:
-        return get_course_quizzes(course_id)
+        data = get_course_quizzes(course_id, limit=args.get("limit"))
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 @canvas_blp.route("/courses/<int:course_id>/quizzes/<int:quiz_id>", methods=["GET"])
@@ -155,37 +312,164 @@ def get_quiz(course_id, quiz_id):
     Returns a single quiz.
     """
     try:
-        return get_course_quizzes(course_id, quiz_id)
+        data = get_course_quizzes(course_id, quiz_id)
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
 
 
 # ---------------------------
 # Files (Lecture notes, PDFs)
 # ---------------------------
 @canvas_blp.route("/courses/<int:course_id>/files", methods=["GET"])
+@canvas_blp.arguments(ListQuerySchema, location="query")
 @canvas_blp.response(200, FileSchema(many=True))
-def list_files(course_id):
+def list_files(args, course_id):
     """GET /canvas/courses/<course_id>/files
     
     Returns all files in a course.
+    Send `Accept: application/x-ndjson` to stream them one per line.
     """
+    rows = _snapshot_list(args, "file", course_id=course_id)
+    if _wants_ndjson():
+        if rows is None:
+            rows = iter_course_files(course_id, limit=args.get("limit"), cache_pages=False)
+        return _ndjson_response(rows, FileSchema())
+    if rows is not None:
+        return _conditional(rows)
     try:
-        return get_course_files(course_id)
+        data = get_course_files(course_id, limit=args.get("limit"))
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
+
+
+@canvas_blp.route("/files/<int:file_id>/content", methods=["GET"])
+def file_content(file_id):
+    """GET /canvas/files/<file_id>/content
+    
+    Streams the bytes of a Canvas file. Files are kept in a content-addressed
+    disk cache, so each version is fetched from Canvas once: concurrent
+    requests for an uncached version wait for a single download. Cached
+    copies are served with sendfile and support Range requests (PDF seeking).
+    Files larger than the whole cache are streamed straight through.
+    """
+    try:
+        meta = get_file(file_id)
+    except Exception as e:
+        abort_upstream(e)
+
+    version = f'{meta.get("updated_at")}:{meta.get("size")}'
+    mimetype = meta.get("content-type") or "application/octet-stream"
+    name = meta.get("display_name") or meta.get("filename") or str(file_id)
+    cache = get_file_cache()
+
+    if (meta.get("size") or 0) <= cache.max_bytes:
+        try:
+            path, ref = cache.fetch(
+                file_id,
+                version,
+                lambda: open_file_content(meta["url"], CANVAS_FILE_CHUNK_SIZE)[0],
+                {"content_type": mimetype},
+            )
+        except Exception as e:
+            abort_upstream(e)
+        out = send_file(
+            path,
+            mimetype=mimetype,
+            download_name=name,
+            conditional=True,
+            etag=ref["sha256"],
+        )
+        # advertised on full responses too, so viewers know they can seek
+        out.headers["Accept-Ranges"] = "bytes"
+        return out
+
+    try:
+        chunks, headers = open_file_content(meta["url"], CANVAS_FILE_CHUNK_SIZE)
+    except Exception as e:
+        abort_upstream(e)
+    out = Response(stream_with_context(chunks), mimetype=mimetype)
+    if headers.get("Content-Length"):
+        out.headers["Content-Length"] = headers["Content-Length"]
+    out.headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(name)}"
+    return out
 
 
 # ---------------------------
 # Pages (Canvas wiki / lecture notes)
 # ---------------------------
 @canvas_blp.route("/courses/<int:course_id>/pages", methods=["GET"])
-def list_pages(course_id):
+@canvas_blp.arguments(ListQuerySchema, location="query")
+def list_pages(args, course_id):
     """GET /canvas/courses/<course_id>/pages
     
     Returns all pages (wiki, notes) in a course.
+    Send `Accept: application/x-ndjson` to stream them one per line.
     """
+    rows = _snapshot_list(args, "page", course_id=course_id)
+    if _wants_ndjson():
+        if rows is None:
+            rows = iter_course_pages(course_id, limit=args.get("limit"), cache_pages=False)
+        return _ndjson_response(rows)
+    if rows is not None:
+        return _conditional(rows)
     try:
-        return get_course_pages(course_id)
+        data = get_course_pages(course_id, limit=args.get("limit"))
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+    return _conditional(data)
+
+
+# ---------------------------
+# Snapshot sync
+# ---------------------------
+def _require_sync_token():
+    """
+    A sync spends the shared Canvas token's rate budget: only callers
+    holding CANVAS_SYNC_TOKEN (Bearer) may start one. Without a configured
+    token, syncs only run on the CANVAS_SYNC_INTERVAL schedule.
+    """
+    expected = current_app.config.get("CANVAS_SYNC_TOKEN", os.getenv("CANVAS_SYNC_TOKEN"))
+    if not expected:
+        abort(404, message="Manual Canvas sync is disabled")
+    auth = request.headers.get("Authorization", "")
+    given = auth[len("Bearer "):] if auth.startswith("Bearer ") else ""
+    if not hmac.compare_digest(given.encode("utf-8"), expected.encode("utf-8")):
+        abort(401, message="Invalid sync token")
+
+
+@canvas_blp.route("/sync", methods=["POST"])
+@canvas_blp.arguments(SyncRequestSchema, location="query")
+def trigger_sync(args):
+    """POST /canvas/sync
+    
+    Starts a background sync of Canvas data into the local snapshot.
+    Requires `Authorization: Bearer <CANVAS_SYNC_TOKEN>`.
+    """
+    _require_sync_token()
+    started = start_sync(force_full=args["full"])
+    return {"started": started, **get_sync_engine().status()}, 202 if started else 200
+
+
+@canvas_blp.route("/sync", methods=["GET"])
+def sync_status():
+    """GET /canvas/sync
+    
+    Returns the state of the snapshot sync (running, last report, last error).
+    """
+    return get_sync_engine().status()
+
+
+# ---------------------------
+# Monitoring
+# ---------------------------
+@canvas_blp.route("/stats", methods=["GET"])
+def stats():
+    """GET /canvas/stats
+    
+    Returns counters of the Canvas proxy (response cache hits, misses,
+    evictions, coalesced in-flight requests, rate limit budgets and the
+    file content cache).
+    """
+    return {**get_stats(), "file_cache": get_file_cache().stats()}
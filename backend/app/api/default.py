@@ -1,6 +1,7 @@
 # backend/app/api/default.py
 from datetime import datetime
 from flask_smorest import Blueprint, abort
+from ..services.resilience import breaker_states
 
 
 default_blp = Blueprint("default", __name__, url_prefix="/", description="Default operations")
@@ -11,4 +12,16 @@ def index():
         "message": "Welcome to the VoiceEd Ally API!",
         "status": "running",
         "timestamp": datetime.utcnow().isoformat() + "Z"
-    }
\ No newline at end of file
+    }
+
+
+@default_blp.route("/health", methods=["GET"])
+def health():
+    """Report the circuit breaker state of every upstream (Canvas, Supabase)."""
+    upstreams = breaker_states()
+    degraded = any(b["state"] != "closed" for b in upstreams.values())
+    return {
+        "status": "degraded" if degraded else "ok",
+        "upstreams": upstreams,
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
@@ -0,0 +1,11 @@
+# backend/app/api/errors.py
+from flask_smorest import abort
+
+from ..services.resilience import CircuitOpenError
+
+
+def abort_upstream(e: Exception):
+    """Fail fast with 503 while an upstream's circuit is open, 502 otherwise."""
+    if isinstance(e, CircuitOpenError):
+        abort(503, message=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+    abort(502, message=str(e))
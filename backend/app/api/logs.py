@@ -1,10 +1,16 @@
 # backend/app/api/logs.py
+import os
+import hmac
 import json
 import logging
-import os
 from datetime import datetime
-from flask import request, current_app
+from flask import request, current_app, Response
 from flask_smorest import Blueprint, abort
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from ..services.log_writer import get_log_writer
+from ..services.log_query import get_log_query_engine, make_matcher
+from ..services.log_archive import get_log_archiver
+from ..schemas.logs import LogSearchQuerySchema, LogTailQuerySchema, LogArchiveQuerySchema
 
 logs_blp = Blueprint("logs", __name__, url_prefix="/logs", description="Log operations")
 
@@ -23,7 +29,115 @@ def _get_client_ip():
 
 @logs_blp.route("/health", methods=["GET"])
 def health():
-    return {"status": "ok", "ts": datetime.utcnow().isoformat() + "Z"}, 200
+    writer = get_log_writer()
+    stats = writer.stats() if writer else None
+    status = "ok" if stats and stats["running"] else "degraded"
+    archiver = get_log_archiver()
+    return {
+        "status": status,
+        "writer": stats,
+        "archive": archiver.stats() if archiver else None,
+        "ts": datetime.utcnow().isoformat() + "Z",
+    }, 200
+
+
+LOG_LEVELS = {"debug", "info", "warn", "error"}
+NDJSON_MIMETYPES = {"application/x-ndjson", "application/jsonl", "text/plain"}
+
+
+def _read_body(limit):
+    """
+    Return the raw request body, or abort with 413 as soon as it is known to
+    exceed `limit` bytes: from Content-Length when the client sent one, else
+    after reading at most limit + 1 bytes. Nothing is parsed before this.
+    """
+    if request.content_length is not None and request.content_length > limit:
+        abort(413, message=f"Log payload too large (max {limit} bytes)")
+    chunks, size = [], 0
+    while size <= limit:
+        chunk = request.stream.read(min(64 * 1024, limit + 1 - size))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    if size > limit:
+        abort(413, message=f"Log payload too large (max {limit} bytes)")
+    return b"".join(chunks)
+
+
+def _depth_exceeds(value, limit):
+    """True when `value` nests dicts/lists deeper than `limit` levels."""
+    stack = [(value, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if isinstance(node, dict):
+            children = node.values()
+        elif isinstance(node, list):
+            children = node
+        else:
+            continue
+        if depth > limit:
+            return True
+        stack.extend((child, depth + 1) for child in children)
+    return False
+
+
+def _build_record(data):
+    """
+    Validate one frontend log entry and build the structured record that is
+    written (JSON line). Returns (record, None) or (None, error message).
+    """
+    if not isinstance(data, dict):
+        return None, "record must be a JSON object"
+    level = data.get("level") or "info"
+    level = level.lower() if isinstance(level, str) else None
+    message = data.get("message")
+    meta = data.get("meta") or {}
+
+    if not isinstance(message, str) or not message.strip():
+        return None, "`message` must be a non-empty string"
+
+    max_message = int(current_app.config.get("FRONTEND_LOG_MAX_MESSAGE_CHARS", 4_000))
+    if len(message) > max_message:
+        return None, f"`message` is too long (max {max_message} characters)"
+
+    if level not in LOG_LEVELS:
+        return None, "`level` must be one of: debug, info, warn, error"
+
+    max_depth = int(current_app.config.get("FRONTEND_LOG_MAX_META_DEPTH", 5))
+    if _depth_exceeds(meta, max_depth):
+        return None, f"`meta` is nested too deeply (max depth {max_depth})"
+
+    return {
+        "ts_server": datetime.utcnow().isoformat() + "Z",
+        "ts_client": data.get("timestamp"),
+        "env": data.get("env"),
+        "level": level,
+        "message": message.strip(),
+        "meta": meta,
+        "path": request.path,
+        "ip": _get_client_ip(),
+        "user_agent": request.headers.get("User-Agent"),
+        "referer": request.headers.get("Referer"),
+        "origin": request.headers.get("Origin"),
+    }, None
+
+
+def _write_records(records):
+    # Handed to the background log writer (services/log_writer.py): the
+    # frontend file receives each record as one JSON line, and the request
+    # thread never touches the disk.
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False)
+        level = record["level"]
+        if level == "error":
+            frontend_logger.error(line)
+        elif level == "warn":
+            frontend_logger.warning(line)
+        elif level == "debug":
+            frontend_logger.debug(line)
+        else:
+            frontend_logger.info(line)
 
 
 @logs_blp.route("", methods=["POST"])
@@ -44,66 +158,256 @@ def ingest_log():
     if not request.is_json:
         abort(415, message="Content-Type must be application/json")
 
-    data = request.get_json(silent=True) or {}
-    level = (data.get("level") or "info").lower()
-    message = data.get("message")
-    meta = data.get("meta") or {}
-    client_ts = data.get("timestamp")
-    env = data.get("env")
+    # Safety: avoid huge payloads (someone could spam you) -- rejected
+    # before a single byte is parsed
+    max_size = int(current_app.config.get("FRONTEND_LOG_MAX_BYTES", 10_000))
+    body = _read_body(max_size)
+    try:
+        data = json.loads(body) or {}
+    except (ValueError, RecursionError):
+        data = {}
 
-    if not isinstance(message, str) or not message.strip():
-        abort(400, message="`message` must be a non-empty string")
+    record, error = _build_record(data)
+    if error:
+        abort(400, message=error)
 
-    if level not in {"debug", "info", "warn", "error"}:
-        abort(400, message="`level` must be one of: debug, info, warn, error")
+    _write_records([record])
+    return {"status": "ok"}, 200
 
-    # Safety: avoid huge payloads (someone could spam you)
-    try:
-        raw_size = len(json.dumps(data))
-    except Exception:
-        raw_size = 0
 
-    max_size = int(current_app.config.get("FRONTEND_LOG_MAX_BYTES", 10_000))
-    if raw_size and raw_size > max_size:
-        abort(413, message=f"Log payload too large (max {max_size} bytes)")
+def _split_json_array(text):
+    """
+    Yield (item, size in bytes, error) for each element of a JSON array,
+    decoding one element at a time so every record's own size is known.
+    A syntax error ends the array (the rest cannot be delimited reliably).
+    """
+    decoder = json.JSONDecoder()
+    ws = " \t\r\n"
+    pos = len(text) - len(text.lstrip(ws))
+    if not text.startswith("[", pos):
+        raise ValueError("body must be a JSON array")
+    pos += 1
+    while True:
+        while pos < len(text) and text[pos] in ws:
+            pos += 1
+        if text.startswith("]", pos):
+            return
+        try:
+            item, end = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError as e:
+            yield None, 0, f"invalid JSON: {e.msg}; remaining records skipped"
+            return
+        except RecursionError:
+            yield None, 0, "record is nested too deeply; remaining records skipped"
+            return
+        yield item, len(text[pos:end].encode("utf-8")), None
+        pos = end
+        while pos < len(text) and text[pos] in ws:
+            pos += 1
+        if text.startswith(",", pos):
+            pos += 1
+        elif not text.startswith("]", pos):
+            yield None, 0, "expected ',' or ']'; remaining records skipped"
+            return
+
+
+def _split_ndjson(body, max_record):
+    """Yield (item, size in bytes, error) for each non-empty line."""
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        if len(line) > max_record:
+            # too large to be accepted anyway: do not parse it
+            yield None, len(line), None
+            continue
+        try:
+            yield json.loads(line), len(line), None
+        except ValueError as e:
+            yield None, len(line), f"invalid JSON: {e}"
+        except RecursionError:
+            yield None, len(line), "record is nested too deeply"
 
-    # Build a structured record (JSON line)
-    record = {
-        "ts_server": datetime.utcnow().isoformat() + "Z",
-        "ts_client": client_ts,
-        "env": env,
-        "level": level,
-        "message": message.strip(),
-        "meta": meta,
-        "path": request.path,
-        "ip": _get_client_ip(),
-        "user_agent": request.headers.get("User-Agent"),
-        "referer": request.headers.get("Referer"),
-        "origin": request.headers.get("Origin"),
-    }
 
-    # Write through Python logging (recommended).
-    # Your logging config should route this to logs.txt.
-    line = json.dumps(record, ensure_ascii=False)
+@logs_blp.route("/batch", methods=["POST"])
+def ingest_log_batch():
+    """
+    Accept many frontend log records in one request: a JSON array
+    (application/json) or one JSON object per line (application/x-ndjson,
+    or text/plain as sent by navigator.sendBeacon with a string body).
+
+    Each record is validated on its own; valid ones are written and the
+    rest are reported back by position:
+    {"accepted": 12, "rejected": [{"index": 3, "error": "..."}]}
+    """
+    max_record = int(current_app.config.get("FRONTEND_LOG_MAX_BYTES", 10_000))
+    max_batch = int(current_app.config.get("FRONTEND_LOG_BATCH_MAX_BYTES", 256_000))
+    max_records = int(current_app.config.get("FRONTEND_LOG_BATCH_MAX_RECORDS", 500))
 
-    if level == "error":
-        frontend_logger.error(line)
-    elif level == "warn":
-        frontend_logger.warning(line)
-    elif level == "debug":
-        frontend_logger.debug(line)
+    body = _read_body(max_batch)
+
+    if request.mimetype == "application/json":
+        try:
+            items = list(_split_json_array(body.decode("utf-8")))
+        except (UnicodeDecodeError, ValueError) as e:
+            abort(400, message=str(e))
+    elif request.mimetype in NDJSON_MIMETYPES:
+        items = list(_split_ndjson(body, max_record))
     else:
-        frontend_logger.info(line)
+        abort(415, message="Content-Type must be application/json or application/x-ndjson")
+
+    if len(items) > max_records:
+        abort(413, message=f"Too many log records (max {max_records} per batch)")
+
+    records, rejected = [], []
+    for index, (item, size, error) in enumerate(items):
+        if error is None and size > max_record:
+            error = f"record too large (max {max_record} bytes)"
+        if error is None:
+            record, error = _build_record(item)
+        if error:
+            rejected.append({"index": index, "error": error})
+        else:
+            records.append(record)
+
+    if records:
+        _write_records(records)
+    return {"accepted": len(records), "rejected": rejected}, 200
+
+
+def _query_token():
+    expected = current_app.config.get("LOGS_QUERY_TOKEN", os.getenv("LOGS_QUERY_TOKEN"))
+    if not expected:
+        abort(404, message="Log queries are disabled")
+    return expected
+
+
+def _require_query_token():
+    """
+    Reading logs exposes client IPs and messages: the endpoints below need
+    `Authorization: Bearer <LOGS_QUERY_TOKEN>`. Without a configured token
+    they are disabled.
+    """
+    expected = _query_token()
+    auth = request.headers.get("Authorization", "")
+    given = auth[len("Bearer "):] if auth.startswith("Bearer ") else ""
+    if not hmac.compare_digest(given.encode("utf-8"), expected.encode("utf-8")):
+        abort(401, message="Invalid log query token")
+
+
+def _ticket_ttl():
+    return int(current_app.config.get("LOGS_TAIL_TICKET_TTL", os.getenv("LOGS_TAIL_TICKET_TTL", 30)))
+
+
+def _ticket_serializer():
+    # signed with the query token: rotating it revokes outstanding tickets
+    return URLSafeTimedSerializer(_query_token(), salt="logs-tail-ticket")
+
 
-    # Also append to a JSONL file under the app logs directory as a durable copy
+@logs_blp.route("/tail/ticket", methods=["POST"])
+def tail_ticket():
+    """
+    Exchange LOGS_QUERY_TOKEN for a short-lived ticket to open /logs/tail
+    with. EventSource cannot send headers, so the tail is authorized by
+    `?ticket=`; a ticket in a logged URL is useless after
+    LOGS_TAIL_TICKET_TTL seconds, unlike the token itself.
+    """
+    _require_query_token()
+    return {"ticket": _ticket_serializer().dumps({"scope": "tail"}), "expires_in": _ticket_ttl()}, 201
+
+
+def _require_tail_ticket(ticket):
     try:
-        logs_dir = os.path.join(current_app.root_path, "logs")
-        os.makedirs(logs_dir, exist_ok=True)
-        frontend_file = os.path.join(logs_dir, "frontend_logs.txt")
-        with open(frontend_file, "a", encoding="utf-8") as fh:
-            fh.write(line + "\n")
-    except Exception:
-        # swallow file IO errors to avoid breaking ingestion
-        pass
+        payload = _ticket_serializer().loads(ticket or "", max_age=_ticket_ttl())
+    except BadSignature:  # includes SignatureExpired
+        abort(401, message="Invalid or expired tail ticket")
+    if payload.get("scope") != "tail":
+        abort(401, message="Invalid or expired tail ticket")
 
-    return {"status": "ok"}, 200
+
+def _logs_dir():
+    return os.path.join(current_app.root_path, "logs")
+
+
+@logs_blp.route("/search", methods=["GET"])
+@logs_blp.arguments(LogSearchQuerySchema, location="query")
+def search_logs(args):
+    """
+    Search backend and frontend logs, rotated files included, by time range,
+    level, client IP and message substring. Results are oldest first;
+    `truncated` tells that more than `limit` records matched.
+
+    Each file has a sparse time -> offset index (logs/.index/) that is
+    extended as the file grows, so a time-bounded query seeks straight to
+    the window instead of reading every file from the start.
+    """
+    _require_query_token()
+    since, until = args.get("since"), args.get("until")
+    result = get_log_query_engine(_logs_dir()).search(
+        source=args["source"],
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        level=args.get("level"),
+        ip=args.get("ip"),
+        q=args.get("q"),
+        limit=args["limit"],
+    )
+    for record in result["records"]:
+        record["ts"] = datetime.utcfromtimestamp(record["ts"]).isoformat() + "Z"
+    return result, 200
+
+
+@logs_blp.route("/tail", methods=["GET"])
+@logs_blp.arguments(LogTailQuerySchema, location="query")
+def tail_logs(args):
+    """
+    Live tail of the backend or frontend log as Server-Sent Events: one
+    `data:` event (JSON) per new matching record, plus a comment line every
+    LOG_TAIL_HEARTBEAT seconds so proxies keep the connection open.
+    Authorized by a `ticket` from POST /logs/tail/ticket, or the Bearer token.
+    """
+    if args.get("ticket"):
+        _require_tail_ticket(args["ticket"])
+    else:
+        _require_query_token()
+    engine = get_log_query_engine(_logs_dir())
+    matcher = make_matcher(level=args.get("level"), ip=args.get("ip"), q=args.get("q"))
+
+    def stream():
+        yield ": tailing\n\n"
+        for record in engine.tail(args["source"], matcher):
+            if record is None:
+                yield ": heartbeat\n\n"
+                continue
+            record["ts"] = datetime.utcfromtimestamp(record["ts"]).isoformat() + "Z"
+            yield f"data: {json.dumps(record, ensure_ascii=False)}\n\n"
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@logs_blp.route("/archive", methods=["GET"])
+@logs_blp.arguments(LogArchiveQuerySchema, location="query")
+def query_log_archive(args):
+    """
+    Query frontend logs older than the rotated files, from the compacted
+    columnar archive: records (optionally only some `columns`) or, with
+    `group_by`, counts per distinct value, e.g. errors per ip last week.
+    """
+    _require_query_token()
+    archiver = get_log_archiver()
+    if archiver is None:
+        abort(503, message="Log archive is not running")
+    since, until = args.get("since"), args.get("until")
+    return archiver.query(
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        level=args.get("level"),
+        ip=args.get("ip"),
+        q=args.get("q"),
+        group_by=args.get("group_by"),
+        columns=[c.strip() for c in args["columns"].split(",") if c.strip()] if args.get("columns") else None,
+        limit=args["limit"],
+    ), 200
@@ -1,22 +1,65 @@
 # backend/app/api/projects.py
 from flask_smorest import Blueprint, abort
-from ..schemas.projects import ProjectCreateSchema, ProjectUpdateSchema, ProjectOutSchema
+import uuid
+from marshmallow import ValidationError
+from ..schemas.projects import (
+    ProjectCreateSchema, ProjectUpdateSchema, ProjectOutSchema, ProjectListQuerySchema,
+    ProjectBatchSchema, ProjectBatchResponseSchema, ProjectDashboardQuerySchema, ProjectDashboardSchema,
+)
 from ..services.projects_service import (
-    list_projects, create_project, update_project, delete_project
+    list_projects, create_project, update_project, delete_project, batch_projects, project_dashboard,
+    projects_version, InvalidCursor,
 )
 from .auth import require_auth, get_current_user_id  # <-- import from your auth api module
+from .errors import abort_upstream
 
 projects_blp = Blueprint("projects", __name__, url_prefix="/projects", description="Project CRUD")
 
+
 @projects_blp.route("/", methods=["GET"])
 @require_auth
-@projects_blp.response(200, ProjectOutSchema(many=True))
-def get_projects():
+@projects_blp.etag
+@projects_blp.arguments(ProjectListQuerySchema, location="query")
+@projects_blp.response(200, ProjectOutSchema(many=True), headers={"X-Next-Cursor": {"description": "Cursor of the next page; absent on the last page", "schema": {"type": "string"}}})
+def get_projects(args):
+    """GET /projects/?limit=&cursor=&sort=&status=&priority=&subject=&due_after=&due_before=
+
+    One page of projects; pass the X-Next-Cursor response header back as
+    `cursor` to fetch the next page. The ETag is derived from the user's
+    latest updated_at and project count, so an unchanged list is answered
+    with 304 before the page is read or serialized.
+    """
+    user_id = get_current_user_id()
+    try:
+        version = projects_version(user_id)
+    except Exception as e:
+        abort_upstream(e)
+    # raises 304 Not Modified when If-None-Match matches
+    projects_blp.set_etag({"user": user_id, "version": version, "query": args})
+    try:
+        projects, next_cursor = list_projects(user_id, **args)
+    except InvalidCursor as e:
+        abort(400, message=str(e))
+    except Exception as e:
+        abort_upstream(e)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return projects, 200, headers
+
+@projects_blp.route("/dashboard", methods=["GET"])
+@require_auth
+@projects_blp.arguments(ProjectDashboardQuerySchema, location="query")
+@projects_blp.response(200, ProjectDashboardSchema(many=True))
+def get_dashboard(args):
+    """GET /projects/dashboard?status=&due_soon_days=
+
+    Projects with task counts, completion ratio and overdue/due-soon
+    flags, from one database query.
+    """
     user_id = get_current_user_id()
     try:
-        return list_projects(user_id)
+        return project_dashboard(user_id, status=args.get("status"), due_soon_days=args["due_soon_days"])
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
 
 @projects_blp.route("/", methods=["POST"])
 @require_auth
@@ -27,7 +70,39 @@ def post_project(payload):
     try:
         return create_project(user_id, payload)
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
+
+@projects_blp.route("/batch", methods=["POST"])
+@require_auth
+@projects_blp.arguments(ProjectBatchSchema)
+@projects_blp.response(200, ProjectBatchResponseSchema)
+def batch_project_operations(payload):
+    """POST /projects/batch
+
+    Apply a list of {"op": "create"|"update"|"delete", "id", "data"}
+    operations. Each operation gets its own result (status, error, project);
+    a failing item does not fail the others.
+    """
+    user_id = get_current_user_id()
+    schemas = {"create": ProjectCreateSchema(), "update": ProjectUpdateSchema()}
+    operations, rejected = [], []
+    for index, item in enumerate(payload["operations"]):
+        op = {"index": index, "op": item["op"], "id": item.get("id"), "data": {}}
+        try:
+            if op["id"] is not None:
+                uuid.UUID(op["id"])
+            if op["op"] in schemas:
+                op["data"] = schemas[op["op"]].load(item["data"])
+        except ValidationError as e:
+            rejected.append({**op, "status": 400, "error": e.messages, "project": None})
+            continue
+        except ValueError:
+            rejected.append({**op, "status": 400, "error": "Invalid project id", "project": None})
+            continue
+        operations.append(op)
+
+    results = batch_projects(user_id, operations) if operations else []
+    return {"results": sorted(results + rejected, key=lambda r: r["index"])}
 
 @projects_blp.route("/<string:project_id>", methods=["PATCH"])
 @require_auth
@@ -38,7 +113,7 @@ def patch_project(payload, project_id):
     try:
         return update_project(user_id, project_id, payload)
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
 
 @projects_blp.route("/<string:project_id>", methods=["DELETE"])
 @require_auth
@@ -49,4 +124,4 @@ def remove_project(project_id):
         delete_project(user_id, project_id)
         return ""
     except Exception as e:
-        abort(502, message=str(e))
+        abort_upstream(e)
@@ -0,0 +1,108 @@
+# backend/app/api/tasks.py
+from flask_smorest import Blueprint, abort
+from ..schemas.tasks import (
+    TaskCreateSchema, TaskUpdateSchema, TaskOutSchema, TaskBulkUpdateSchema, TaskMoveSchema, TaskListQuerySchema
+)
+from ..services.tasks_service import (
+    list_tasks, create_task, update_task, delete_task, bulk_update_tasks, move_task, NotFound
+)
+from .auth import require_auth, get_current_user_id
+from .errors import abort_upstream
+
+tasks_blp = Blueprint("tasks", __name__, url_prefix="/projects", description="Project tasks")
+
+
+@tasks_blp.route("/<string:project_id>/tasks", methods=["GET"])
+@require_auth
+@tasks_blp.arguments(TaskListQuerySchema, location="query")
+@tasks_blp.response(200, TaskOutSchema(many=True))
+def get_tasks(args, project_id):
+    """Tasks of a project, in board order."""
+    user_id = get_current_user_id()
+    try:
+        return list_tasks(user_id, project_id, completed=args.get("completed"))
+    except Exception as e:
+        abort_upstream(e)
+
+@tasks_blp.route("/<string:project_id>/tasks", methods=["POST"])
+@require_auth
+@tasks_blp.arguments(TaskCreateSchema)
+@tasks_blp.response(201, TaskOutSchema)
+def post_task(payload, project_id):
+    user_id = get_current_user_id()
+    try:
+        return create_task(user_id, project_id, payload)
+    except NotFound as e:
+        abort(404, message=str(e))
+    except Exception as e:
+        abort_upstream(e)
+
+@tasks_blp.route("/<string:project_id>/tasks/batch", methods=["PATCH"])
+@require_auth
+@tasks_blp.arguments(TaskBulkUpdateSchema)
+@tasks_blp.response(200, TaskOutSchema(many=True))
+def patch_tasks(payload, project_id):
+    """PATCH /projects/<project_id>/tasks/batch
+
+    Update many tasks at once (bulk complete, client-computed reorder):
+    one `update_project_tasks` RPC call. All-or-nothing: an unknown id is a 404.
+    """
+    user_id = get_current_user_id()
+    updates = [{**item, "id": str(item["id"])} for item in payload["tasks"]]
+    try:
+        return bulk_update_tasks(user_id, project_id, updates)
+    except NotFound as e:
+        abort(404, message=str(e))
+    except Exception as e:
+        abort_upstream(e)
+
+@tasks_blp.route("/<string:project_id>/tasks/<string:task_id>", methods=["PATCH"])
+@require_auth
+@tasks_blp.arguments(TaskUpdateSchema)
+@tasks_blp.response(200, TaskOutSchema)
+def patch_task(payload, project_id, task_id):
+    user_id = get_current_user_id()
+    try:
+        return update_task(user_id, project_id, task_id, payload)
+    except NotFound as e:
+        abort(404, message=str(e))
+    except Exception as e:
+        abort_upstream(e)
+
+@tasks_blp.route("/<string:project_id>/tasks/<string:task_id>/move", methods=["POST"])
+@require_auth
+@tasks_blp.arguments(TaskMoveSchema)
+@tasks_blp.response(200, TaskOutSchema(many=True))
+def post_task_move(payload, project_id, task_id):
+    """POST /projects/<project_id>/tasks/<task_id>/move
+
+    Drag-and-drop a task. Usually rewrites only the moved task's position;
+    returns every row that changed.
+    """
+    user_id = get_current_user_id()
+    after_id, before_id = payload["after_id"], payload["before_id"]
+    try:
+        return move_task(
+            user_id,
+            project_id,
+            task_id,
+            after_id=str(after_id) if after_id else None,
+            before_id=str(before_id) if before_id else None,
+        )
+    except NotFound as e:
+        abort(404, message=str(e))
+    except Exception as e:
+        abort_upstream(e)
+
+@tasks_blp.route("/<string:project_id>/tasks/<string:task_id>", methods=["DELETE"])
+@require_auth
+@tasks_blp.response(204)
+def remove_task(project_id, task_id):
+    user_id = get_current_user_id()
+    try:
+        delete_task(user_id, project_id, task_id)
+        return ""
+    except NotFound as e:
+        abort(404, message=str(e))
+    except Exception as e:
+        abort_upstream(e)
@@ -1,5 +1,11 @@
 from .supabase_client import supabase_client
+from .jwt_verifier import jwt_verifier, claims_to_user, LocalVerificationUnavailable
+from .token_cache import token_cache
 
 __all__ = [
     "supabase_client",
+    "jwt_verifier",
+    "claims_to_user",
+    "LocalVerificationUnavailable",
+    "token_cache",
 ]
\ No newline at end of file
@@ -0,0 +1,163 @@
+# backend/app/auth/jwt_verifier.py
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+import jwt
+import requests
+
+from ..config.config import SupabaseConfig
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_ALGORITHMS = {"HS256", "RS256", "ES256"}
+# never refetch the JWKS for an unknown `kid` more often than this
+JWKS_MIN_REFETCH_SECONDS = 30
+
+
+class LocalVerificationUnavailable(Exception):
+    """No key is available to verify this token locally (not an invalid token)."""
+
+
+class SupabaseJWTVerifier:
+    """
+    Verifies Supabase access tokens without a round trip to Supabase Auth.
+
+    HS256 tokens are checked against the project's JWT secret; asymmetric
+    tokens (RS256/ES256) against the project's JWKS, which is cached and
+    refreshed on a background thread (and on demand for an unknown `kid`).
+    `exp`, `aud` and `iss` are always enforced.
+    """
+
+    def __init__(
+        self,
+        supabase_url: str,
+        jwt_secret: Optional[str] = None,
+        audience: str = "authenticated",
+        refresh_interval: float = 600,
+        leeway: float = 5,
+    ):
+        self.issuer = f"{supabase_url.rstrip('/')}/auth/v1"
+        self.jwks_url = f"{self.issuer}/.well-known/jwks.json"
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.refresh_interval = refresh_interval
+        self.leeway = leeway
+        self._keys: Dict[str, Any] = {}
+        # when a fetch was last started, successful or not
+        self._last_attempt = float("-inf")
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+
+    # ---------------------------
+    # JWKS
+    # ---------------------------
+    def refresh_jwks(self):
+        with self._lock:
+            self._last_attempt = time.monotonic()
+        resp = requests.get(self.jwks_url, timeout=5)
+        resp.raise_for_status()
+        keys = {}
+        for jwk in resp.json().get("keys", []):
+            try:
+                key = jwt.PyJWK.from_dict(jwk)
+            except jwt.PyJWKError as e:
+                logger.warning(f"Skipping unusable JWKS key {jwk.get('kid')}: {e}")
+                continue
+            keys[key.key_id] = key
+        with self._lock:
+            self._keys = keys
+
+    def _ensure_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(self.refresh_interval)
+                    try:
+                        self.refresh_jwks()
+                    except Exception as e:
+                        logger.warning(f"JWKS refresh failed: {e}")
+
+            self._refresher = threading.Thread(target=loop, name="jwks-refresh", daemon=True)
+            self._refresher.start()
+
+    def _claim_refetch(self) -> bool:
+        # throttled on attempts, not successes: while the JWKS endpoint is
+        # down, tokens with made-up `kid`s must not each block a request
+        # thread on a fresh fetch
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_attempt < JWKS_MIN_REFETCH_SECONDS:
+                return False
+            self._last_attempt = now
+            return True
+
+    def _jwks_key(self, kid: Optional[str]):
+        self._ensure_refresher()
+        key = self._keys.get(kid)
+        if key is None and self._claim_refetch():
+            try:
+                self.refresh_jwks()
+            except Exception as e:
+                logger.warning(f"JWKS fetch failed: {e}")
+            key = self._keys.get(kid)
+        return key.key if key is not None else None
+
+    # ---------------------------
+    # verification
+    # ---------------------------
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Return the verified claims of `token`.
+        Raises jwt.InvalidTokenError for a bad/expired token and
+        LocalVerificationUnavailable when no key can check it.
+        """
+        header = jwt.get_unverified_header(token)
+        alg = header.get("alg")
+        if alg not in ALLOWED_ALGORITHMS:
+            raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {alg}")
+
+        key = self.jwt_secret if alg == "HS256" else self._jwks_key(header.get("kid"))
+        if not key:
+            raise LocalVerificationUnavailable(f"No key to verify {alg} token (kid={header.get('kid')})")
+
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[alg],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={"require": ["exp", "sub", "aud", "iss"]},
+        )
+
+
+def claims_to_user(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Map verified access-token claims to the user dict placed on request.current_user."""
+    return {
+        "id": claims.get("sub"),
+        "email": claims.get("email"),
+        "phone": claims.get("phone"),
+        "role": claims.get("role"),
+        "aud": claims.get("aud"),
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+        "is_anonymous": claims.get("is_anonymous", False),
+        "session_id": claims.get("session_id"),
+    }
+
+
+supabase_config = SupabaseConfig()
+
+jwt_verifier = SupabaseJWTVerifier(
+    supabase_config.SUPABASE_URL or "",
+    jwt_secret=supabase_config.SUPABASE_JWT_SECRET,
+    audience=supabase_config.SUPABASE_JWT_AUDIENCE,
+    refresh_interval=supabase_config.SUPABASE_JWKS_REFRESH_SECONDS,
+)
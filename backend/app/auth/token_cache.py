@@ -0,0 +1,117 @@
+# backend/app/auth/token_cache.py
+import os
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import jwt
+from cachetools import TLRUCache
+
+# -------------------------------------------------------------------
+# Token cache configuration
+# -------------------------------------------------------------------
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10_000))
+# upper bound on how long a validation result is reused, even for long-lived tokens
+TOKEN_CACHE_MAX_TTL = float(os.getenv("TOKEN_CACHE_MAX_TTL", 300))
+
+
+def token_key(token: str) -> str:
+    # never keep the raw token around as a dict key
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def token_ttl(token: str, max_ttl: float = TOKEN_CACHE_MAX_TTL) -> float:
+    """
+    Seconds a validation result for `token` may be reused: until its `exp`
+    claim, capped at `max_ttl`. Only called for tokens that were just
+    validated, so reading the claim without checking the signature is fine.
+    """
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.InvalidTokenError:
+        exp = None
+    if exp is None:
+        return max_ttl
+    return max(0.0, min(float(exp) - time.time(), max_ttl))
+
+
+class TokenValidationCache:
+    """
+    Bounded LRU cache mapping sha256(access token) to the resolved user.
+    Each entry expires at the token's `exp` (or after `max_ttl`, whichever
+    comes first), so a cached user never outlives the token itself.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES, max_ttl: float = TOKEN_CACHE_MAX_TTL):
+        self.max_ttl = max_ttl
+        # values are (user, ttl); the entry expires `ttl` seconds after insertion
+        self._cache = TLRUCache(maxsize=max_entries, ttu=lambda _k, value, now: now + value[1], timer=time.monotonic)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        # moving average of what a validation costs, credited on every hit
+        self._validate_avg = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache.maxsize > 0 and self.max_ttl > 0
+
+    def get_or_validate(self, token: str, validate: Callable[[str], Any]) -> Any:
+        """
+        Return the cached user for `token`, or call `validate(token)` and
+        cache its result. Exceptions from `validate` are not cached.
+        """
+        if not self.enabled:
+            return validate(token)
+
+        key = token_key(token)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.saved_seconds += self._validate_avg
+                return entry[0]
+            self.misses += 1
+
+        started = time.perf_counter()
+        user = validate(token)
+        elapsed = time.perf_counter() - started
+
+        ttl = token_ttl(token, self.max_ttl)
+        with self._lock:
+            self._validate_avg = elapsed if not self._validate_avg else 0.8 * self._validate_avg + 0.2 * elapsed
+            if ttl > 0:
+                self._cache[key] = (user, ttl)
+        return user
+
+    def invalidate(self, token: Optional[str]):
+        if not token:
+            return
+        with self._lock:
+            if self._cache.pop(token_key(token), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._cache.expire()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self._cache.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "avg_validation_ms": round(self._validate_avg * 1000, 3),
+                "latency_saved_seconds": round(self.saved_seconds, 3),
+            }
+
+
+token_cache = TokenValidationCache()
@@ -3,6 +3,7 @@ from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
 import sys
+from typing import Optional
 
 # load the environment variables from a .env file
 load_dotenv()
@@ -20,4 +21,10 @@ class SupabaseConfig(BaseSettings):
     SUPABASE_URL: str = Field(os.getenv("SUPABASE_URL"), description="The Supabase project URL")
     SUPABASE_SERVICE_ROLE_KEY: str = Field(os.getenv("SUPABASE_SERVICE_ROLE_KEY"), description="The Supabase Service Role key")
 
-    
\ No newline at end of file
+    # local verification of access tokens (see app/auth/jwt_verifier.py)
+    SUPABASE_JWT_SECRET: Optional[str] = Field(os.getenv("SUPABASE_JWT_SECRET"), description="The Supabase JWT secret (HS256 projects); asymmetric keys are read from the JWKS endpoint")
+    SUPABASE_JWT_AUDIENCE: str = Field(os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated"), description="Expected `aud` claim of access tokens")
+    SUPABASE_JWKS_REFRESH_SECONDS: int = Field(int(os.getenv("SUPABASE_JWKS_REFRESH_SECONDS", 600)), description="How often the JWKS is refreshed in the background")
+    SUPABASE_AUTH_LOCAL_VERIFY: bool = Field(os.getenv("SUPABASE_AUTH_LOCAL_VERIFY", "True") == "True", description="Verify access tokens locally instead of calling Supabase")
+    SUPABASE_AUTH_REMOTE_FALLBACK: bool = Field(os.getenv("SUPABASE_AUTH_REMOTE_FALLBACK", "True") == "True", description="Fall back to Supabase auth.get_user when a token cannot be verified locally")
+    SUPABASE_SESSION_REFRESH_WINDOW: int = Field(int(os.getenv("SUPABASE_SESSION_REFRESH_WINDOW", 300)), description="Refresh the session on any authenticated response once the access token is this close to expiry (0 disables)")
\ No newline at end of file
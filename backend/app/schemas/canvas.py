@@ -1,5 +1,5 @@
 # backend/app/schemas/canvas.py
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 # ----------------------------------
 #  user schema
@@ -32,6 +32,25 @@ class UserSchema(Schema):
 
 
 
+# ----------------------------------
+#  query schemas shared by read endpoints
+# ----------------------------------
+class SourceQuerySchema(Schema):
+    source = fields.Str(
+        required=False,
+        validate=validate.OneOf(["live", "snapshot"]),
+        metadata={"description": "Read from Canvas (live) or from the locally synced snapshot. Defaults to CANVAS_READ_SOURCE."},
+    )
+
+
+class ListQuerySchema(SourceQuerySchema):
+    limit = fields.Int(
+        required=False,
+        validate=validate.Range(min=1),
+        metadata={"description": "Optional cap on the number of items returned. If omitted, every page is followed and the complete result set is returned."},
+    )
+
+
 # ----------------------------------
 #  query schemas for course query
 # ----------------------------------
@@ -58,6 +77,10 @@ class ModulesQuerySchema(Schema):
     canvas_user_id = fields.Str(required=False, metadata={"description": "Optional Canvas user id for listing courses (fallback uses /users/self)."})
 
 
+class ModuleItemsQuerySchema(ListQuerySchema):
+    course_id = fields.Int(required=True, metadata={"description": "Canvas course id the module belongs to."})
+
+
 class ModuleItemSchema(Schema):
     """Represents an item inside a Canvas module (page, assignment, file...)."""
     canvas_item_id = fields.Int(required=True, attribute="id")
@@ -122,3 +145,12 @@ class CourseSchema(Schema):
     # Grade information (returns for the current user)
     enrollments = fields.List(fields.Dict(), dump_only=True)
 
+
+class SyncRequestSchema(Schema):
+    full = fields.Bool(load_default=False, metadata={"description": "Ignore watermarks and resync everything."})
+
+
+class FullCourseSchema(CourseSchema):
+    """A course with every nested section filled in one document."""
+    # section name -> upstream error, for sections that could not be fetched
+    errors = fields.Dict(keys=fields.Str(), values=fields.Str(), dump_only=True)
@@ -0,0 +1,35 @@
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
+
+class LogSearchQuerySchema(Schema):
+    source = fields.Str(load_default="all", validate=validate.OneOf(["all","backend","frontend"]))
+    # naive datetimes are read as server local time, like the backend log lines
+    since = fields.DateTime()
+    until = fields.DateTime()
+    level = fields.Str(validate=validate.OneOf(["debug","info","warn","error"]))
+    ip = fields.Str()
+    q = fields.Str(validate=validate.Length(min=1, max=200))
+    limit = fields.Int(load_default=100, validate=validate.Range(min=1, max=1000))
+
+    @validates_schema
+    def validate_range(self, data, **kwargs):
+        if data.get("since") and data.get("until") and data["since"].timestamp() > data["until"].timestamp():
+            raise ValidationError("since must be before until", "since")
+
+class LogTailQuerySchema(Schema):
+    source = fields.Str(load_default="frontend", validate=validate.OneOf(["backend","frontend"]))
+    # from POST /logs/tail/ticket (EventSource cannot send an Authorization header)
+    ticket = fields.Str()
+    level = fields.Str(validate=validate.OneOf(["debug","info","warn","error"]))
+    ip = fields.Str()
+    q = fields.Str(validate=validate.Length(min=1, max=200))
+
+class LogArchiveQuerySchema(Schema):
+    since = fields.DateTime()
+    until = fields.DateTime()
+    level = fields.Str(validate=validate.OneOf(["debug","info","warn","error"]))
+    ip = fields.Str()
+    q = fields.Str(validate=validate.Length(min=1, max=200))
+    group_by = fields.Str(validate=validate.OneOf(["level","ip","message","path","env","origin","user_agent","referer"]))
+    # comma-separated subset of record fields to return
+    columns = fields.Str()
+    limit = fields.Int(load_default=100, validate=validate.Range(min=1, max=1000))
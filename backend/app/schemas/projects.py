@@ -1,4 +1,5 @@
-from marshmallow import Schema, fields, validate
+from datetime import date, datetime
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError, pre_dump
 
 class ProjectCreateSchema(Schema):
     title = fields.Str(required=True)
@@ -25,3 +26,62 @@ class ProjectOutSchema(Schema):
     status = fields.Str()
     created_at = fields.DateTime()
     updated_at = fields.DateTime()
+
+    @pre_dump
+    def parse_timestamps(self, data, **kwargs):
+        # PostgREST returns ISO strings; marshmallow only dumps date/datetime objects
+        if not isinstance(data, dict):
+            return data
+        data = dict(data)
+        for key in ("created_at", "updated_at"):
+            if isinstance(data.get(key), str):
+                data[key] = datetime.fromisoformat(data[key])
+        if isinstance(data.get("due_date"), str):
+            data["due_date"] = date.fromisoformat(data["due_date"])
+        return data
+
+class ProjectListQuerySchema(Schema):
+    limit = fields.Int(load_default=50, validate=validate.Range(min=1, max=200))
+    cursor = fields.Str()
+    sort = fields.Str(load_default="-created_at", validate=validate.OneOf(["-created_at","created_at","-updated_at","updated_at"]))
+    status = fields.Str(validate=validate.OneOf(["active","archived"]))
+    priority = fields.Str(validate=validate.OneOf(["low","medium","high"]))
+    subject = fields.Str()
+    due_after = fields.Date()
+    due_before = fields.Date()
+
+class ProjectDashboardQuerySchema(Schema):
+    status = fields.Str(validate=validate.OneOf(["active","archived"]))
+    due_soon_days = fields.Int(load_default=7, validate=validate.Range(min=0, max=365))
+
+class ProjectDashboardSchema(ProjectOutSchema):
+    task_count = fields.Int()
+    completed_count = fields.Int()
+    completion_ratio = fields.Float()
+    overdue = fields.Bool()
+    due_soon = fields.Bool()
+
+class ProjectBatchOperationSchema(Schema):
+    op = fields.Str(required=True, validate=validate.OneOf(["create","update","delete"]))
+    id = fields.Str()
+    # validated per item against ProjectCreateSchema / ProjectUpdateSchema
+    data = fields.Dict(load_default=dict)
+
+    @validates_schema
+    def validate_id(self, data, **kwargs):
+        if data["op"] != "create" and not data.get("id"):
+            raise ValidationError("id is required for update and delete", "id")
+
+class ProjectBatchSchema(Schema):
+    operations = fields.List(fields.Nested(ProjectBatchOperationSchema), required=True, validate=validate.Length(min=1, max=200))
+
+class ProjectBatchResultSchema(Schema):
+    index = fields.Int()
+    op = fields.Str()
+    id = fields.Str(allow_none=True)
+    status = fields.Int()
+    error = fields.Raw(allow_none=True)
+    project = fields.Nested(ProjectOutSchema, allow_none=True)
+
+class ProjectBatchResponseSchema(Schema):
+    results = fields.List(fields.Nested(ProjectBatchResultSchema))
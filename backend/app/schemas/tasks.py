@@ -0,0 +1,46 @@
+from datetime import datetime
+from marshmallow import Schema, fields, validate, pre_dump
+
+class TaskCreateSchema(Schema):
+    title = fields.Str(required=True)
+    completed = fields.Bool(load_default=False)
+    # omitted: appended after the last task
+    position = fields.Int()
+
+class TaskUpdateSchema(Schema):
+    title = fields.Str()
+    completed = fields.Bool()
+    position = fields.Int()
+
+class TaskBulkItemSchema(TaskUpdateSchema):
+    id = fields.UUID(required=True)
+
+class TaskBulkUpdateSchema(Schema):
+    tasks = fields.List(fields.Nested(TaskBulkItemSchema), required=True, validate=validate.Length(min=1, max=500))
+
+class TaskMoveSchema(Schema):
+    # place the task right after `after_id`, or right before `before_id`;
+    # neither moves it to the top
+    after_id = fields.UUID(allow_none=True, load_default=None)
+    before_id = fields.UUID(allow_none=True, load_default=None)
+
+class TaskListQuerySchema(Schema):
+    completed = fields.Bool()
+
+class TaskOutSchema(Schema):
+    id = fields.Str()
+    project_id = fields.Str()
+    title = fields.Str()
+    completed = fields.Bool()
+    position = fields.Int()
+    created_at = fields.DateTime()
+    updated_at = fields.DateTime()
+
+    @pre_dump
+    def parse_timestamps(self, data, **kwargs):
+        if not isinstance(data, dict):
+            return data
+        return {
+            **data,
+            **{k: datetime.fromisoformat(data[k]) for k in ("created_at", "updated_at") if isinstance(data.get(k), str)},
+        }
@@ -0,0 +1,185 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+from typing import Optional, Dict, Any, Tuple, List
+
+# -------------------------------------------------------------------
+# Cache configuration
+# -------------------------------------------------------------------
+CANVAS_CACHE_MAX_ENTRIES = int(os.getenv("CANVAS_CACHE_MAX_ENTRIES", 1000))
+CANVAS_CACHE_MAX_BYTES = int(os.getenv("CANVAS_CACHE_MAX_BYTES", 50_000_000))
+CANVAS_CACHE_DEFAULT_TTL = float(os.getenv("CANVAS_CACHE_DEFAULT_TTL", 120))
+# how long past its TTL an entry may still be served stale (SWR / on error)
+CANVAS_CACHE_MAX_STALE = float(os.getenv("CANVAS_CACHE_MAX_STALE", 86_400))
+
+# (resource, path pattern, ttl seconds) -- first match wins.
+# Course metadata/syllabus rarely changes; assignments and quizzes do.
+CANVAS_CACHE_TTLS: List[Tuple[str, "re.Pattern", float]] = [
+    ("user", re.compile(r"/users/self$"), 900),
+    ("course", re.compile(r"/courses/\d+$"), 900),
+    ("courses", re.compile(r"/users/\d+/courses$"), 600),
+    ("modules", re.compile(r"/modules(/\d+/items)?$"), 300),
+    ("pages", re.compile(r"/pages$"), 300),
+    ("files", re.compile(r"/files$"), 300),
+    ("assignments", re.compile(r"/assignments(/\d+)?$"), 60),
+    ("quizzes", re.compile(r"/quizzes(/\d+)?$"), 60),
+]
+
+
+def ttl_for(path: str) -> float:
+    """Return the TTL (seconds) for a Canvas path or absolute URL."""
+    route = urlparse(path).path.rstrip("/")
+    for _resource, pattern, ttl in CANVAS_CACHE_TTLS:
+        if pattern.search(route):
+            return ttl
+    return CANVAS_CACHE_DEFAULT_TTL
+
+
+class CacheEntry:
+    __slots__ = ("data", "next_url", "etag", "size", "stored_at", "expires_at")
+
+    def __init__(self, data: Any, next_url: Optional[str], etag: Optional[str], size: int, ttl: float):
+        self.data = data
+        self.next_url = next_url
+        self.etag = etag
+        self.size = size
+        self.stored_at = time.monotonic()
+        self.expires_at = self.stored_at + ttl
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+    def servable_stale(self, max_stale: float) -> bool:
+        return time.monotonic() < self.expires_at + max_stale
+
+
+class CanvasResponseCache:
+    """
+    Bounded in-process LRU cache of Canvas responses keyed by
+    (token, path, params). Entries expire after a per-resource TTL and
+    are evicted by entry count and by total payload size. Expired entries
+    keep their ETag so they can be revalidated with If-None-Match, and may
+    be served stale for up to `max_stale` seconds past their TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CANVAS_CACHE_MAX_ENTRIES,
+        max_bytes: int = CANVAS_CACHE_MAX_BYTES,
+        max_stale: float = CANVAS_CACHE_MAX_STALE,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_stale = max_stale
+        self._entries: "OrderedDict[Tuple, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.stale_served = 0
+        self.stale_on_error = 0
+        self.refreshes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(token: str, url: str, params: Optional[Dict[str, Any]] = None) -> Tuple:
+        # never keep the raw token around as a dict key
+        token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+        items = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return (token_hash, url, items)
+
+    def lookup(self, key: Tuple, count: bool = True) -> Optional[CacheEntry]:
+        """
+        Return the entry for `key` (fresh or expired) and count a hit when
+        it is still fresh, a miss otherwise (unless `count` is False).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            if count and entry is not None and entry.fresh:
+                self.hits += 1
+            elif count:
+                self.misses += 1
+            return entry
+
+    def put(self, key: Tuple, data: Any, next_url: Optional[str], etag: Optional[str], size: int, ttl: float):
+        if not self.enabled or size > self.max_bytes:
+            return
+        entry = CacheEntry(data, next_url, etag, size, ttl)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += size
+            self._evict()
+
+    def revalidated(self, key: Tuple, ttl: float):
+        """Upstream answered 304: the cached copy is good for another TTL."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.stored_at = time.monotonic()
+                entry.expires_at = entry.stored_at + ttl
+            self.revalidations += 1
+
+    def stale_entry(self, entry: Optional[CacheEntry]) -> Optional[CacheEntry]:
+        """Return `entry` when it may still be served stale, else None."""
+        if entry is not None and entry.servable_stale(self.max_stale):
+            return entry
+        return None
+
+    def record_stale(self, on_error: bool = False):
+        with self._lock:
+            if on_error:
+                self.stale_on_error += 1
+            else:
+                self.stale_served += 1
+
+    def record_refresh(self):
+        with self._lock:
+            self.refreshes += 1
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "stale_served": self.stale_served,
+                "stale_on_error": self.stale_on_error,
+                "background_refreshes": self.refreshes,
+            }
@@ -0,0 +1,233 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Optional, Dict, Any, Callable, Iterator, Iterable, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, downloads are coalesced per process only
+    fcntl = None
+
+from .singleflight import SingleFlight
+
+# -------------------------------------------------------------------
+# File cache configuration
+# -------------------------------------------------------------------
+CANVAS_FILE_CACHE_DIR = os.getenv(
+    "CANVAS_FILE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "file_cache"),
+)
+CANVAS_FILE_CACHE_MAX_BYTES = int(os.getenv("CANVAS_FILE_CACHE_MAX_BYTES", 2_000_000_000))
+CANVAS_FILE_CHUNK_SIZE = int(os.getenv("CANVAS_FILE_CHUNK_SIZE", 64 * 1024))
+
+logger = logging.getLogger(__name__)
+
+
+class ContentAddressedFileCache:
+    """
+    On-disk cache of Canvas file contents, addressed by SHA-256.
+
+    Layout under `root`:
+      blobs/ab/abcdef...   file bytes, named by their content hash
+      refs/<file_id>.json  which blob holds a Canvas file at a given version
+      tmp/                 partial downloads (renamed into blobs/ when done)
+
+    Identical content uploaded to several courses is stored once. Blobs are
+    evicted least-recently-used (by mtime, refreshed on every hit) once the
+    total size exceeds `max_bytes`. Concurrent misses for the same version
+    share one download (see `fetch`).
+    """
+
+    def __init__(self, root: str = CANVAS_FILE_CACHE_DIR, max_bytes: int = CANVAS_FILE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        for sub in ("blobs", "refs", "tmp"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        self._bytes = sum(size for _path, size, _mtime in self._blobs())
+        self.inflight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ---------------------------
+    # paths
+    # ---------------------------
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _ref_path(self, file_id: int) -> str:
+        return os.path.join(self.root, "refs", f"{file_id}.json")
+
+    def _blobs(self) -> Iterator[Tuple[str, int, float]]:
+        blobs_dir = os.path.join(self.root, "blobs")
+        for shard in os.scandir(blobs_dir):
+            if not shard.is_dir():
+                continue
+            for blob in os.scandir(shard.path):
+                st = blob.stat()
+                yield blob.path, st.st_size, st.st_mtime
+
+    # ---------------------------
+    # reads
+    # ---------------------------
+    def lookup(self, file_id: int, version: str, count: bool = True) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Return (blob path, ref) when the given version of a Canvas file is
+        cached, else None. `count=False` leaves the hit/miss counters alone.
+        """
+        try:
+            with open(self._ref_path(file_id), encoding="utf-8") as fh:
+                ref = json.load(fh)
+        except (OSError, ValueError):
+            ref = None
+
+        path = self._blob_path(ref["sha256"]) if ref and ref.get("version") == version else None
+        if path is None or not os.path.exists(path):
+            if count:
+                with self._lock:
+                    self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # LRU bookkeeping
+        except OSError:
+            pass
+        if count:
+            with self._lock:
+                self.hits += 1
+        return path, ref
+
+    def fetch(
+        self,
+        file_id: int,
+        version: str,
+        open_chunks: Callable[[], Iterable[bytes]],
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Return (blob path, ref) of a file version, downloading it with
+        `open_chunks()` first when it is not cached. Concurrent misses share
+        one download: threads of a worker through SingleFlight, worker
+        processes through a flock per file (the file is looked up again
+        once the lock is held).
+        """
+        found = self.lookup(file_id, version)
+        if found is not None:
+            return found
+        return self.inflight.do((file_id, version), lambda: self._fetch_locked(file_id, version, open_chunks, meta))
+
+    def _fetch_locked(self, file_id, version, open_chunks, meta):
+        with open(os.path.join(self.root, "tmp", f"{file_id}.lock"), "a+b") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            found = self.lookup(file_id, version, count=False)
+            if found is not None:
+                return found
+            return self.fill(file_id, version, open_chunks(), meta)
+
+    # ---------------------------
+    # writes
+    # ---------------------------
+    def tee(self, file_id: int, version: str, chunks: Iterable[bytes], meta: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+        """
+        Yield `chunks` unchanged while writing them to disk. When the
+        download completes it is committed under its content hash; when it
+        is interrupted (client gone, upstream error) the partial file is
+        discarded.
+        """
+        tmp_path = os.path.join(self.root, "tmp", uuid.uuid4().hex)
+        sha = hashlib.sha256()
+        size = 0
+        completed = False
+        try:
+            with open(tmp_path, "wb") as fh:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    fh.write(chunk)
+                    sha.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            if completed:
+                self._commit(file_id, version, tmp_path, sha.hexdigest(), size, meta or {})
+            else:
+                _remove(tmp_path)
+
+    def fill(self, file_id: int, version: str, chunks: Iterable[bytes], meta: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Download a file completely into the cache and return (blob path, ref)."""
+        for _chunk in self.tee(file_id, version, chunks, meta):
+            pass
+        found = self.lookup(file_id, version, count=False)
+        if found is None:
+            raise RuntimeError(f"Canvas file {file_id} could not be cached")
+        return found
+
+    def _commit(self, file_id: int, version: str, tmp_path: str, digest: str, size: int, meta: Dict[str, Any]):
+        blob_path = self._blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        with self._lock:
+            if os.path.exists(blob_path):
+                # same content already stored (another course, another worker)
+                _remove(tmp_path)
+                os.utime(blob_path)
+            else:
+                os.replace(tmp_path, blob_path)
+                self._bytes += size
+
+        ref = {"version": version, "sha256": digest, "size": size, **meta}
+        ref_tmp = f"{self._ref_path(file_id)}.{uuid.uuid4().hex}"
+        with open(ref_tmp, "w", encoding="utf-8") as fh:
+            json.dump(ref, fh)
+        os.replace(ref_tmp, self._ref_path(file_id))
+
+        if self._bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        with self._lock:
+            # rescan: other worker processes share the directory
+            blobs = sorted(self._blobs(), key=lambda b: b[2])
+            total = sum(size for _path, size, _mtime in blobs)
+            for path, size, _mtime in blobs:
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+                self.evictions += 1
+            self._bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_file_cache: Optional[ContentAddressedFileCache] = None
+_file_cache_lock = threading.Lock()
+
+
+def get_file_cache() -> ContentAddressedFileCache:
+    global _file_cache
+    if _file_cache is None:
+        with _file_cache_lock:
+            if _file_cache is None:
+                _file_cache = ContentAddressedFileCache()
+    return _file_cache
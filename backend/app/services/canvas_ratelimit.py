@@ -0,0 +1,173 @@
+import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any
+
+# -------------------------------------------------------------------
+# Rate limit configuration
+# -------------------------------------------------------------------
+# Canvas throttles each token with a leaky bucket: the bucket holds
+# CAPACITY units, drains at REFILL units/second, and every request costs
+# X-Request-Cost units. X-Rate-Limit-Remaining reports what is left.
+CANVAS_RATE_LIMIT_CAPACITY = float(os.getenv("CANVAS_RATE_LIMIT_CAPACITY", 700))
+CANVAS_RATE_LIMIT_REFILL = float(os.getenv("CANVAS_RATE_LIMIT_REFILL", 10))
+# budget kept in reserve: background work stops well before interactive work
+CANVAS_RATE_LIMIT_INTERACTIVE_FLOOR = float(os.getenv("CANVAS_RATE_LIMIT_INTERACTIVE_FLOOR", 50))
+CANVAS_RATE_LIMIT_BACKGROUND_FLOOR = float(os.getenv("CANVAS_RATE_LIMIT_BACKGROUND_FLOOR", 300))
+# longest a request is held back before it is let through anyway
+CANVAS_RATE_LIMIT_INTERACTIVE_MAX_WAIT = float(os.getenv("CANVAS_RATE_LIMIT_INTERACTIVE_MAX_WAIT", 5))
+CANVAS_RATE_LIMIT_BACKGROUND_MAX_WAIT = float(os.getenv("CANVAS_RATE_LIMIT_BACKGROUND_MAX_WAIT", 60))
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority: ContextVar[str] = ContextVar("canvas_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Run the Canvas calls made inside the block at background priority."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Budget:
+    __slots__ = ("remaining", "updated_at", "avg_cost", "reserved", "waiting_interactive")
+
+    def __init__(self, capacity: float):
+        self.remaining = capacity
+        self.updated_at = time.monotonic()
+        self.avg_cost = 1.0
+        self.reserved = 0.0
+        self.waiting_interactive = 0
+
+
+class CanvasRateLimiter:
+    """
+    Per-token budget scheduler driven by Canvas' rate limit headers.
+
+    Before a request, `acquire` estimates the remaining budget (last
+    reported X-Rate-Limit-Remaining plus what has leaked out since, minus
+    the cost of requests still in flight). When it would drop below the
+    floor for the caller's priority the request waits for the bucket to
+    drain. Background requests also yield to waiting interactive ones.
+    `release` feeds the response headers back into the budget.
+    """
+
+    def __init__(
+        self,
+        capacity: float = CANVAS_RATE_LIMIT_CAPACITY,
+        refill_rate: float = CANVAS_RATE_LIMIT_REFILL,
+        interactive_floor: float = CANVAS_RATE_LIMIT_INTERACTIVE_FLOOR,
+        background_floor: float = CANVAS_RATE_LIMIT_BACKGROUND_FLOOR,
+    ):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.floors = {INTERACTIVE: interactive_floor, BACKGROUND: background_floor}
+        self.max_waits = {
+            INTERACTIVE: CANVAS_RATE_LIMIT_INTERACTIVE_MAX_WAIT,
+            BACKGROUND: CANVAS_RATE_LIMIT_BACKGROUND_MAX_WAIT,
+        }
+        self._budgets: Dict[str, _Budget] = {}
+        self._cond = threading.Condition()
+        self.delayed = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.forced = 0
+        self.throttled = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+    def _available(self, budget: _Budget, now: float) -> float:
+        leaked = (now - budget.updated_at) * self.refill_rate
+        return min(self.capacity, budget.remaining + leaked) - budget.reserved
+
+    def acquire(self, token: str, priority: Optional[str] = None) -> float:
+        """
+        Block until the budget allows a request at `priority` (defaults to
+        the priority of the current context). Returns the reserved cost,
+        to be handed back to `release`.
+        """
+        priority = priority or _priority.get()
+        floor = self.floors[priority]
+        key = self._key(token)
+        with self._cond:
+            budget = self._budgets.setdefault(key, _Budget(self.capacity))
+            cost = budget.avg_cost
+            deadline = time.monotonic() + self.max_waits[priority]
+            if priority == INTERACTIVE:
+                budget.waiting_interactive += 1
+            delayed = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    available = self._available(budget, now)
+                    yield_to_interactive = priority == BACKGROUND and budget.waiting_interactive > 0
+                    if available - cost >= floor and not yield_to_interactive:
+                        break
+                    if now >= deadline:
+                        self.forced += 1
+                        break
+                    if not delayed:
+                        self.delayed[priority] += 1
+                        delayed = True
+                    shortfall = max(floor + cost - available, cost)
+                    # with no refill only a release (new headers) can help
+                    refill_wait = shortfall / self.refill_rate if self.refill_rate > 0 else deadline - now
+                    self._cond.wait(min(refill_wait, deadline - now))
+            finally:
+                if priority == INTERACTIVE:
+                    budget.waiting_interactive -= 1
+                    self._cond.notify_all()
+            budget.reserved += cost
+            return cost
+
+    def release(self, token: str, reserved: float, headers: Optional[Dict[str, str]] = None, status: Optional[int] = None):
+        """Return a reservation and update the budget from response headers."""
+        headers = headers or {}
+        with self._cond:
+            budget = self._budgets.setdefault(self._key(token), _Budget(self.capacity))
+            budget.reserved = max(0.0, budget.reserved - reserved)
+            now = time.monotonic()
+
+            remaining = headers.get("X-Rate-Limit-Remaining")
+            if remaining is not None:
+                try:
+                    budget.remaining = float(remaining)
+                    budget.updated_at = now
+                except ValueError:
+                    pass
+            if status == 403 and budget.remaining <= 0:
+                # "403 Forbidden (Rate Limit Exceeded)"
+                self.throttled += 1
+
+            cost = headers.get("X-Request-Cost")
+            if cost is not None:
+                try:
+                    budget.avg_cost = 0.8 * budget.avg_cost + 0.2 * float(cost)
+                except ValueError:
+                    pass
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            return {
+                "budgets": {
+                    key: {
+                        "available": round(self._available(budget, now), 2),
+                        "avg_cost": round(budget.avg_cost, 3),
+                        "in_flight_cost": round(budget.reserved, 3),
+                    }
+                    for key, budget in self._budgets.items()
+                },
+                "delayed": dict(self.delayed),
+                "forced": self.forced,
+                "throttled": self.throttled,
+            }
@@ -1,7 +1,16 @@
 import os
-from urllib.parse import urljoin
-import requests
-from typing import Optional, Dict, Any
+import logging
+import threading
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+from .canvas_client import CanvasClient
+from .canvas_cache import CanvasResponseCache, ttl_for
+from .canvas_ratelimit import CanvasRateLimiter, background_priority
+from .singleflight import SingleFlight
+from .resilience import resilient_call
 
 # -------------------------------------------------------------------
 # Canvas configuration
@@ -12,22 +21,226 @@ CANVAS_API_TOKEN = os.getenv("CANVAS_API_TOKEN")
 if not CANVAS_API_TOKEN:
     raise RuntimeError("CANVAS_API_TOKEN is not set")
 
-HEADERS = {
-    "Authorization": f"Bearer {CANVAS_API_TOKEN}"
-}
+# bounded pool used to fan out aggregate requests (per worker process)
+CANVAS_AGGREGATE_WORKERS = int(os.getenv("CANVAS_AGGREGATE_WORKERS", 8))
+
+# serve expired entries immediately and refresh them in the background
+CANVAS_STALE_WHILE_REVALIDATE = os.getenv("CANVAS_STALE_WHILE_REVALIDATE", "True") == "True"
+CANVAS_REFRESH_WORKERS = int(os.getenv("CANVAS_REFRESH_WORKERS", 2))
+
+logger = logging.getLogger(__name__)
+
+# per-token budget scheduler fed by X-Rate-Limit-Remaining / X-Request-Cost
+rate_limiter = CanvasRateLimiter()
+
+# shared, pooled keep-alive client (one per worker process)
+client = CanvasClient(CANVAS_API_URL, CANVAS_API_TOKEN, rate_limiter=rate_limiter)
+
+# bounded TTL + LRU cache of upstream responses
+cache = CanvasResponseCache()
+
+# identical in-flight upstream requests share one round trip
+inflight = SingleFlight()
+
+_aggregate_executor = ThreadPoolExecutor(
+    max_workers=CANVAS_AGGREGATE_WORKERS,
+    thread_name_prefix="canvas-aggregate",
+)
+
+_refresh_executor = ThreadPoolExecutor(
+    max_workers=CANVAS_REFRESH_WORKERS,
+    thread_name_prefix="canvas-refresh",
+)
+_refresh_pending = set()
+_refresh_lock = threading.Lock()
+
+# staleness of the data served during the current request (see track_staleness)
+_staleness: contextvars.ContextVar = contextvars.ContextVar("canvas_staleness", default=None)
+# set by fresh_reads(): skip cached and stale copies
+_fresh_reads: contextvars.ContextVar = contextvars.ContextVar("canvas_fresh_reads", default=False)
+
+
+def get_stats() -> Dict[str, Any]:
+    """Counters of the Canvas response cache, request coalescing and rate limiting."""
+    return {
+        "cache": cache.stats(),
+        "singleflight": inflight.stats(),
+        "rate_limit": rate_limiter.stats(),
+    }
+
+
+def track_staleness() -> Dict[str, Any]:
+    """
+    Start recording, for the current request, whether any Canvas data was
+    served stale. Returns the record; `stale_age` is the age in seconds of
+    the oldest stale entry served (None when everything was fresh).
+    """
+    record = {"stale_age": None}
+    _staleness.set(record)
+    return record
+
+
+@contextlib.contextmanager
+def fresh_reads():
+    """
+    Within the block, every Canvas read goes upstream instead of being
+    served from the response cache, fresh or stale. A cached copy is still
+    revalidated with If-None-Match, so an unchanged resource costs a 304,
+    and a failure is raised instead of falling back to the stale copy.
+    Used by the snapshot sync.
+    """
+    token = _fresh_reads.set(True)
+    try:
+        yield
+    finally:
+        _fresh_reads.reset(token)
+
+
+def _note_stale(entry):
+    record = _staleness.get()
+    if record is not None:
+        record["stale_age"] = max(record["stale_age"] or 0.0, entry.age)
 
 
 # -------------------------------------------------------------------
-# Internal helper
+# Internal helpers
 # -------------------------------------------------------------------
+def _fetch(path: str, params: Optional[Dict[str, Any]] = None, store: bool = True) -> Tuple[Any, Optional[str]]:
+    """
+    GET a Canvas resource through the response cache.
+    Fresh entries are served from memory. In stale-while-revalidate mode
+    an expired entry is served as is and refreshed in the background;
+    otherwise it is revalidated with If-None-Match so an unchanged
+    resource costs a 304 instead of a full payload.
+    Concurrent misses for the same key are coalesced into one request.
+    When Canvas fails, the last good copy is served stale if there is one.
+    With `store=False` a miss goes straight upstream and is not cached.
+    Under fresh_reads() every call goes upstream (see there).
+    Returns the JSON body and the `Link: rel="next"` URL (if any).
+    """
+    key = cache.make_key(client.token, client.url(path), params)
+    fresh_only = _fresh_reads.get()
+    entry = cache.lookup(key, count=not fresh_only) if cache.enabled else None
+    if fresh_only:
+        return inflight.do(key, lambda: _fetch_upstream(path, params, key, entry, store=store))
+    if entry is not None and entry.fresh:
+        return entry.data, entry.next_url
+    if not store:
+        # streamed listings: read through without holding every page in memory
+        return _fetch_upstream(path, params, key, entry, store=False)
+
+    stale = cache.stale_entry(entry)
+    if stale is not None and CANVAS_STALE_WHILE_REVALIDATE:
+        _schedule_refresh(key, path, params, stale)
+        cache.record_stale()
+        _note_stale(stale)
+        return stale.data, stale.next_url
+
+    try:
+        return inflight.do(key, lambda: _fetch_upstream(path, params, key, entry))
+    except Exception as e:
+        if stale is None:
+            raise
+        logger.warning(f"Canvas request failed, serving stale copy of {path}: {e}")
+        cache.record_stale(on_error=True)
+        _note_stale(stale)
+        return stale.data, stale.next_url
+
+
+def _schedule_refresh(key, path: str, params: Optional[Dict[str, Any]], entry):
+    """Refresh an expired cache entry on the background pool (once per key)."""
+    with _refresh_lock:
+        if key in _refresh_pending:
+            return
+        _refresh_pending.add(key)
+
+    def refresh():
+        try:
+            with background_priority():
+                inflight.do(key, lambda: _fetch_upstream(path, params, key, entry))
+            cache.record_refresh()
+        except Exception as e:
+            logger.info(f"Background refresh of {path} failed: {e}")
+        finally:
+            with _refresh_lock:
+                _refresh_pending.discard(key)
+
+    _refresh_executor.submit(refresh)
+
+
+def _fetch_upstream(path: str, params: Optional[Dict[str, Any]], key, entry, store: bool = True) -> Tuple[Any, Optional[str]]:
+    """
+    Perform the upstream GET for `_fetch` and store the result in the cache
+    (unless `store` is False).
+    """
+    headers = {}
+    if entry is not None and entry.etag:
+        headers["If-None-Match"] = entry.etag
+
+    def request():
+        resp = client.get(path, params=params, headers=headers)
+        resp.raise_for_status()
+        return resp
+
+    # GETs are idempotent: retry transient errors behind the Canvas breaker
+    resp = resilient_call("canvas", request)
+    if resp.status_code == 304 and entry is not None:
+        cache.revalidated(key, ttl_for(path))
+        return entry.data, entry.next_url
+
+    data = resp.json()
+    next_url = resp.links.get("next", {}).get("url")
+    if store:
+        cache.put(key, data, next_url, resp.headers.get("ETag"), len(resp.content), ttl_for(path))
+    return data, next_url
+
+
 def _get(path: str, params: Optional[Dict[str, Any]] = None):
     """
     Perform a GET request to Canvas API.
     """
-    url = urljoin(CANVAS_API_URL.rstrip("/") + "/", path.lstrip("/"))
-    resp = requests.get(url, headers=HEADERS, params=params)
-    resp.raise_for_status()
-    return resp.json()
+    data, _next_url = _fetch(path, params=params)
+    return data
+
+
+def _get_page(path: str, params: Optional[Dict[str, Any]] = None, cache_pages: bool = True) -> Tuple[Any, Optional[str]]:
+    """
+    GET a single page of a Canvas list endpoint.
+    Returns the page items and the `Link: rel="next"` URL (if any).
+    """
+    return _fetch(path, params=params, store=cache_pages)
+
+
+def _paginate(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    cache_pages: bool = True,
+) -> Iterator[Any]:
+    """
+    Lazily iterate over every item of a Canvas list endpoint, following
+    `Link: rel="next"` headers one page at a time.
+    Stops after `limit` items when given. With `cache_pages=False` fetched
+    pages are not stored in the response cache (streamed listings).
+    """
+    if limit is not None and limit <= 0:
+        return
+
+    if limit is not None and params and int(params.get("per_page", 0)) > limit:
+        # don't pull a full page of 100 when only a handful of items are wanted
+        params = {**params, "per_page": limit}
+
+    count = 0
+    next_url: Optional[str] = path
+    while next_url:
+        page, next_url = _get_page(next_url, params=params, cache_pages=cache_pages)
+        # the next link already carries the query string
+        params = None
+        for item in page or []:
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
 
 
 # -------------------------------------------------------------------
@@ -43,12 +256,19 @@ def get_user_information():
 # -------------------------------------------------------------------
 # Courses
 # -------------------------------------------------------------------
-def get_user_courses(canvas_user_id: int, params: Optional[Dict[str, Any]] = None):
+def iter_user_courses(canvas_user_id: int, params: Optional[Dict[str, Any]] = None, limit: Optional[int] = None):
     """
-    GET /users/:id/courses
+    GET /users/:id/courses (all pages, lazily)
     """
     params = params or {"per_page": 100}
-    return _get(f"/users/{canvas_user_id}/courses", params=params)
+    return _paginate(f"/users/{canvas_user_id}/courses", params=params, limit=limit)
+
+
+def get_user_courses(canvas_user_id: int, params: Optional[Dict[str, Any]] = None, limit: Optional[int] = None):
+    """
+    GET /users/:id/courses
+    """
+    return list(iter_user_courses(canvas_user_id, params=params, limit=limit))
 
 
 def get_course(course_id: int, include_syllabus: bool = False):
@@ -66,29 +286,56 @@ def get_course(course_id: int, include_syllabus: bool = False):
 # -------------------------------------------------------------------
 # Modules
 # -------------------------------------------------------------------
-def get_course_modules(course_id: int, params: Optional[Dict[str, Any]] = None):
+def iter_course_modules(course_id: int, params: Optional[Dict[str, Any]] = None, limit: Optional[int] = None):
     """
-    GET /courses/:course_id/modules
+    GET /courses/:course_id/modules (all pages, lazily)
     """
     params = params or {"per_page": 100}
-    return _get(f"/courses/{course_id}/modules", params=params)
+    return _paginate(f"/courses/{course_id}/modules", params=params, limit=limit)
 
 
-def get_module_items(course_id: int, module_id: int, params: Optional[Dict[str, Any]] = None):
+def get_course_modules(course_id: int, params: Optional[Dict[str, Any]] = None, limit: Optional[int] = None):
     """
-    GET /courses/:course_id/modules/:module_id/items
+    GET /courses/:course_id/modules
+    """
+    return list(iter_course_modules(course_id, params=params, limit=limit))
+
+
+def iter_module_items(course_id: int, module_id: int, params: Optional[Dict[str, Any]] = None, limit: Optional[int] = None):
+    """
+    GET /courses/:course_id/modules/:module_id/items (all pages, lazily)
     """
     params = params or {"per_page": 100}
-    return _get(
+    return _paginate(
         f"/courses/{course_id}/modules/{module_id}/items",
         params=params,
+        limit=limit,
     )
 
 
+def get_module_items(course_id: int, module_id: int, params: Optional[Dict[str, Any]] = None, limit: Optional[int] = None):
+    """
+    GET /courses/:course_id/modules/:module_id/items
+    """
+    return list(iter_module_items(course_id, module_id, params=params, limit=limit))
+
+
 # -------------------------------------------------------------------
 # Assignments
 # -------------------------------------------------------------------
-def get_course_assignments(course_id: int, assignment_id: Optional[int] = None):
+def iter_course_assignments(course_id: int, limit: Optional[int] = None, cache_pages: bool = True):
+    """
+    GET /courses/:course_id/assignments (all pages, lazily)
+    """
+    return _paginate(
+        f"/courses/{course_id}/assignments",
+        params={"per_page": 100},
+        limit=limit,
+        cache_pages=cache_pages,
+    )
+
+
+def get_course_assignments(course_id: int, assignment_id: Optional[int] = None, limit: Optional[int] = None):
     """
     GET /courses/:course_id/assignments
     GET /courses/:course_id/assignments/:id
@@ -96,16 +343,24 @@ def get_course_assignments(course_id: int, assignment_id: Optional[int] = None):
     if assignment_id:
         return _get(f"/courses/{course_id}/assignments/{assignment_id}")
 
-    return _get(
-        f"/courses/{course_id}/assignments",
-        params={"per_page": 100},
-    )
+    return list(iter_course_assignments(course_id, limit=limit))
 
 
 # -------------------------------------------------------------------
 # Quizzes
 # -------------------------------------------------------------------
-def get_course_quizzes(course_id: int, quiz_id: Optional[int] = None):
+def iter_course_quizzes(course_id: int, limit: Optional[int] = None):
+    """
+    GET /courses/:course_id/quizzes (all pages, lazily)
+    """
+    return _paginate(
+        f"/courses/{course_id}/quizzes",
+        params={"per_page": 100},
+        limit=limit,
+    )
+
+
+def get_course_quizzes(course_id: int, quiz_id: Optional[int] = None, limit: Optional[int] = None):
     """
     GET /courses/:course_id/quizzes
     GET /courses/:course_id/quizzes/:id
@@ -113,33 +368,131 @@ def get_course_quizzes(course_id: int, quiz_id: Optional[int] = None):
     if quiz_id:
         return _get(f"/courses/{course_id}/quizzes/{quiz_id}")
 
-    return _get(
-        f"/courses/{course_id}/quizzes",
-        params={"per_page": 100},
-    )
+    return list(iter_course_quizzes(course_id, limit=limit))
 
 
 # -------------------------------------------------------------------
 # Files (PDFs, slides, lecture notes)
 # -------------------------------------------------------------------
-def get_course_files(course_id: int):
+def iter_course_files(
+    course_id: int,
+    limit: Optional[int] = None,
+    params: Optional[Dict[str, Any]] = None,
+    cache_pages: bool = True,
+):
     """
-    GET /courses/:course_id/files
+    GET /courses/:course_id/files (all pages, lazily)
     """
-    return _get(
+    params = params or {"per_page": 100}
+    return _paginate(
         f"/courses/{course_id}/files",
-        params={"per_page": 100},
+        params=params,
+        limit=limit,
+        cache_pages=cache_pages,
     )
 
 
+def get_course_files(course_id: int, limit: Optional[int] = None):
+    """
+    GET /courses/:course_id/files
+    """
+    return list(iter_course_files(course_id, limit=limit))
+
+
+def get_file(file_id: int):
+    """
+    GET /files/:id
+    """
+    return _get(f"/files/{file_id}")
+
+
+def open_file_content(url: str, chunk_size: int = 64 * 1024) -> Tuple[Iterator[bytes], Dict[str, str]]:
+    """
+    Start downloading a file from its Canvas download `url`.
+    The request is made (and upstream errors raised) right away; the body
+    is returned as a lazy iterator of chunks, plus the response headers.
+    """
+    def request():
+        resp = client.get(url, stream=True)
+        try:
+            resp.raise_for_status()
+        except Exception:
+            resp.close()
+            raise
+        return resp
+
+    resp = resilient_call("canvas", request)
+
+    def chunks():
+        try:
+            yield from resp.iter_content(chunk_size=chunk_size)
+        finally:
+            resp.close()
+
+    return chunks(), resp.headers
+
+
 # -------------------------------------------------------------------
 # Pages (Canvas wiki / lecture content)
 # -------------------------------------------------------------------
-def get_course_pages(course_id: int):
+def iter_course_pages(
+    course_id: int,
+    limit: Optional[int] = None,
+    params: Optional[Dict[str, Any]] = None,
+    cache_pages: bool = True,
+):
     """
-    GET /courses/:course_id/pages
+    GET /courses/:course_id/pages (all pages, lazily)
     """
-    return _get(
+    params = params or {"per_page": 100}
+    return _paginate(
         f"/courses/{course_id}/pages",
-        params={"per_page": 100},
+        params=params,
+        limit=limit,
+        cache_pages=cache_pages,
     )
+
+
+def get_course_pages(course_id: int, limit: Optional[int] = None):
+    """
+    GET /courses/:course_id/pages
+    """
+    return list(iter_course_pages(course_id, limit=limit))
+
+
+# -------------------------------------------------------------------
+# Full course (aggregate)
+# -------------------------------------------------------------------
+def get_full_course(course_id: int):
+    """
+    GET /courses/:id plus its modules, assignments, quizzes and files,
+    fetched concurrently so the latency is that of the slowest call.
+
+    The course itself is required and its error is raised. Every other
+    section degrades on its own: it is set to None and its error message
+    is reported under `errors`.
+    """
+    sections = {
+        "modules": get_course_modules,
+        "assignments": get_course_assignments,
+        "quizzes": get_course_quizzes,
+        "files": get_course_files,
+    }
+    # each task runs in a copy of the caller's context (staleness, priority)
+    def submit(fn, *args):
+        return _aggregate_executor.submit(contextvars.copy_context().run, fn, *args)
+
+    course_future = submit(get_course, course_id, True)
+    futures = {name: submit(fetch, course_id) for name, fetch in sections.items()}
+
+    # copy: the cached course dict must not be mutated
+    full = dict(course_future.result())
+    errors = {}
+    for name, future in futures.items():
+        try:
+            full[name] = future.result()
+        except Exception as e:
+            full[name] = None
+            errors[name] = str(e)
+    full["errors"] = errors
+    return full
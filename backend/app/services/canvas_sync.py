@@ -0,0 +1,446 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import weakref
+import threading
+from typing import Optional, Dict, Any, Iterable, List
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, every process is its own leader
+    fcntl = None
+
+from . import canvas_service
+from .canvas_ratelimit import background_priority
+
+# -------------------------------------------------------------------
+# Snapshot configuration
+# -------------------------------------------------------------------
+CANVAS_SNAPSHOT_PATH = os.getenv(
+    "CANVAS_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "canvas_snapshot.sqlite3"),
+)
+# seconds between background syncs (0 disables the periodic sync)
+CANVAS_SYNC_INTERVAL = float(os.getenv("CANVAS_SYNC_INTERVAL", 0))
+# a full (non-delta) resync runs at least this often, to pick up deletions
+CANVAS_SYNC_FULL_EVERY = float(os.getenv("CANVAS_SYNC_FULL_EVERY", 86_400))
+# default source of /canvas reads: "live" (Canvas) or "snapshot" (local store)
+CANVAS_READ_SOURCE = os.getenv("CANVAS_READ_SOURCE", "live")
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+create table if not exists resources (
+  kind text not null,
+  id integer not null,
+  course_id integer,
+  parent_id integer,
+  position integer,
+  updated_at text,
+  digest text not null,
+  data text not null,
+  primary key (kind, id)
+);
+create index if not exists idx_resources_scope on resources(kind, course_id, parent_id);
+create table if not exists sync_state (
+  scope text primary key,
+  watermark text,
+  full_synced_at real,
+  synced_at real
+);
+"""
+
+
+def _digest(item: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(item, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CanvasSnapshotStore:
+    """
+    Local SQLite mirror of Canvas resources. Every resource kind lives in one
+    table keyed by (kind, id) with its course/parent scope, so route reads are
+    single indexed lookups. Rows are only rewritten when their content digest
+    changes.
+    """
+
+    def __init__(self, path: str = CANVAS_SNAPSHOT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conns = set()
+        self._conns_lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread; WAL lets readers run alongside the sync
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # only ever used by its own thread; check_same_thread is off so
+            # the finalizer below can close it once that thread is gone
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.add(conn)
+            weakref.finalize(threading.current_thread(), self._close_conn, conn)
+        return conn
+
+    def _close_conn(self, conn: sqlite3.Connection):
+        with self._conns_lock:
+            self._conns.discard(conn)
+        conn.close()
+
+    def close(self):
+        """Close every connection of the store (any thread)."""
+        with self._conns_lock:
+            conns, self._conns = list(self._conns), set()
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+    # ---------------------------
+    # writes
+    # ---------------------------
+    def upsert(
+        self,
+        kind: str,
+        items: Iterable[Dict[str, Any]],
+        course_id: Optional[int] = None,
+        parent_id: Optional[int] = None,
+        id_field: str = "id",
+    ) -> int:
+        """Insert or update items; returns how many rows actually changed."""
+        rows = [
+            (
+                kind,
+                item[id_field],
+                course_id,
+                parent_id,
+                item.get("position"),
+                item.get("updated_at"),
+                _digest(item),
+                json.dumps(item, default=str),
+            )
+            for item in items
+        ]
+        if not rows:
+            return 0
+        conn = self._conn()
+        before = conn.total_changes
+        with conn:
+            conn.executemany(
+                """
+                insert into resources (kind, id, course_id, parent_id, position, updated_at, digest, data)
+                values (?, ?, ?, ?, ?, ?, ?, ?)
+                on conflict (kind, id) do update set
+                  course_id = excluded.course_id,
+                  parent_id = excluded.parent_id,
+                  position = excluded.position,
+                  updated_at = excluded.updated_at,
+                  digest = excluded.digest,
+                  data = excluded.data
+                where resources.digest != excluded.digest
+                   or resources.course_id is not excluded.course_id
+                   or resources.parent_id is not excluded.parent_id
+                """,
+                rows,
+            )
+        return conn.total_changes - before
+
+    def prune(self, kind: str, keep_ids: Iterable[int], course_id: Optional[int] = None, parent_id: Optional[int] = None) -> int:
+        """Delete rows of a scope that are no longer listed upstream."""
+        keep = list(keep_ids)
+        conn = self._conn()
+        query = "delete from resources where kind = ? and course_id is ? and parent_id is ?"
+        args: List[Any] = [kind, course_id, parent_id]
+        if keep:
+            query += f" and id not in ({','.join('?' * len(keep))})"
+            args += keep
+        with conn:
+            return conn.execute(query, args).rowcount
+
+    def set_state(self, scope: str, watermark: Optional[str] = None, full: bool = False):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                insert into sync_state (scope, watermark, full_synced_at, synced_at) values (?, ?, ?, ?)
+                on conflict (scope) do update set
+                  watermark = coalesce(excluded.watermark, sync_state.watermark),
+                  full_synced_at = coalesce(excluded.full_synced_at, sync_state.full_synced_at),
+                  synced_at = excluded.synced_at
+                """,
+                (scope, watermark, now if full else None, now),
+            )
+
+    # ---------------------------
+    # reads
+    # ---------------------------
+    def get_state(self, scope: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "select watermark, full_synced_at, synced_at from sync_state where scope = ?", (scope,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"watermark": row[0], "full_synced_at": row[1], "synced_at": row[2]}
+
+    def get(self, kind: str, resource_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "select data from resources where kind = ? and id = ?", (kind, resource_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(
+        self,
+        kind: str,
+        course_id: Optional[int] = None,
+        parent_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        query = "select data from resources where kind = ? and course_id is ? and parent_id is ? order by position, id"
+        args: List[Any] = [kind, course_id, parent_id]
+        if limit is not None:
+            query += " limit ?"
+            args.append(limit)
+        return [json.loads(row[0]) for row in self._conn().execute(query, args)]
+
+
+class CanvasSyncEngine:
+    """
+    Mirrors the current user's courses, modules, module items, assignments,
+    quizzes, file metadata and pages into a CanvasSnapshotStore.
+
+    After the first full sync only deltas are fetched where Canvas allows it:
+    files and pages are listed newest-`updated_at` first and the listing
+    stops below the stored watermark; module items come inline with the
+    module listing. Assignments and quizzes have no such ordering, so they
+    are re-listed (cheaply, as If-None-Match revalidations) and only changed
+    rows are written. A full resync runs every CANVAS_SYNC_FULL_EVERY
+    seconds to pick up deletions.
+
+    Every read revalidates with Canvas (canvas_service.fresh_reads): the
+    snapshot never stores a cached or stale-while-revalidate copy.
+    """
+
+    def __init__(self, store: CanvasSnapshotStore, full_every: float = CANVAS_SYNC_FULL_EVERY):
+        self.store = store
+        self.full_every = full_every
+        self._lock = threading.Lock()
+        self.running = False
+        self.last_report: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    def _needs_full(self, scope: str) -> bool:
+        state = self.store.get_state(scope)
+        return not state or not state["full_synced_at"] or time.time() - state["full_synced_at"] >= self.full_every
+
+    def sync(self, force_full: bool = False) -> Dict[str, Any]:
+        """Sync everything visible to the Canvas token. Returns changed-row counts."""
+        if not self._lock.acquire(blocking=False):
+            return {"status": "already running"}
+        self.running = True
+        started = time.monotonic()
+        report: Dict[str, Any] = {"changed": {}, "courses": 0, "full": []}
+        try:
+            with background_priority(), canvas_service.fresh_reads():
+                user = canvas_service.get_user_information()
+                self._count(report, "user", self.store.upsert("user", [user]))
+                courses = canvas_service.get_user_courses(user["id"])
+                # course rows themselves are written by sync_course (with syllabus)
+                self.store.prune("course", [c["id"] for c in courses])
+                for course in courses:
+                    self.sync_course(course["id"], report, force_full=force_full)
+            self.store.set_state("user", full=True)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Canvas sync failed: {e}")
+            raise
+        finally:
+            report["seconds"] = round(time.monotonic() - started, 3)
+            self.last_report = report
+            self.running = False
+            self._lock.release()
+        return report
+
+    def sync_course(self, course_id: int, report: Dict[str, Any], force_full: bool = False):
+        scope = f"course:{course_id}"
+        full = force_full or self._needs_full(scope)
+        if full:
+            report["full"].append(course_id)
+
+        course = canvas_service.get_course(course_id, include_syllabus=True)
+        self._count(report, "course", self.store.upsert("course", [course]))
+
+        self._sync_modules(course_id, report, full)
+        self._sync_listing("assignment", canvas_service.iter_course_assignments(course_id), course_id, report)
+        self._sync_listing("quiz", canvas_service.iter_course_quizzes(course_id), course_id, report)
+        self._sync_recent("file", canvas_service.iter_course_files, course_id, report, full)
+        self._sync_recent("page", canvas_service.iter_course_pages, course_id, report, full, id_field="page_id")
+
+        self.store.set_state(scope, full=full)
+        report["courses"] += 1
+
+    def _sync_modules(self, course_id: int, report: Dict[str, Any], full: bool):
+        # include[]=items: Canvas returns the items inline with their module
+        # (and leaves `items` out when it deems them too numerous), so item
+        # edits are seen without one request per module
+        modules = canvas_service.get_course_modules(course_id, params={"per_page": 100, "include[]": "items"})
+        rows = [{k: v for k, v in m.items() if k != "items"} for m in modules]
+        self._count(report, "module", self.store.upsert("module", rows, course_id=course_id))
+        self.store.prune("module", [m["id"] for m in modules], course_id=course_id)
+        for module in modules:
+            items = module.get("items")
+            if items is None:
+                # an item edit does not change its module: list them every time
+                items = canvas_service.get_module_items(course_id, module["id"])
+            self._count(report, "module_item", self.store.upsert("module_item", items, course_id=course_id, parent_id=module["id"]))
+            self.store.prune("module_item", [i["id"] for i in items], course_id=course_id, parent_id=module["id"])
+
+    def _sync_listing(self, kind: str, items: Iterable[Dict[str, Any]], course_id: int, report: Dict[str, Any]):
+        items = list(items)
+        self._count(report, kind, self.store.upsert(kind, items, course_id=course_id))
+        self.store.prune(kind, [i["id"] for i in items], course_id=course_id)
+
+    def _sync_recent(self, kind: str, iter_fn, course_id: int, report: Dict[str, Any], full: bool, id_field: str = "id"):
+        """
+        List newest-updated first and stop at the stored watermark (delta),
+        or list everything and prune deletions (full).
+        """
+        scope = f"{kind}:{course_id}"
+        state = self.store.get_state(scope)
+        watermark = None if full or not state else state["watermark"]
+        params = {"per_page": 100, "sort": "updated_at", "order": "desc"}
+
+        items = []
+        for item in iter_fn(course_id, params=params):
+            # items at the watermark itself are listed again: another one
+            # may share that updated_at and not have been seen yet
+            if watermark and (item.get("updated_at") or "") < watermark:
+                break
+            items.append(item)
+
+        self._count(report, kind, self.store.upsert(kind, items, course_id=course_id, id_field=id_field))
+        if full:
+            self.store.prune(kind, [i[id_field] for i in items], course_id=course_id)
+        newest = max((i.get("updated_at") or "" for i in items), default=None)
+        self.store.set_state(scope, watermark=newest or None, full=full)
+
+    @staticmethod
+    def _count(report: Dict[str, Any], kind: str, changed: int):
+        report["changed"][kind] = report["changed"].get(kind, 0) + changed
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "last_report": self.last_report,
+            "last_error": self.last_error,
+            "user": self.store.get_state("user"),
+        }
+
+
+# -------------------------------------------------------------------
+# Shared store / engine (one per worker process)
+# -------------------------------------------------------------------
+_store: Optional[CanvasSnapshotStore] = None
+_engine: Optional[CanvasSyncEngine] = None
+_init_lock = threading.Lock()
+
+
+def get_sync_engine() -> CanvasSyncEngine:
+    global _store, _engine
+    if _engine is None:
+        with _init_lock:
+            if _engine is None:
+                _store = CanvasSnapshotStore()
+                _engine = CanvasSyncEngine(_store)
+    return _engine
+
+
+def start_sync(force_full: bool = False) -> bool:
+    """Run a sync on a background thread. Returns False if one is already running."""
+    engine = get_sync_engine()
+    if engine.running:
+        return False
+
+    def run():
+        try:
+            engine.sync(force_full=force_full)
+        except Exception:
+            pass  # recorded on the engine
+
+    threading.Thread(target=run, name="canvas-sync", daemon=True).start()
+    return True
+
+
+_periodic_started = False
+_leader_fd: Optional[int] = None
+
+
+def acquire_sync_leadership(lock_path: Optional[str] = None) -> bool:
+    """
+    Become the one process (of all workers sharing the snapshot) that runs
+    the periodic sync, through an exclusive flock held for the process'
+    lifetime. Released by the OS when the process exits, so another
+    worker takes over on its next attempt.
+    """
+    global _leader_fd
+    if _leader_fd is not None or fcntl is None:
+        return True
+    lock_path = lock_path or f"{get_sync_engine().store.path}.leader.lock"
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _leader_fd = fd
+    return True
+
+
+def start_periodic_sync(interval: float = CANVAS_SYNC_INTERVAL) -> bool:
+    """
+    Start a daemon thread syncing every `interval` seconds (no-op when 0).
+    Every worker runs the loop, but only the leader (see
+    acquire_sync_leadership) actually syncs.
+    """
+    global _periodic_started
+    if interval <= 0 or _periodic_started:
+        return False
+    _periodic_started = True
+    engine = get_sync_engine()
+
+    def loop():
+        while True:
+            try:
+                if acquire_sync_leadership():
+                    engine.sync()
+            except Exception:
+                pass  # recorded on the engine
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="canvas-sync-periodic", daemon=True).start()
+    return True
+
+
+def read_snapshot(kind: str, course_id: Optional[int] = None, parent_id: Optional[int] = None, limit: Optional[int] = None):
+    """
+    List resources from the snapshot, or None when the course has never been
+    synced (callers should then fall back to a live Canvas request).
+    """
+    store = get_sync_engine().store
+    scope = f"course:{course_id}" if course_id is not None else "user"
+    if store.get_state(scope) is None:
+        return None
+    return store.list(kind, course_id=course_id, parent_id=parent_id, limit=limit)
+
+
+def read_snapshot_item(kind: str, resource_id: int):
+    """Single resource from the snapshot, or None when it is not there."""
+    return get_sync_engine().store.get(kind, resource_id)
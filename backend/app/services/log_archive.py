@@ -0,0 +1,537 @@
+import os
+import sys
+import gzip
+import json
+import time
+import zlib
+import queue
+import atexit
+import shutil
+import struct
+import logging
+import threading
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, a single process is assumed
+    fcntl = None
+
+# -------------------------------------------------------------------
+# Log archive configuration
+# -------------------------------------------------------------------
+# frontend segments are compacted into columnar files this often
+LOG_ARCHIVE_COMPACT_INTERVAL = float(os.getenv("LOG_ARCHIVE_COMPACT_INTERVAL", 900))
+LOG_ARCHIVE_RETENTION_DAYS = float(os.getenv("LOG_ARCHIVE_RETENTION_DAYS", 30))
+LOG_ARCHIVE_COMPRESSION_LEVEL = int(os.getenv("LOG_ARCHIVE_COMPRESSION_LEVEL", 6))
+
+COLUMNAR_MAGIC = b"VLOGCOL1"
+COLUMNAR_SUFFIX = ".col"
+FRONTEND_STEM = "frontend_logs"
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------
+# columnar archive format
+# ---------------------------
+# COLUMNAR_MAGIC, a 4-byte big-endian header length, a JSON header, then
+# one zlib blob per column part. The header lists rows, the ts range and,
+# per column, its encoding and the (offset, length) of its parts, so a
+# reader decompresses only the columns a query touches:
+#   "ts":   epoch milliseconds, delta-encoded int64
+#   "dict": JSON list of distinct values + uint32 code per row
+#   "json": one JSON document per row (nested values such as `meta`)
+
+def _ts_ms(value) -> Optional[int]:
+    try:
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _dict_key(value):
+    return type(value).__name__, value
+
+
+def _try_lock(fd: int) -> bool:
+    """Non-blocking exclusive flock on `fd` (always granted without fcntl)."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def write_columnar(path: str, records: List[Dict[str, Any]], ts_field: str = "ts_server"):
+    """Write `records` (dicts) to a columnar archive file at `path`."""
+    names: List[str] = []
+    for record in records:
+        for key in record:
+            if key not in names:
+                names.append(key)
+
+    ts = [_ts_ms(r.get(ts_field)) or 0 for r in records]
+    blobs: List[bytes] = []
+    columns: Dict[str, Any] = {}
+
+    def add(data: bytes) -> List[int]:
+        offset = sum(len(b) for b in blobs)
+        blob = zlib.compress(data, LOG_ARCHIVE_COMPRESSION_LEVEL)
+        blobs.append(blob)
+        return [offset, len(blob)]
+
+    for name in names:
+        values = [r.get(name) for r in records]
+        if name == ts_field:
+            deltas = array("q", (b - a for a, b in zip([0] + ts, ts)))
+            columns[name] = {"encoding": "ts", "data": add(deltas.tobytes())}
+        elif any(isinstance(v, (dict, list)) for v in values):
+            data = "\n".join(json.dumps(v, ensure_ascii=False) for v in values)
+            columns[name] = {"encoding": "json", "data": add(data.encode("utf-8"))}
+        else:
+            # keyed by type too: 1 == True and hash alike but must stay distinct
+            dictionary: Dict[Any, int] = {}
+            codes = array("I", (dictionary.setdefault(_dict_key(v), len(dictionary)) for v in values))
+            columns[name] = {
+                "encoding": "dict",
+                "values": add(json.dumps([v for _t, v in dictionary], ensure_ascii=False).encode("utf-8")),
+                "codes": add(codes.tobytes()),
+                "cardinality": len(dictionary),
+            }
+
+    header = json.dumps({
+        "rows": len(records),
+        "ts_field": ts_field,
+        "ts_min": min(ts) if ts else None,
+        "ts_max": max(ts) if ts else None,
+        "byteorder": sys.byteorder,
+        "columns": columns,
+    }).encode("utf-8")
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(COLUMNAR_MAGIC)
+        fh.write(struct.pack(">I", len(header)))
+        fh.write(header)
+        for blob in blobs:
+            fh.write(blob)
+    os.replace(tmp, path)
+
+
+class ColumnarArchive:
+    """Read side of one columnar archive file; columns are decoded lazily and cached."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            if fh.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+                raise ValueError(f"Not a columnar log archive: {path}")
+            (size,) = struct.unpack(">I", fh.read(4))
+            self.header = json.loads(fh.read(size))
+            self._data_offset = len(COLUMNAR_MAGIC) + 4 + size
+        self.rows: int = self.header["rows"]
+        self._decoded: Dict[str, Any] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.header["columns"])
+
+    def overlaps(self, since_ms: Optional[int], until_ms: Optional[int]) -> bool:
+        if not self.rows:
+            return False
+        if since_ms is not None and self.header["ts_max"] < since_ms:
+            return False
+        if until_ms is not None and self.header["ts_min"] > until_ms:
+            return False
+        return True
+
+    def _part(self, span: List[int]) -> bytes:
+        with open(self.path, "rb") as fh:
+            fh.seek(self._data_offset + span[0])
+            return zlib.decompress(fh.read(span[1]))
+
+    def _array(self, typecode: str, data: bytes) -> array:
+        arr = array(typecode, data)
+        if self.header["byteorder"] != sys.byteorder:
+            arr.byteswap()
+        return arr
+
+    def timestamps(self) -> List[int]:
+        """Epoch milliseconds of every row."""
+        name = self.header["ts_field"]
+        if name not in self._decoded:
+            spec = self.header["columns"].get(name)
+            ts, total = [], 0
+            if spec is not None:
+                for delta in self._array("q", self._part(spec["data"])):
+                    total += delta
+                    ts.append(total)
+            self._decoded[name] = ts
+        return self._decoded[name]
+
+    def dictionary(self, name: str):
+        """(distinct values, per-row codes) of a dict-encoded column."""
+        key = f"dict:{name}"
+        if key not in self._decoded:
+            spec = self.header["columns"][name]
+            self._decoded[key] = (
+                json.loads(self._part(spec["values"])),
+                self._array("I", self._part(spec["codes"])),
+            )
+        return self._decoded[key]
+
+    def column(self, name: str) -> List[Any]:
+        """Every row's value of column `name` (None for columns this file lacks)."""
+        spec = self.header["columns"].get(name)
+        if spec is None:
+            return [None] * self.rows
+        if spec["encoding"] == "ts":
+            return [datetime.utcfromtimestamp(ms / 1000).isoformat(timespec="microseconds") + "Z" for ms in self.timestamps()]
+        if spec["encoding"] == "dict":
+            values, codes = self.dictionary(name)
+            return [values[c] for c in codes]
+        if name not in self._decoded:
+            lines = self._part(spec["data"]).decode("utf-8").split("\n")
+            self._decoded[name] = [json.loads(line) for line in lines] if self.rows else []
+        return self._decoded[name]
+
+    def select(
+        self,
+        since_ms: Optional[int] = None,
+        until_ms: Optional[int] = None,
+        equals: Optional[Dict[str, Any]] = None,
+        contains: Optional[Dict[str, str]] = None,
+    ) -> List[int]:
+        """
+        Row numbers matching every filter. Equality and substring filters on
+        dict-encoded columns are evaluated once per distinct value and then
+        by comparing codes, so the strings themselves are never expanded.
+        """
+        rows = range(self.rows)
+        if since_ms is not None or until_ms is not None:
+            ts = self.timestamps()
+            lo = since_ms if since_ms is not None else float("-inf")
+            hi = until_ms if until_ms is not None else float("inf")
+            rows = [i for i in rows if lo <= ts[i] <= hi]
+
+        filters = [(name, lambda v, want=want: v == want) for name, want in (equals or {}).items()]
+        filters += [
+            (name, lambda v, sub=sub.lower(): isinstance(v, str) and sub in v.lower())
+            for name, sub in (contains or {}).items()
+        ]
+        for name, test in filters:
+            spec = self.header["columns"].get(name)
+            if spec is None:
+                return []
+            if spec["encoding"] == "dict":
+                values, codes = self.dictionary(name)
+                wanted = {i for i, v in enumerate(values) if test(v)}
+                rows = [i for i in rows if codes[i] in wanted]
+            else:
+                column = self.column(name)
+                rows = [i for i in rows if test(column[i])]
+        return list(rows)
+
+
+# ---------------------------
+# archiver
+# ---------------------------
+class LogArchiver:
+    """
+    Background archival stage behind the rotating file handlers.
+
+    When a handler rolls over, the backup that would otherwise be deleted
+    is moved into logs/archive/spool/ (a rename, so the writer thread is
+    not held up) and queued here. This thread gzips it into
+    logs/archive/<stem>/, and every LOG_ARCHIVE_COMPACT_INTERVAL seconds
+    rewrites the gzipped frontend segments as one columnar file and drops
+    archive files older than LOG_ARCHIVE_RETENTION_DAYS.
+    """
+
+    def __init__(
+        self,
+        logs_dir: str,
+        compact_interval: float = LOG_ARCHIVE_COMPACT_INTERVAL,
+        retention_days: float = LOG_ARCHIVE_RETENTION_DAYS,
+    ):
+        self.archive_dir = os.path.join(logs_dir, "archive")
+        self.spool_dir = os.path.join(self.archive_dir, "spool")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.compact_interval = compact_interval
+        self.retention_days = retention_days
+        self.queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_compact = time.monotonic()
+        self._seq = 0
+        self.counters: Dict[str, Any] = {
+            "segments_compressed": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "compactions": 0,
+            "rows_compacted": 0,
+            "files_pruned": 0,
+            "errors": 0,
+        }
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, n in deltas.items():
+                self.counters[name] += n
+
+    def stem_dir(self, stem: str) -> str:
+        path = os.path.join(self.archive_dir, stem)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def submit(self, path: str):
+        """Take over a rotated segment; called from the handler's rollover."""
+        stem = os.path.basename(path).split(".")[0]
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        spooled = os.path.join(self.spool_dir, f"{stem}.{time.strftime('%Y%m%dT%H%M%S')}.{os.getpid()}.{seq}.log")
+        os.replace(path, spooled)
+        self.queue.put(spooled)
+
+    # ---------------------------
+    # archiver thread
+    # ---------------------------
+    def start(self):
+        if self._thread is None:
+            # segments left in the spool by a previous process
+            for name in sorted(os.listdir(self.spool_dir)):
+                if name.endswith(".log"):
+                    self.queue.put(os.path.join(self.spool_dir, name))
+            self._thread = threading.Thread(target=self._run, name="log-archiver", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._compress(self.queue.get(timeout=1.0))
+            except queue.Empty:
+                pass
+            if time.monotonic() - self._last_compact >= self.compact_interval:
+                self.compact()
+                self.prune()
+                self._last_compact = time.monotonic()
+        # finish what was already handed over
+        while True:
+            try:
+                self._compress(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def _compress(self, spooled: str):
+        stem = os.path.basename(spooled).split(".")[0]
+        target = os.path.join(self.stem_dir(stem), os.path.basename(spooled)[len(stem) + 1:] + ".gz")
+        tmp = f"{target}.{os.getpid()}.tmp"
+        try:
+            with open(spooled, "rb") as src:
+                # every worker re-queues the spool on start: whoever holds
+                # the segment's lock archives it, the others skip it
+                if not _try_lock(src.fileno()) or not os.path.exists(spooled):
+                    return
+                with gzip.open(tmp, "wb", compresslevel=LOG_ARCHIVE_COMPRESSION_LEVEL) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.replace(tmp, target)
+                size_in, size_out = os.path.getsize(spooled), os.path.getsize(target)
+                os.remove(spooled)
+        except FileNotFoundError:
+            return  # archived by another worker meanwhile
+        except OSError:
+            logger.exception("Could not archive log segment %s", spooled)
+            self._count(errors=1)
+            return
+        self._count(segments_compressed=1, bytes_in=size_in, bytes_out=size_out)
+
+    def compact(self) -> int:
+        """
+        Fold the gzipped frontend segments into one columnar file; returns
+        rows written. Workers sharing the archive take turns through a
+        flock on archive/.compact.lock: a worker that finds it held skips
+        this round, and segments are listed only once the lock is held, so
+        no segment is read by two compactions.
+        """
+        with self._compact_lock:
+            fd = os.open(os.path.join(self.archive_dir, ".compact.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if not _try_lock(fd):
+                    return 0
+                return self._compact()
+            finally:
+                # closing the descriptor releases the flock
+                os.close(fd)
+
+    def _compact(self) -> int:
+        directory = self.stem_dir(FRONTEND_STEM)
+        segments = sorted(
+            os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(".log.gz")
+        )
+        if not segments:
+            return 0
+        records = []
+        try:
+            for segment in segments:
+                with gzip.open(segment, "rt", encoding="utf-8") as fh:
+                    for line in fh:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if isinstance(record, dict):
+                            records.append(record)
+            records.sort(key=lambda r: str(r.get("ts_server") or ""))
+            name = time.strftime("%Y%m%dT%H%M%S") + f".{os.getpid()}" + COLUMNAR_SUFFIX
+            write_columnar(os.path.join(directory, name), records)
+            for segment in segments:
+                os.remove(segment)
+        except (OSError, EOFError, zlib.error):
+            logger.exception("Could not compact frontend log archive")
+            self._count(errors=1)
+            return 0
+        self._count(compactions=1, rows_compacted=len(records))
+        return len(records)
+
+    def prune(self) -> int:
+        cutoff = time.time() - self.retention_days * 86400
+        pruned = 0
+        for stem in os.listdir(self.archive_dir):
+            directory = os.path.join(self.archive_dir, stem)
+            if stem == "spool" or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        pruned += 1
+                except OSError:
+                    continue
+        self._count(files_pruned=pruned)
+        return pruned
+
+    # ---------------------------
+    # queries
+    # ---------------------------
+    def frontend_archives(self) -> Iterator[ColumnarArchive]:
+        directory = self.stem_dir(FRONTEND_STEM)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(COLUMNAR_SUFFIX):
+                try:
+                    yield ColumnarArchive(os.path.join(directory, name))
+                except (OSError, ValueError):
+                    continue
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        level: Optional[str] = None,
+        ip: Optional[str] = None,
+        q: Optional[str] = None,
+        group_by: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        Query the compacted frontend archive. Files outside [since, until]
+        are skipped from their header; inside a file only the filtered,
+        grouped or returned columns are decompressed. With `group_by` the
+        result is a count per distinct value, else up to `limit` records.
+        """
+        since_ms = int(since * 1000) if since is not None else None
+        until_ms = int(until * 1000) if until is not None else None
+        equals = {k: v for k, v in (("level", level), ("ip", ip)) if v is not None}
+        contains = {"message": q} if q else {}
+
+        counts: Dict[Any, int] = {}
+        records: List[Dict[str, Any]] = []
+        files = matched = 0
+        for archive in self.frontend_archives():
+            if not archive.overlaps(since_ms, until_ms):
+                continue
+            files += 1
+            rows = archive.select(since_ms, until_ms, equals, contains)
+            matched += len(rows)
+            if group_by:
+                spec = archive.header["columns"].get(group_by)
+                if spec is not None and spec["encoding"] == "dict":
+                    values, codes = archive.dictionary(group_by)
+                    for i in rows:
+                        key = _dict_key(values[codes[i]])
+                        counts[key] = counts.get(key, 0) + 1
+                else:
+                    column = archive.column(group_by)
+                    for i in rows:
+                        value = json.dumps(column[i]) if isinstance(column[i], (dict, list)) else column[i]
+                        key = _dict_key(value)
+                        counts[key] = counts.get(key, 0) + 1
+            elif len(records) < limit:
+                names = columns or archive.columns
+                data = {name: archive.column(name) for name in names}
+                for i in rows[: limit - len(records)]:
+                    records.append({name: data[name][i] for name in names})
+
+        result: Dict[str, Any] = {"files": files, "matched": matched}
+        if group_by:
+            result["groups"] = [
+                {"value": value, "count": count}
+                for (_type, value), count in sorted(counts.items(), key=lambda kv: -kv[1])[:limit]
+            ]
+        else:
+            result["records"] = records
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        sizes: Dict[str, Dict[str, int]] = {}
+        for stem in os.listdir(self.archive_dir):
+            directory = os.path.join(self.archive_dir, stem)
+            if stem == "spool" or not os.path.isdir(directory):
+                continue
+            names = os.listdir(directory)
+            sizes[stem] = {
+                "files": len(names),
+                "bytes": sum(os.path.getsize(os.path.join(directory, n)) for n in names),
+            }
+        with self._lock:
+            counters = dict(self.counters)
+        ratio = counters["bytes_out"] / counters["bytes_in"] if counters["bytes_in"] else 0.0
+        return {
+            **counters,
+            "compression_ratio": round(ratio, 4),
+            "pending": self.queue.qsize(),
+            "archive": sizes,
+            "retention_days": self.retention_days,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
+
+
+_log_archiver: Optional[LogArchiver] = None
+
+
+def install_log_archiver(logs_dir: str) -> LogArchiver:
+    """Start the archiver for `logs_dir` once per process (see install_log_writer)."""
+    global _log_archiver
+    if _log_archiver is None:
+        _log_archiver = LogArchiver(logs_dir)
+        _log_archiver.start()
+    return _log_archiver
+
+
+def get_log_archiver() -> Optional[LogArchiver]:
+    return _log_archiver
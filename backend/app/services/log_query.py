@@ -0,0 +1,333 @@
+import os
+import re
+import json
+import time
+import mmap
+import bisect
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# -------------------------------------------------------------------
+# Log query configuration
+# -------------------------------------------------------------------
+# one sparse index entry (timestamp -> byte offset) per this many bytes of log
+LOG_INDEX_STRIDE = int(os.getenv("LOG_INDEX_STRIDE", 64 * 1024))
+LOG_TAIL_POLL_INTERVAL = float(os.getenv("LOG_TAIL_POLL_INTERVAL", 0.5))
+LOG_TAIL_HEARTBEAT = float(os.getenv("LOG_TAIL_HEARTBEAT", 15))
+
+LOG_SOURCES = {
+    "backend": "backend_logs.txt",
+    "frontend": "frontend_logs.txt",
+}
+
+# "2025-01-31 12:00:00,123 app.module INFO message" (configure_logging's formatter)
+_BACKEND_LINE = re.compile(rb"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) (\S+) ([A-Z]+) (.*)$")
+_LEVEL_NAMES = {"warning": "warn", "critical": "error"}
+
+
+def _normalize_level(level: str) -> str:
+    level = level.lower()
+    return _LEVEL_NAMES.get(level, level)
+
+
+def parse_backend_line(line: bytes) -> Optional[Dict[str, Any]]:
+    m = _BACKEND_LINE.match(line)
+    if not m:
+        return None
+    # asctime is local time
+    ts = time.mktime(time.strptime(m.group(1).decode("ascii"), "%Y-%m-%d %H:%M:%S")) + int(m.group(2)) / 1000
+    return {
+        "ts": ts,
+        "logger": m.group(3).decode("utf-8", "replace"),
+        "level": _normalize_level(m.group(4).decode("ascii")),
+        "message": m.group(5).decode("utf-8", "replace"),
+    }
+
+
+def parse_frontend_line(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        record = json.loads(line)
+        ts = datetime.fromisoformat(record["ts_server"].replace("Z", "+00:00")).timestamp()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    return {**record, "ts": ts}
+
+
+_PARSERS = {"backend": parse_backend_line, "frontend": parse_frontend_line}
+
+
+def _line_ts(source: str, line: bytes) -> Optional[float]:
+    if source == "backend":
+        # cheaper than a full parse: the timestamp is a fixed-width prefix
+        if len(line) < 23 or line[4:5] != b"-" or line[19:20] != b",":
+            return None
+        try:
+            return time.mktime(time.strptime(line[:19].decode("ascii"), "%Y-%m-%d %H:%M:%S")) + int(line[20:23]) / 1000
+        except ValueError:
+            return None
+    record = parse_frontend_line(line)
+    return record["ts"] if record else None
+
+
+class LogFileIndex:
+    """
+    Sparse sidecar index of one log file: (timestamp, byte offset) of the
+    first record starting after every LOG_INDEX_STRIDE bytes. Stored as JSON
+    next to the logs and extended incrementally as the file grows; rebuilt
+    when the path now holds a different file (rotation) or shrank.
+    """
+
+    def __init__(self, source: str, path: str, index_dir: str, stride: int = LOG_INDEX_STRIDE):
+        self.source = source
+        self.path = path
+        self.stride = stride
+        self.index_path = os.path.join(index_dir, os.path.basename(path) + ".idx.json")
+        self.inode = None
+        self.size = 0
+        self.entries: List[Tuple[float, int]] = []
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as fh:
+                saved = json.load(fh)
+            self.inode = saved["inode"]
+            self.size = saved["size"]
+            self.entries = [tuple(e) for e in saved["entries"]]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save(self):
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"inode": self.inode, "size": self.size, "entries": self.entries}, fh)
+        os.replace(tmp, self.index_path)
+
+    def refresh(self) -> bool:
+        """Bring the index up to date with the file; False when the file is gone."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if st.st_ino != self.inode or st.st_size < self.size:
+            self.inode, self.size, self.entries = st.st_ino, 0, []
+        if st.st_size == self.size:
+            return True
+
+        with open(self.path, "rb") as fh:
+            fh.seek(self.size)
+            offset = self.size
+            next_mark = (self.entries[-1][1] + self.stride) if self.entries else 0
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break  # partial line being written: index it next time
+                if offset >= next_mark:
+                    ts = _line_ts(self.source, line)
+                    if ts is not None:
+                        self.entries.append((ts, offset))
+                        next_mark = offset + self.stride
+                offset += len(line)
+        self.size = offset
+        self._save()
+        return True
+
+    def seek_offset(self, since: Optional[float]) -> int:
+        """Offset of an indexed record at or before `since` (0 when unknown)."""
+        if since is None or not self.entries:
+            return 0
+        pos = bisect.bisect_right([ts for ts, _ in self.entries], since) - 1
+        # records from concurrent threads may be slightly out of order:
+        # start one stride early
+        return self.entries[max(pos - 1, 0)][1] if pos >= 0 else 0
+
+    def first_ts(self) -> Optional[float]:
+        return self.entries[0][0] if self.entries else None
+
+
+class LogQueryEngine:
+    """Search and tail backend/frontend logs, including rotated files."""
+
+    def __init__(self, logs_dir: str):
+        self.logs_dir = logs_dir
+        self.index_dir = os.path.join(logs_dir, ".index")
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._indexes: Dict[str, LogFileIndex] = {}
+        self._lock = threading.Lock()
+
+    def files(self, source: str) -> List[str]:
+        """Existing files of a source, oldest (highest rotation number) first."""
+        base = os.path.join(self.logs_dir, LOG_SOURCES[source])
+        rotated = []
+        for name in os.listdir(self.logs_dir):
+            suffix = name[len(LOG_SOURCES[source]) + 1:]
+            if name.startswith(LOG_SOURCES[source] + ".") and suffix.isdigit():
+                rotated.append((int(suffix), os.path.join(self.logs_dir, name)))
+        paths = [p for _n, p in sorted(rotated, reverse=True)]
+        if os.path.exists(base):
+            paths.append(base)
+        return paths
+
+    def _index(self, source: str, path: str) -> LogFileIndex:
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is None:
+                index = self._indexes[path] = LogFileIndex(source, path, self.index_dir)
+            try:
+                inode = os.stat(path).st_ino
+            except OSError:
+                inode = index.inode
+            if inode != index.inode:
+                # rotation renames files, so the inode now at `path` was most
+                # likely indexed under its previous name: reuse that work
+                for other in self._indexes.values():
+                    if other is not index and other.inode == inode:
+                        index.inode, index.size, index.entries = other.inode, other.size, list(other.entries)
+                        break
+            index.refresh()
+            return index
+
+    def _records(self, source: str, path: str, start: int) -> Iterator[Dict[str, Any]]:
+        """Parsed records of a file from byte offset `start` (continuation lines folded in)."""
+        parse = _PARSERS[source]
+        with open(path, "rb") as fh:
+            try:
+                mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                return  # empty file
+            with mm:
+                mm.seek(start)
+                current = None
+                for line in iter(mm.readline, b""):
+                    record = parse(line.rstrip(b"\r\n"))
+                    if record is not None:
+                        if current is not None:
+                            yield current
+                        current = record
+                    elif current is not None and source == "backend":
+                        # traceback / multi-line message
+                        current["message"] += "\n" + line.rstrip(b"\r\n").decode("utf-8", "replace")
+                if current is not None:
+                    yield current
+
+    def search(
+        self,
+        source: str = "all",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        level: Optional[str] = None,
+        ip: Optional[str] = None,
+        q: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """Records matching every given filter, oldest first, at most `limit`."""
+        sources = list(LOG_SOURCES) if source == "all" else [source]
+        results: List[Dict[str, Any]] = []
+        scanned = 0
+        matcher = make_matcher(level=level, ip=ip, q=q)
+
+        for src in sources:
+            found = 0
+            paths = self.files(src)
+            for i, path in enumerate(paths):
+                index = self._index(src, path)
+                # skip files that end before the window: the next file starts later
+                if since is not None and i + 1 < len(paths):
+                    next_first = self._index(src, paths[i + 1]).first_ts()
+                    if next_first is not None and next_first < since:
+                        continue
+                if until is not None and index.first_ts() is not None and index.first_ts() > until:
+                    break
+                for record in self._records(src, path, index.seek_offset(since)):
+                    scanned += 1
+                    if since is not None and record["ts"] < since:
+                        continue
+                    if until is not None and record["ts"] > until:
+                        break
+                    if matcher(record):
+                        results.append({**record, "source": src})
+                        found += 1
+                        if found > limit:
+                            break
+                if found > limit:
+                    break
+
+        results.sort(key=lambda r: r["ts"])
+        return {"records": results[:limit], "truncated": len(results) > limit, "scanned": scanned}
+
+    def tail(self, source: str, matcher, stop: threading.Event = None) -> Iterator[Optional[Dict[str, Any]]]:
+        """
+        Follow the current file of `source` from its end, yielding matching
+        records as they are written (and None as a heartbeat while idle).
+        Rotation is detected by inode change or truncation.
+        """
+        path = os.path.join(self.logs_dir, LOG_SOURCES[source])
+        parse = _PARSERS[source]
+        fh, inode, buffer = None, None, b""
+        idle = 0.0
+        first_open = True
+        try:
+            while stop is None or not stop.is_set():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    st = None
+                if st is not None and (fh is None or st.st_ino != inode or st.st_size < fh.tell()):
+                    if fh is not None:
+                        # drain what was written before the rotation
+                        buffer += fh.read()
+                        fh.close()
+                    fh, inode = open(path, "rb"), st.st_ino
+                    if first_open:
+                        fh.seek(0, os.SEEK_END)
+                        first_open = False
+
+                data = fh.read() if fh is not None else b""
+                if data:
+                    idle = 0.0
+                    buffer += data
+                    *lines, buffer = buffer.split(b"\n")
+                    for line in lines:
+                        record = parse(line)
+                        if record is not None and matcher(record):
+                            yield {**record, "source": source}
+                    continue
+
+                time.sleep(LOG_TAIL_POLL_INTERVAL)
+                idle += LOG_TAIL_POLL_INTERVAL
+                if idle >= LOG_TAIL_HEARTBEAT:
+                    idle = 0.0
+                    yield None
+        finally:
+            if fh is not None:
+                fh.close()
+
+
+def make_matcher(level: Optional[str] = None, ip: Optional[str] = None, q: Optional[str] = None):
+    q_lower = q.lower() if q else None
+
+    def matches(record: Dict[str, Any]) -> bool:
+        if level and record.get("level") != level:
+            return False
+        if ip:
+            # frontend records carry the client ip; backend lines (access
+            # logs) only mention it in the message
+            if record.get("ip") != ip and ip not in record.get("message", ""):
+                return False
+        if q_lower and q_lower not in record.get("message", "").lower():
+            return False
+        return True
+
+    return matches
+
+
+_engines: Dict[str, LogQueryEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_log_query_engine(logs_dir: str) -> LogQueryEngine:
+    with _engines_lock:
+        engine = _engines.get(logs_dir)
+        if engine is None:
+            engine = _engines[logs_dir] = LogQueryEngine(logs_dir)
+        return engine
@@ -0,0 +1,276 @@
+import os
+import re
+import stat
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+# -------------------------------------------------------------------
+# Log writer configuration
+# -------------------------------------------------------------------
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10_000))
+# a commit happens after this many seconds or this many records, whichever first
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 0.5))
+LOG_FLUSH_MAX_RECORDS = int(os.getenv("LOG_FLUSH_MAX_RECORDS", 512))
+# "never": leave it to the OS, "commit": fsync every commit,
+# "interval": fsync at most every LOG_FSYNC_INTERVAL seconds
+LOG_FSYNC = os.getenv("LOG_FSYNC", "interval")
+LOG_FSYNC_INTERVAL = float(os.getenv("LOG_FSYNC_INTERVAL", 5))
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that leaves records in the stream buffer instead of
+    flushing after every one; `commit()` writes (and optionally fsyncs)
+    everything buffered since the last commit.
+
+    The file size is tracked in memory (seeded from fstat when the file is
+    opened): the inherited shouldRollover seeks to the end of the stream
+    for every record, which flushes the buffer and defeats the grouping.
+
+    With an `archiver` (services/log_archive.py), the oldest backup is handed
+    over at rollover instead of being deleted.
+    """
+
+    # bytes in the current file, including what is still buffered
+    _size = 0
+    # size of the record that triggered a rollover; it opens the next file
+    _carry = 0
+    _regular = True
+
+    def __init__(self, *args, archiver=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.archiver = archiver
+
+    def _open(self):
+        stream = super()._open()
+        st = os.fstat(stream.fileno())
+        # logging to a device or pipe (/dev/null...) never rolls over
+        self._regular = stat.S_ISREG(st.st_mode)
+        self._size = st.st_size + self._carry
+        self._carry = 0
+        return stream
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes <= 0 or not self._regular:
+            return False
+        text = self.format(record) + self.terminator
+        size = len(text.encode(self.encoding or "utf-8", "replace"))
+        if self._size > 0 and self._size + size >= self.maxBytes:
+            self._carry = size
+            return True
+        self._size += size
+        return False
+
+    def doRollover(self):
+        if self.archiver is not None and self.backupCount > 0:
+            oldest = self.rotation_filename(f"{self.baseFilename}.{self.backupCount}")
+            if os.path.exists(oldest):
+                try:
+                    self.archiver.submit(oldest)
+                except OSError:
+                    pass  # rollover deletes it as before
+        super().doRollover()  # reopens the file, unless delay=True defers it
+
+    def flush(self):
+        pass
+
+    def commit(self, fsync: bool = False):
+        self.acquire()
+        try:
+            if self.stream and not self.stream.closed:
+                self.stream.flush()
+                if fsync:
+                    os.fsync(self.stream.fileno())
+        finally:
+            self.release()
+
+    def close(self):
+        self.commit()
+        super().close()
+
+
+class RedactSecretsFilter(logging.Filter):
+    """
+    Masks credentials passed in URLs (access log lines such as
+    "GET /logs/tail?ticket=..." or a Referer with ?token=) before a record
+    is written, so /logs/search never serves them back.
+    """
+
+    PATTERN = re.compile(r"([?&](?:token|ticket|access_token|refresh_token)=)[^&\s\"']+")
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        redacted = self.PATTERN.sub(r"\1[redacted]", message)
+        if redacted != message:
+            record.msg, record.args = redacted, None
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped and counted."""
+
+    def __init__(self, q: "queue.Queue", writer: "LogWriter"):
+        super().__init__(q)
+        self.writer = writer
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            self.writer._count("enqueued")
+        except queue.Full:
+            self.writer._count("dropped", record.levelname)
+
+
+class LogWriter:
+    """
+    Single background writer for every log handler of the app.
+
+    Request threads only put records on a bounded queue (DroppingQueueHandler).
+    The writer thread drains it in groups, hands each record to the handlers
+    (filters and levels apply as usual) and commits the buffered files once
+    per group, so disk writes and fsyncs are amortized over many records.
+    """
+
+    def __init__(
+        self,
+        handlers: List[logging.Handler],
+        queue_size: int = LOG_QUEUE_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        flush_max_records: int = LOG_FLUSH_MAX_RECORDS,
+        fsync: str = LOG_FSYNC,
+        fsync_interval: float = LOG_FSYNC_INTERVAL,
+    ):
+        if fsync not in ("never", "commit", "interval"):
+            raise ValueError(f"Unknown LOG_FSYNC policy: {fsync}")
+        self.handlers = handlers
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.flush_interval = flush_interval
+        self.flush_max_records = flush_max_records
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_fsync = time.monotonic()
+        self.counters: Dict[str, Any] = {
+            "enqueued": 0,
+            "written": 0,
+            "commits": 0,
+            "fsyncs": 0,
+            "dropped": 0,
+            "dropped_by_level": {},
+            "last_commit_ms": 0.0,
+            "last_batch": 0,
+        }
+
+    def _count(self, name: str, level: Optional[str] = None, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+            if level is not None:
+                by_level = self.counters["dropped_by_level"]
+                by_level[level] = by_level.get(level, 0) + n
+
+    def queue_handler(self) -> DroppingQueueHandler:
+        return DroppingQueueHandler(self.queue, self)
+
+    # ---------------------------
+    # writer thread
+    # ---------------------------
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._drain()
+        for handler in self.handlers:
+            handler.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain(block=True)
+
+    def _drain(self, block: bool = False):
+        batch = []
+        try:
+            if block:
+                batch.append(self.queue.get(timeout=self.flush_interval))
+            while len(batch) < self.flush_max_records:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[logging.LogRecord]):
+        started = time.perf_counter()
+        for record in batch:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+        now = time.monotonic()
+        fsync = self.fsync == "commit" or (
+            self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval
+        )
+        for handler in self.handlers:
+            if isinstance(handler, BufferedRotatingFileHandler):
+                try:
+                    handler.commit(fsync=fsync)
+                except OSError:
+                    handler.handleError(batch[-1])
+            else:
+                handler.flush()
+        if fsync:
+            self._last_fsync = now
+
+        with self._lock:
+            self.counters["written"] += len(batch)
+            self.counters["commits"] += 1
+            self.counters["fsyncs"] += 1 if fsync else 0
+            self.counters["last_batch"] = len(batch)
+            self.counters["last_commit_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "dropped_by_level": dict(self.counters["dropped_by_level"]),
+                "queue_depth": self.queue.qsize(),
+                "queue_size": self.queue.maxsize,
+                "fsync": self.fsync,
+                "running": self._thread is not None and self._thread.is_alive(),
+            }
+
+
+_log_writer: Optional[LogWriter] = None
+
+
+def install_log_writer(handlers: List[logging.Handler], logger: Optional[logging.Logger] = None) -> LogWriter:
+    """
+    Route `logger` (root by default) through one LogWriter feeding
+    `handlers`. Idempotent: calling create_app() again keeps the running
+    writer instead of stacking a second one.
+    """
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = LogWriter(handlers)
+        _log_writer.start()
+        logger = logger or logging.getLogger()
+        logger.addHandler(_log_writer.queue_handler())
+    return _log_writer
+
+
+def get_log_writer() -> Optional[LogWriter]:
+    return _log_writer
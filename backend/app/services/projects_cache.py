@@ -0,0 +1,233 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import itertools
+import threading
+from typing import Any, Dict, Optional
+
+from cachetools import LRUCache, TTLCache
+
+# -------------------------------------------------------------------
+# Projects cache configuration
+# -------------------------------------------------------------------
+# "memory" (per process), "sqlite" (shared by all workers on a host), "off",
+# or "auto": sqlite when the server runs several worker processes
+PROJECTS_CACHE_BACKEND = os.getenv("PROJECTS_CACHE_BACKEND", "auto")
+PROJECTS_CACHE_PATH = os.getenv(
+    "PROJECTS_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "projects_cache.sqlite3"),
+)
+# safety net for rows changed outside projects_service (SQL console, other apps)
+PROJECTS_CACHE_TTL = float(os.getenv("PROJECTS_CACHE_TTL", 60))
+PROJECTS_CACHE_MAX_ENTRIES = int(os.getenv("PROJECTS_CACHE_MAX_ENTRIES", 5000))
+
+
+class MemoryBackend:
+    """Per-process backend: fastest, but each gunicorn worker has its own copy."""
+
+    def __init__(self, max_entries: int = PROJECTS_CACHE_MAX_ENTRIES, ttl: float = PROJECTS_CACHE_TTL):
+        self._values = TTLCache(maxsize=max_entries, ttl=ttl)
+        # bounded too: a user whose version was evicted gets a number never
+        # handed out before, so an evicted version can never resurrect
+        # values cached under an older one
+        self._versions = LRUCache(maxsize=max_entries)
+        self._next_version = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._values.get(key)
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._values[key] = value
+
+    def version(self, scope: str) -> int:
+        with self._lock:
+            version = self._versions.get(scope)
+            if version is None:
+                version = self._versions[scope] = next(self._next_version)
+            return version
+
+    def bump(self, scope: str):
+        with self._lock:
+            self._versions[scope] = next(self._next_version)
+
+
+class SQLiteBackend:
+    """
+    Backend shared by every worker process on the host through one SQLite
+    file (WAL mode), so a write handled by one worker invalidates the
+    cached lists of all others.
+    """
+
+    _SCHEMA = """
+    create table if not exists cache_values (
+      key text primary key,
+      value text not null,
+      expires_at real not null
+    );
+    create table if not exists cache_versions (
+      scope text primary key,
+      version integer not null
+    );
+    """
+
+    def __init__(self, path: str = PROJECTS_CACHE_PATH, ttl: float = PROJECTS_CACHE_TTL, max_entries: int = PROJECTS_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(self._SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "select value from cache_values where key = ? and expires_at > ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any):
+        conn = self._conn()
+        conn.execute(
+            "insert or replace into cache_values (key, value, expires_at) values (?, ?, ?)",
+            (key, json.dumps(value, default=str), time.time() + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._trim(conn)
+
+    def _trim(self, conn: sqlite3.Connection):
+        conn.execute("delete from cache_values where expires_at <= ?", (time.time(),))
+        conn.execute(
+            """
+            delete from cache_values where key in (
+              select key from cache_values order by expires_at desc limit -1 offset ?
+            )
+            """,
+            (self.max_entries,),
+        )
+
+    def version(self, scope: str) -> int:
+        row = self._conn().execute("select version from cache_versions where scope = ?", (scope,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, scope: str):
+        self._conn().execute(
+            """
+            insert into cache_versions (scope, version) values (?, 1)
+            on conflict (scope) do update set version = version + 1
+            """,
+            (scope,),
+        )
+
+
+class ProjectsCache:
+    """
+    Per-user read-through cache for project reads.
+
+    Every user has a version number; cached values are keyed by
+    (user, version, query). A write bumps the user's version, which makes
+    every list cached for that user unreachable at once, on every worker
+    sharing the backend. Old keys simply age out.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def get_or_load(self, user_id: str, name: str, params: Dict[str, Any], loader):
+        if self.backend is None:
+            return loader()
+        try:
+            version = self.backend.version(user_id)
+            key = f"{user_id}:{version}:{name}:{json.dumps(params, sort_keys=True, default=str)}"
+            cached = self.backend.get(key)
+        except Exception:
+            # a broken cache must never break reads
+            with self._lock:
+                self.errors += 1
+            return loader()
+
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached
+
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        try:
+            self.backend.set(key, value)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+        return value
+
+    def invalidate(self, user_id: str):
+        if self.backend is None:
+            return
+        try:
+            self.backend.bump(user_id)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__ if self.backend else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+            }
+
+
+def worker_count() -> int:
+    """Number of server worker processes, from gunicorn's environment."""
+    if os.getenv("WEB_CONCURRENCY", "").strip().isdigit():
+        return int(os.environ["WEB_CONCURRENCY"])
+    m = re.search(r"(?:^|\s)(?:-w|--workers)(?:=|\s*)(\d+)", os.getenv("GUNICORN_CMD_ARGS", ""))
+    return int(m.group(1)) if m else 1
+
+
+def make_backend(name: str = PROJECTS_CACHE_BACKEND):
+    workers = worker_count()
+    if name == "auto":
+        name = "sqlite" if workers > 1 else "memory"
+    if name == "memory":
+        if workers > 1:
+            # a write seen by one worker would leave the others serving
+            # (and 304-ing) stale lists until the TTL runs out
+            raise ValueError(
+                f"PROJECTS_CACHE_BACKEND=memory cannot be shared by {workers} workers; use sqlite or off"
+            )
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "off":
+        return None
+    raise ValueError(f"Unknown PROJECTS_CACHE_BACKEND: {name}")
@@ -1,33 +1,312 @@
 # services/projects_service.py
 import os
+import json
+import uuid
+import base64
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
 from ..auth.supabase_client import supabase_client
+from .resilience import resilient_call, CircuitOpenError
+from .projects_cache import ProjectsCache, make_backend
 
 
 supabase = supabase_client
+# per-user read-through cache; every write below invalidates the user's entries
+projects_cache = ProjectsCache(make_backend())
+
+# columns list_projects can sort on; the keyset is always (column, id)
+PROJECT_SORT_COLUMNS = ("created_at", "updated_at")
+PROJECT_PAGE_DEFAULT = int(os.getenv("PROJECTS_PAGE_SIZE", 50))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, row: dict) -> str:
+    column = sort.lstrip("-")
+    raw = json.dumps([sort, row[column], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str):
+    """Return the (sort value, id) a page starts after."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_sort != sort:
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    # both values end up in a PostgREST filter: accept nothing but a timestamp and a uuid
+    try:
+        datetime.fromisoformat(value)
+        row_id = str(uuid.UUID(row_id))
+    except (ValueError, TypeError, AttributeError):
+        raise InvalidCursor("Malformed cursor")
+    return value, row_id
+
+
+def list_projects(
+    user_id: str,
+    limit: int = PROJECT_PAGE_DEFAULT,
+    cursor: Optional[str] = None,
+    sort: str = "-created_at",
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    subject: Optional[str] = None,
+    due_after: Optional[date] = None,
+    due_before: Optional[date] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Return one page of a user's projects and the cursor of the next page
+    (None on the last page).
+
+    Pages are keyset-paginated on (sort column, id), so every page costs
+    the same index range scan however deep into the list it is.
+    """
+    params = {
+        "limit": limit, "cursor": cursor, "sort": sort, "status": status, "priority": priority,
+        "subject": subject, "due_after": due_after, "due_before": due_before,
+    }
+    rows, next_cursor = projects_cache.get_or_load(user_id, "list", params, lambda: _list_projects(user_id, **params))
+    return rows, next_cursor
+
+
+def _list_projects(
+    user_id: str,
+    limit: int,
+    cursor: Optional[str],
+    sort: str,
+    status: Optional[str],
+    priority: Optional[str],
+    subject: Optional[str],
+    due_after: Optional[date],
+    due_before: Optional[date],
+) -> Tuple[List[dict], Optional[str]]:
+    column = sort.lstrip("-")
+    desc = sort.startswith("-")
+    if column not in PROJECT_SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort: {sort}")
+
+    query = supabase.table("projects").select("*").eq("user_id", user_id)
+    if status:
+        query = query.eq("status", status)
+    if priority:
+        query = query.eq("priority", priority)
+    if subject:
+        query = query.eq("subject", subject)
+    if due_after:
+        query = query.gte("due_date", due_after.isoformat())
+    if due_before:
+        query = query.lte("due_date", due_before.isoformat())
+    if cursor:
+        value, row_id = decode_cursor(sort, cursor)
+        op = "lt" if desc else "gt"
+        query = query.or_(f'{column}.{op}."{value}",and({column}.eq."{value}",id.{op}.{row_id})')
+
+    # one extra row tells us whether there is a next page
+    query = query.order(column, desc=desc).order("id", desc=desc).limit(limit + 1)
+    res = resilient_call("supabase", query.execute)
+    rows = res.data or []
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1])
+    return rows, next_cursor
+
+def projects_version(user_id: str) -> Tuple[Optional[str], int]:
+    """
+    (max updated_at, row count) of a user's projects: changes whenever a
+    project is created, updated (set_updated_at trigger) or deleted, and
+    costs a single index lookup instead of reading the rows.
+    """
+    return tuple(projects_cache.get_or_load(user_id, "version", {}, lambda: _projects_version(user_id)))
+
+
+def _projects_version(user_id: str) -> Tuple[Optional[str], int]:
+    res = resilient_call(
+        "supabase",
+        supabase.table("projects")
+        .select("updated_at", count="exact")
+        .eq("user_id", user_id)
+        .order("updated_at", desc=True)
+        .limit(1)
+        .execute,
+    )
+    latest = res.data[0]["updated_at"] if res.data else None
+    return latest, res.count or 0
 
-def list_projects(user_id: str):
-    res = supabase.table("projects").select("*").eq("user_id", user_id).order("created_at", desc=True).execute()
-    return res.data or []
 
 def create_project(user_id: str, payload: dict):
     payload = {**payload, "user_id": user_id}
-    res = supabase.table("projects").insert(payload).select("*").single().execute()
+    try:
+        res = resilient_call(
+            "supabase",
+            supabase.table("projects").insert(payload).select("*").single().execute,
+            idempotent=False,
+        )
+    finally:
+        # also on errors: the write may have landed before the failure
+        projects_cache.invalidate(user_id)
     return res.data
 
 def update_project(user_id: str, project_id: str, payload: dict):
-    res = (
-        supabase.table("projects")
-        .update(payload)
-        .eq("id", project_id)
-        .eq("user_id", user_id)
-        .select("*")
-        .single()
-        .execute()
-    )
+    try:
+        res = resilient_call(
+            "supabase",
+            supabase.table("projects")
+            .update(payload)
+            .eq("id", project_id)
+            .eq("user_id", user_id)
+            .select("*")
+            .single()
+            .execute,
+            idempotent=False,
+        )
+    finally:
+        projects_cache.invalidate(user_id)
     if not res.data:
         raise ValueError("Project not found or not owned by user")
     return res.data
 
 def delete_project(user_id: str, project_id: str):
-    res = supabase.table("projects").delete().eq("id", project_id).eq("user_id", user_id).execute()
+    try:
+        resilient_call(
+            "supabase",
+            supabase.table("projects").delete().eq("id", project_id).eq("user_id", user_id).execute,
+            idempotent=False,
+        )
+    finally:
+        projects_cache.invalidate(user_id)
     return True
+
+# columns a batch update may change
+PROJECT_UPDATABLE = ("title", "description", "subject", "priority", "due_date", "status")
+
+
+def _jsonable(payload: dict) -> dict:
+    return {k: v.isoformat() if isinstance(v, date) else v for k, v in payload.items()}
+
+
+def batch_projects(user_id: str, operations: List[dict]) -> List[dict]:
+    """
+    Apply many create/update/delete operations with few PostgREST calls: a
+    bulk insert, one update per distinct patch (a bulk status change is a
+    single statement) and a bulk delete. Every operation is
+    {"index", "op", "id", "data"}; the result for each is
+    {"index", "op", "id", "status", "error", "project"}.
+    """
+    try:
+        return _batch_projects(user_id, operations)
+    finally:
+        projects_cache.invalidate(user_id)
+
+
+def _batch_projects(user_id: str, operations: List[dict]) -> List[dict]:
+    results: Dict[int, dict] = {}
+
+    def result(item, status, project=None, error=None, project_id=None):
+        results[item["index"]] = {
+            "index": item["index"],
+            "op": item["op"],
+            "id": project_id or item.get("id"),
+            "status": status,
+            "error": error,
+            "project": project,
+        }
+
+    def fail_all(items, e):
+        for item in items:
+            result(item, 503 if isinstance(e, CircuitOpenError) else 502, error=str(e))
+
+    creates = [o for o in operations if o["op"] == "create"]
+    updates = [o for o in operations if o["op"] == "update"]
+    deletes = [o for o in operations if o["op"] == "delete"]
+
+    # -- creates: one bulk insert (rows come back in insert order)
+    if creates:
+        rows = [{**_jsonable(o["data"]), "user_id": user_id} for o in creates]
+        try:
+            res = resilient_call("supabase", supabase.table("projects").insert(rows).execute, idempotent=False)
+        except Exception as e:
+            fail_all(creates, e)
+        else:
+            for item, row in zip(creates, res.data or []):
+                result(item, 201, project=row, project_id=row.get("id"))
+
+    # -- updates: patches to one project merge in request order, then
+    #    projects with the same merged patch share one update statement.
+    #    Only the patched columns are sent, scoped to the user: a project
+    #    deleted (or never owned) is not matched and stays missing.
+    if updates:
+        patches: Dict[str, dict] = {}
+        for item in updates:
+            patch = {k: v for k, v in _jsonable(item["data"]).items() if k in PROJECT_UPDATABLE}
+            patches[item["id"]] = {**patches.get(item["id"], {}), **patch}
+
+        groups: Dict[str, List[str]] = {}
+        for project_id, patch in patches.items():
+            groups.setdefault(json.dumps(patch, sort_keys=True), []).append(project_id)
+
+        saved: Dict[str, dict] = {}
+        failed: Dict[str, Exception] = {}
+        for key, ids in groups.items():
+            patch = json.loads(key)
+            if patch:
+                query = supabase.table("projects").update(patch).eq("user_id", user_id).in_("id", ids)
+            else:
+                # nothing to change: only report whether the projects exist
+                query = supabase.table("projects").select("*").eq("user_id", user_id).in_("id", ids)
+            try:
+                res = resilient_call("supabase", query.execute, idempotent=not patch)
+            except Exception as e:
+                failed.update((project_id, e) for project_id in ids)
+            else:
+                saved.update((row["id"], row) for row in res.data or [])
+
+        for item in updates:
+            if item["id"] in failed:
+                fail_all([item], failed[item["id"]])
+            elif item["id"] in saved:
+                result(item, 200, project=saved[item["id"]])
+            else:
+                result(item, 404, error="Project not found or not owned by user")
+
+    # -- deletes: one bulk delete scoped to the user; rows that come back were deleted
+    if deletes:
+        ids = list({o["id"] for o in deletes})
+        try:
+            res = resilient_call(
+                "supabase",
+                supabase.table("projects").delete().eq("user_id", user_id).in_("id", ids).execute,
+                idempotent=False,
+            )
+        except Exception as e:
+            fail_all(deletes, e)
+        else:
+            deleted = {row["id"] for row in res.data or []}
+            for item in deletes:
+                if item["id"] in deleted:
+                    result(item, 204)
+                else:
+                    result(item, 404, error="Project not found or not owned by user")
+
+    return [results[o["index"]] for o in operations]
+
+
+def project_dashboard(user_id: str, status: Optional[str] = None, due_soon_days: int = 7) -> List[dict]:
+    """
+    Every project of a user with total/completed task counts, completion
+    ratio and overdue/due-soon flags, computed by the `project_dashboard`
+    RPC in a single query however many projects there are.
+    """
+    res = resilient_call(
+        "supabase",
+        supabase.rpc(
+            "project_dashboard",
+            {"p_user_id": user_id, "p_due_soon_days": due_soon_days, "p_status": status},
+        ).execute,
+    )
+    return res.data or []
@@ -0,0 +1,210 @@
+import os
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+import requests
+from postgrest.exceptions import APIError
+
+# -------------------------------------------------------------------
+# Retry / circuit breaker configuration
+# -------------------------------------------------------------------
+RETRY_ATTEMPTS = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", 3))
+RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", 0.2))
+RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", 2.0))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_TIMEOUT = float(os.getenv("UPSTREAM_BREAKER_RESET_TIMEOUT", 30))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("UPSTREAM_BREAKER_HALF_OPEN_PROBES", 1))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+# PostgREST error codes meaning the database (not the query) is the
+# problem: no connection / schema cache, connection exceptions (SQLSTATE
+# class 08), insufficient resources (53), operator intervention (57P),
+# serialization failures and deadlocks
+POSTGREST_TRANSIENT_CODES = ("PGRST000", "PGRST001", "PGRST002", "40001", "40P01")
+POSTGREST_TRANSIENT_CLASSES = ("08", "53", "57P")
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None and isinstance(exc, APIError):
+        # postgrest-py puts the HTTP status in `code` when the error body
+        # is not PostgREST JSON (gateway 502/503/504, rate limiting)
+        code = str(exc.code or "")
+        if len(code) == 3 and code.isdigit():
+            status = int(code)
+    return status
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    True for errors worth retrying and counting against a breaker:
+    connection failures, timeouts, 5xx and 429 responses, and PostgREST
+    errors reporting an unavailable database.
+    Client errors (4xx) are the caller's problem, not the upstream's.
+    """
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return True
+    status = _status_code(exc)
+    if isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError, APIError)) and status is not None:
+        return status >= 500 or status == 429
+    if isinstance(exc, APIError):
+        code = str(exc.code or "")
+        return code in POSTGREST_TRANSIENT_CODES or code.startswith(POSTGREST_TRANSIENT_CLASSES)
+    return False
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass through; consecutive transient failures are counted.
+    Open: calls fail fast with CircuitOpenError until `reset_timeout` passes.
+    Half-open: a limited number of probe calls are let through; a success
+    closes the circuit again, a failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+        half_open_probes: int = BREAKER_HALF_OPEN_PROBES,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def _allow(self):
+        with self._lock:
+            if self.state == OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout - elapsed)
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._probes += 1
+
+    def _on_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probes = 0
+
+    def _on_neutral(self):
+        # an error that says nothing about the upstream's health: keep the
+        # failure count as is, but give a half-open probe slot back
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _on_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.trips += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, fn: Callable[[], Any], is_failure: Callable[[BaseException], bool] = is_transient) -> Any:
+        self._allow()
+        try:
+            result = fn()
+        except Exception as e:
+            if is_failure(e):
+                self._on_failure()
+            else:
+                self._on_neutral()
+            raise
+        self._on_success()
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for an upstream."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+def retry_call(
+    fn: Callable[[], Any],
+    attempts: int = RETRY_ATTEMPTS,
+    base_delay: float = RETRY_BASE_DELAY,
+    max_delay: float = RETRY_MAX_DELAY,
+    retry_on: Callable[[BaseException], bool] = is_transient,
+) -> Any:
+    """
+    Call `fn`, retrying transient errors with exponential backoff and full
+    jitter (sleep a random time in [0, min(max_delay, base_delay * 2**n)]).
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            if attempt >= attempts - 1 or not retry_on(e):
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * (2 ** attempt))))
+
+
+def resilient_call(name: str, fn: Callable[[], Any], idempotent: bool = True, attempts: Optional[int] = None) -> Any:
+    """
+    Call an upstream through its circuit breaker. Idempotent calls are also
+    retried with backoff; writes get a single attempt.
+    """
+    breaker = get_breaker(name)
+    if not idempotent:
+        return breaker.call(fn)
+    return retry_call(lambda: breaker.call(fn), attempts=attempts or RETRY_ATTEMPTS)
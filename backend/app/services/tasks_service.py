@@ -0,0 +1,180 @@
+# services/tasks_service.py
+import os
+from typing import Dict, List, Optional
+from postgrest.exceptions import APIError
+from ..auth.supabase_client import supabase_client
+from .resilience import resilient_call
+
+
+supabase = supabase_client
+
+# positions are sparse integers: new tasks go POSITION_GAP after the last
+# one and a move takes the midpoint of its new neighbours, so moving one
+# task writes one row. Only when two neighbours run out of room in between
+# is the whole project renumbered.
+POSITION_GAP = int(os.getenv("TASK_POSITION_GAP", 1024))
+TASK_UPDATABLE = ("title", "completed", "position")
+
+
+class NotFound(LookupError):
+    pass
+
+
+def _assert_project_owned(user_id: str, project_id: str):
+    res = resilient_call(
+        "supabase",
+        supabase.table("projects").select("id").eq("id", project_id).eq("user_id", user_id).limit(1).execute,
+    )
+    if not res.data:
+        raise NotFound("Project not found or not owned by user")
+
+
+def _positions(project_id: str) -> List[dict]:
+    res = resilient_call(
+        "supabase",
+        supabase.table("project_tasks").select("id,position").eq("project_id", project_id)
+        .order("position").order("created_at").execute,
+    )
+    return res.data or []
+
+
+def list_tasks(user_id: str, project_id: str, completed: Optional[bool] = None) -> List[dict]:
+    # ownership is checked by the inner join, in the same round trip
+    query = (
+        supabase.table("project_tasks")
+        .select("*, projects!inner(user_id)")
+        .eq("project_id", project_id)
+        .eq("projects.user_id", user_id)
+    )
+    if completed is not None:
+        query = query.eq("completed", completed)
+    res = resilient_call("supabase", query.order("position").order("created_at").execute)
+    return [{k: v for k, v in row.items() if k != "projects"} for row in res.data or []]
+
+
+def create_task(user_id: str, project_id: str, payload: dict) -> dict:
+    _assert_project_owned(user_id, project_id)
+    if payload.get("position") is None:
+        res = resilient_call(
+            "supabase",
+            supabase.table("project_tasks").select("position").eq("project_id", project_id)
+            .order("position", desc=True).limit(1).execute,
+        )
+        last = res.data[0]["position"] if res.data else 0
+        payload = {**payload, "position": last + POSITION_GAP}
+    res = resilient_call(
+        "supabase",
+        supabase.table("project_tasks").insert({**payload, "project_id": project_id}).execute,
+        idempotent=False,
+    )
+    return res.data[0]
+
+
+def update_task(user_id: str, project_id: str, task_id: str, payload: dict) -> dict:
+    _assert_project_owned(user_id, project_id)
+    res = resilient_call(
+        "supabase",
+        supabase.table("project_tasks").update(payload).eq("id", task_id).eq("project_id", project_id).execute,
+        idempotent=False,
+    )
+    if not res.data:
+        raise NotFound("Task not found")
+    return res.data[0]
+
+
+def delete_task(user_id: str, project_id: str, task_id: str):
+    _assert_project_owned(user_id, project_id)
+    resilient_call(
+        "supabase",
+        supabase.table("project_tasks").delete().eq("id", task_id).eq("project_id", project_id).execute,
+        idempotent=False,
+    )
+    return True
+
+
+def bulk_update_tasks(user_id: str, project_id: str, updates: List[dict]) -> List[dict]:
+    """
+    Apply many partial task updates ({"id", ...fields}) in one
+    `update_project_tasks` RPC call, e.g. "complete these 12 tasks" or a
+    reorder computed by the client. Unknown ids (or ids from another
+    project) raise NotFound and nothing is written.
+    """
+    _assert_project_owned(user_id, project_id)
+    return _apply_updates(project_id, updates)
+
+
+def _apply_updates(project_id: str, updates: List[dict]) -> List[dict]:
+    # patches to one task merge in order; the RPC writes only the keys
+    # each patch carries, never inserts, and fails as a whole on a missing id
+    patches: Dict[str, dict] = {}
+    for update in updates:
+        patch = {k: v for k, v in update.items() if k in TASK_UPDATABLE}
+        patches[update["id"]] = {**patches.get(update["id"], {}), **patch}
+    try:
+        res = resilient_call(
+            "supabase",
+            supabase.rpc(
+                "update_project_tasks",
+                {"p_project_id": project_id, "p_updates": [{"id": i, **p} for i, p in patches.items()]},
+            ).execute,
+            idempotent=False,
+        )
+    except APIError as e:
+        if e.code == "P0002":
+            raise NotFound(e.message)
+        raise
+    return sorted(res.data or [], key=lambda t: t["position"])
+
+
+def move_task(user_id: str, project_id: str, task_id: str, after_id: Optional[str] = None, before_id: Optional[str] = None) -> List[dict]:
+    """
+    Move a task so it sits right after `after_id` (or at the top when
+    `after_id` is None). `before_id` is accepted instead for clients that
+    drop onto the following task. Returns the rows that were written: just
+    the moved task, or every task of the project after a renumbering.
+    """
+    _assert_project_owned(user_id, project_id)
+    tasks = _positions(project_id)
+    order = [t["id"] for t in tasks]
+    if task_id not in order:
+        raise NotFound("Task not found")
+    for anchor in (after_id, before_id):
+        if anchor is not None and (anchor not in order or anchor == task_id):
+            raise NotFound("Anchor task not found")
+
+    others = [t for t in tasks if t["id"] != task_id]
+    ids = [t["id"] for t in others]
+    if after_id is not None:
+        slot = ids.index(after_id) + 1
+    elif before_id is not None:
+        slot = ids.index(before_id)
+    else:
+        slot = 0
+
+    prev_pos = others[slot - 1]["position"] if slot > 0 else None
+    next_pos = others[slot]["position"] if slot < len(others) else None
+    if prev_pos is None and next_pos is None:
+        position = POSITION_GAP
+    elif prev_pos is None:
+        position = next_pos - POSITION_GAP
+    elif next_pos is None:
+        position = prev_pos + POSITION_GAP
+    else:
+        position = (prev_pos + next_pos) // 2 if next_pos - prev_pos > 1 else None
+
+    if position is not None:
+        res = resilient_call(
+            "supabase",
+            supabase.table("project_tasks").update({"position": position})
+            .eq("id", task_id).eq("project_id", project_id).execute,
+            idempotent=False,
+        )
+        return res.data or []
+
+    # no room between the neighbours: renumber the project, one RPC call
+    reordered = ids[:slot] + [task_id] + ids[slot:]
+    rows = [
+        {"id": tid, "position": (i + 1) * POSITION_GAP}
+        for i, tid in enumerate(reordered)
+    ]
+    return _apply_updates(project_id, rows)
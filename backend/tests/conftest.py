@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+from flask_smorest import Api
+
+# the app reads its settings from the environment at import time
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:1")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "service-role-key")
+os.environ.setdefault("CANVAS_API_TOKEN", "canvas-token")
+os.environ.setdefault("CANVAS_API_URL", "http://127.0.0.1:1/api/v1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_client():
+    """Test client for a bare app serving only the given blueprints (no log files, no sync thread)."""
+
+    def make(*blueprints, root_path=None, **config):
+        app = Flask("test", root_path=root_path)
+        app.config.update(API_TITLE="test", API_VERSION="v1", OPENAPI_VERSION="3.0.3", TESTING=True, **config)
+        api = Api(app)
+        for blueprint in blueprints:
+            api.register_blueprint(blueprint)
+        return app.test_client()
+
+    return make
+
+
+# ---------------------------
+# wall-clock benchmarks (opt-in: pytest --run-benchmarks)
+# ---------------------------
+_benchmark_results = []
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-benchmarks", action="store_true", help="run the @pytest.mark.benchmark timing tests")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock timing test, skipped unless --run-benchmarks")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="timing benchmark; run with --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def benchmark_report():
+    """Records a result line for the "benchmarks" section of the terminal summary."""
+    return _benchmark_results.append
+
+
+def pytest_terminal_summary(terminalreporter):
+    if _benchmark_results:
+        terminalreporter.section("benchmarks")
+        for line in _benchmark_results:
+            terminalreporter.write_line(line)
@@ -0,0 +1,174 @@
+"""
+Local stand-in for the Canvas REST API, for tests.
+
+Serves JSON resources registered by path (lists are paginated with Link
+headers like Canvas does) and raw file bodies registered in `downloads`,
+and throttles like Canvas: a leaky bucket of
+`capacity` units refilling at `refill_rate` units/second, every request
+costing `cost`, and 403 "Rate Limit Exceeded" once the bucket is empty.
+JSON responses carry an ETag, and a matching If-None-Match is answered
+with an empty 304. `latency` delays every request; `connect_latency` delays only the first
+request on each new connection, standing in for the TCP+TLS handshake.
+"""
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class FakeCanvas:
+    def __init__(self, capacity: float = 700.0, refill_rate: float = 10.0, cost: float = 1.0, latency: float = 0.0,
+                 connect_latency: float = 0.0):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.cost = cost
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.resources: Dict[str, Any] = {}
+        # raw file bodies by path (Canvas file download URLs)
+        self.downloads: Dict[str, bytes] = {}
+        self.requests: List[Dict[str, Any]] = []
+        self._remaining = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = None
+
+    # ---------------------------
+    # lifecycle
+    # ---------------------------
+    def start(self) -> "FakeCanvas":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                if fake.connect_latency:
+                    time.sleep(fake.connect_latency)
+
+            def do_GET(self):
+                fake._handle(self)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def origin(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def url(self) -> str:
+        return f"{self.origin}/api/v1"
+
+    # ---------------------------
+    # inspection
+    # ---------------------------
+    def paths(self, status: int = None) -> List[str]:
+        with self._lock:
+            return [r["path"] for r in self.requests if status is None or r["status"] == status]
+
+    def statuses(self) -> List[int]:
+        with self._lock:
+            return [r["status"] for r in self.requests]
+
+    def body_bytes(self) -> int:
+        """Response body bytes sent so far."""
+        with self._lock:
+            return sum(r["bytes"] for r in self.requests)
+
+    def connections(self) -> int:
+        """Distinct client sockets that sent requests."""
+        with self._lock:
+            return len({r["client"] for r in self.requests})
+
+    def reset_requests(self):
+        with self._lock:
+            self.requests.clear()
+
+    # ---------------------------
+    # request handling
+    # ---------------------------
+    def _charge(self) -> (bool, float):
+        with self._lock:
+            now = time.monotonic()
+            self._remaining = min(self.capacity, self._remaining + (now - self._updated_at) * self.refill_rate)
+            self._updated_at = now
+            if self._remaining < self.cost:
+                return False, self._remaining
+            self._remaining -= self.cost
+            return True, self._remaining
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        url = urlparse(handler.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path[len("/api/v1"):] if url.path.startswith("/api/v1") else url.path
+        if self.latency:
+            time.sleep(self.latency)
+
+        allowed, remaining = self._charge()
+        if not allowed:
+            status, body, headers = 403, "403 Forbidden (Rate Limit Exceeded)", {}
+        elif path in self.downloads:
+            status, body, headers = 200, self.downloads[path], {}
+        else:
+            status, body, headers = self._resource(path, query)
+        headers["X-Request-Cost"] = str(self.cost)
+        headers["X-Rate-Limit-Remaining"] = f"{max(remaining, 0.0):.1f}"
+
+        if isinstance(body, bytes):
+            data, content_type = body, "application/octet-stream"
+        elif isinstance(body, str):
+            data, content_type = body.encode("utf-8"), "text/plain"
+        else:
+            data, content_type = json.dumps(body).encode("utf-8"), "application/json"
+            if status == 200:
+                headers["ETag"] = f'"{hashlib.sha1(data).hexdigest()[:16]}"'
+                if handler.headers.get("If-None-Match") == headers["ETag"]:
+                    status, data = 304, b""
+
+        with self._lock:
+            self.requests.append({
+                "path": path, "query": query, "status": status, "client": handler.client_address,
+                "headers": dict(handler.headers), "bytes": len(data),
+            })
+
+        handler.send_response(status)
+        if status != 304:
+            handler.send_header("Content-Type", content_type)
+            handler.send_header("Content-Length", str(len(data)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _resource(self, path: str, query: Dict[str, str]):
+        resource = self.resources.get(path)
+        if resource is None:
+            return 404, {"errors": [{"message": "The specified resource does not exist."}]}, {}
+        if not isinstance(resource, list):
+            return 200, resource, {}
+
+        items = list(resource)
+        if query.get("sort") == "updated_at":
+            items.sort(key=lambda i: i.get("updated_at") or "", reverse=query.get("order") == "desc")
+        page, per_page = int(query.get("page", 1)), int(query.get("per_page", 10))
+        headers = {}
+        if page * per_page < len(items):
+            next_query = urlencode({**query, "page": page + 1})
+            headers["Link"] = f'<{self.origin}/api/v1{path}?{next_query}>; rel="next"'
+        return 200, items[(page - 1) * per_page: page * per_page], headers
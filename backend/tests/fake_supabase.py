@@ -0,0 +1,239 @@
+"""
+In-memory stand-in for the Supabase (PostgREST) client, for tests.
+
+Implements the query-builder calls the services use -- select / insert /
+update / delete / rpc with eq, in_, gte, lte, or_ (keyset filters), order,
+limit and single -- against plain lists of dicts, and records one entry per
+executed statement in `calls` so tests can count round trips. RPCs are
+Python functions registered in `rpcs`.
+"""
+import re
+import uuid
+import itertools
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+_OPS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+}
+_EMBED = re.compile(r"(\w+)!inner\(([\w,]+)\)")
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        current += ch
+    parts.append(current)
+    return parts
+
+
+def _parse_logic(text: str) -> Callable[[dict], bool]:
+    """Predicate for a PostgREST logic tree such as `a.lt.1,and(a.eq.1,id.lt.x)` (or-ed)."""
+    terms = []
+    for term in _split_top_level(text):
+        if term.startswith(("and(", "or(")):
+            combine = all if term.startswith("and(") else any
+            inner = [_parse_logic(t) for t in _split_top_level(term[term.index("(") + 1:-1])]
+            terms.append(lambda row, inner=inner, combine=combine: combine(p(row) for p in inner))
+        else:
+            column, op, value = term.split(".", 2)
+            value = value[1:-1] if value.startswith('"') else value
+            terms.append(lambda row, c=column, o=op, v=value: _OPS[o](_cell(row, c), v))
+    return lambda row: any(t(row) for t in terms)
+
+
+def _cell(row: dict, column: str):
+    value = row.get(column)
+    # timestamps compare as text, like the ISO strings the services send
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table_name = table
+        self.action = "select"
+        self.payload = None
+        self.columns = "*"
+        self.count = None
+        self.filters: List[Callable[[dict], bool]] = []
+        self.orders: List[tuple] = []
+        self.row_limit: Optional[int] = None
+        self.one = False
+
+    # -- statements
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        if self.action == "select":
+            self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def update(self, patch: dict):
+        self.action, self.payload = "update", patch
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    # -- filters
+    def eq(self, column, value):
+        if "." in column:
+            embedded, field = column.split(".", 1)
+            self.filters.append(lambda row: (row.get(embedded) or {}).get(field) == value)
+        else:
+            self.filters.append(lambda row: _cell(row, column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self.filters.append(lambda row: _cell(row, column) in values)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: _OPS["gte"](_cell(row, column), value))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: _OPS["lte"](_cell(row, column), value))
+        return self
+
+    def or_(self, filters: str):
+        self.filters.append(_parse_logic(filters))
+        return self
+
+    # -- modifiers
+    def order(self, column, desc: bool = False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n: int):
+        self.row_limit = n
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    # -- execution
+    def _embed(self, row: dict) -> dict:
+        match = _EMBED.search(self.columns)
+        if not match:
+            return row
+        table, fields = match.group(1), match.group(2).split(",")
+        parent_key = f"{table.rstrip('s')}_id"
+        parent = next((p for p in self.db.tables.get(table, []) if p["id"] == row.get(parent_key)), None)
+        return {**row, table: {f: parent[f] for f in fields} if parent else None}
+
+    def _project(self, row: dict) -> dict:
+        if self.columns.replace(" ", "").startswith("*"):
+            return dict(row)
+        return {c: row.get(c) for c in self.columns.replace(" ", "").split(",")}
+
+    def _matching(self) -> List[dict]:
+        rows = [self._embed(r) for r in self.db.tables.setdefault(self.table_name, [])]
+        return [r for r in rows if all(f(r) for f in self.filters)]
+
+    def execute(self) -> FakeResponse:
+        if self.db.before_execute is not None:
+            self.db.before_execute(self)
+        self.db.calls.append((self.table_name, self.action))
+        table = self.db.tables.setdefault(self.table_name, [])
+
+        if self.action == "insert":
+            many = isinstance(self.payload, list)
+            rows = [self.db.new_row(self.table_name, r) for r in (self.payload if many else [self.payload])]
+            table.extend(rows)
+            data = [dict(r) for r in rows]
+        elif self.action == "update":
+            ids = {r["id"] for r in self._matching()}
+            data = []
+            for row in table:
+                if row["id"] in ids:
+                    row.update(self.payload, updated_at=self.db.now())
+                    data.append(dict(row))
+        elif self.action == "delete":
+            ids = {r["id"] for r in self._matching()}
+            data = [dict(r) for r in table if r["id"] in ids]
+            table[:] = [r for r in table if r["id"] not in ids]
+        else:
+            data = self._matching()
+            count = len(data) if self.count else None
+            for column, desc in reversed(self.orders):
+                data.sort(key=lambda r: (_cell(r, column) is None, _cell(r, column)), reverse=desc)
+            if self.row_limit is not None:
+                data = data[: self.row_limit]
+            data = [self._project(r) for r in data]
+            if self.one:
+                return FakeResponse(data[0] if data else None, count)
+            return FakeResponse(data, count)
+
+        if self.one:
+            return FakeResponse(data[0] if data else None)
+        return FakeResponse(data)
+
+
+class FakeRpc:
+    action = "rpc"
+
+    def __init__(self, db: "FakeSupabase", name: str, params: dict):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self) -> FakeResponse:
+        if self.db.before_execute is not None:
+            self.db.before_execute(self)
+        self.db.calls.append(("rpc", self.name))
+        return FakeResponse(self.db.rpcs[self.name](self.db, self.params))
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables: Dict[str, List[dict]] = {}
+        self.rpcs: Dict[str, Callable[["FakeSupabase", dict], Any]] = {}
+        self.calls: List[tuple] = []
+        # called with each query right before it runs (to interleave "concurrent" writes)
+        self.before_execute: Optional[Callable[[FakeQuery], None]] = None
+        self._clock = itertools.count(1)
+        self._epoch = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+    def now(self) -> str:
+        # strictly increasing, so every write changes updated_at
+        return (self._epoch + timedelta(seconds=next(self._clock))).isoformat()
+
+    def new_row(self, table: str, values: dict) -> dict:
+        now = self.now()
+        return {"id": str(uuid.uuid4()), "created_at": now, "updated_at": now, **values}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict) -> FakeRpc:
+        return FakeRpc(self, name, params)
+
+    def rows(self, table: str) -> List[dict]:
+        return self.tables.setdefault(table, [])
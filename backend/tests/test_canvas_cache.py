@@ -0,0 +1,153 @@
+import pytest
+
+from app.services import canvas_cache, canvas_service
+from app.services.canvas_cache import CanvasResponseCache, ttl_for
+from app.services.canvas_client import CanvasClient
+from fake_canvas import FakeCanvas
+
+COURSE = 10
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(canvas_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def canvas(monkeypatch, clock):
+    fake = FakeCanvas(capacity=10_000, refill_rate=1_000).start()
+    fake.resources.update({
+        f"/courses/{COURSE}": {"id": COURSE, "name": "Biology"},
+        f"/courses/{COURSE}/assignments/5": {"id": 5, "name": "Essay"},
+    })
+    monkeypatch.setattr(canvas_service, "client", CanvasClient(fake.url, "token"))
+    monkeypatch.setattr(canvas_service, "cache", CanvasResponseCache())
+    # expired entries go upstream in the request instead of being served stale
+    monkeypatch.setattr(canvas_service, "CANVAS_STALE_WHILE_REVALIDATE", False)
+    yield fake
+    canvas_service.client.close()
+    fake.stop()
+
+
+def put(cache, key, size):
+    cache.put(key, {"key": key}, None, None, size, 60)
+
+
+def test_ttl_depends_on_the_resource():
+    assert ttl_for("/users/self") == 900
+    assert ttl_for(f"/courses/{COURSE}") == 900
+    assert ttl_for(f"/courses/{COURSE}/modules/3/items") == 300
+    assert ttl_for(f"https://canvas.example/api/v1/courses/{COURSE}/assignments?page=2") == 60
+    assert ttl_for(f"/courses/{COURSE}/quizzes/7") == 60
+    assert ttl_for(f"/courses/{COURSE}/discussion_topics") == canvas_cache.CANVAS_CACHE_DEFAULT_TTL
+
+
+def test_entries_expire_after_their_resource_ttl(canvas, clock):
+    canvas_service.get_course(COURSE)
+    canvas_service.get_course_assignments(COURSE, assignment_id=5)
+    assert len(canvas.paths()) == 2
+
+    clock.now += 61  # past the assignment TTL (60s), within the course TTL (900s)
+    canvas_service.get_course(COURSE)
+    canvas_service.get_course_assignments(COURSE, assignment_id=5)
+    assert canvas.paths()[2:] == [f"/courses/{COURSE}/assignments/5"]
+
+    clock.now += 900
+    canvas_service.get_course(COURSE)
+    assert canvas.paths()[3:] == [f"/courses/{COURSE}"]
+
+
+def test_evicts_least_recently_used_entry_over_the_entry_limit(clock):
+    cache = CanvasResponseCache(max_entries=2, max_bytes=1_000)
+    put(cache, "a", 10)
+    put(cache, "b", 10)
+    assert cache.lookup("a") is not None  # "a" is now the most recently used
+    put(cache, "c", 10)
+
+    assert cache.lookup("b") is None
+    assert cache.lookup("a") is not None and cache.lookup("c") is not None
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 20, 1)
+
+
+def test_evicts_oldest_entries_over_the_byte_limit(clock):
+    cache = CanvasResponseCache(max_entries=100, max_bytes=100)
+    for key in "abc":
+        put(cache, key, 40)
+    assert [k for k in "abc" if cache.lookup(k, count=False)] == ["b", "c"]
+    assert cache.stats()["bytes"] == 80
+
+    # replacing an entry frees its old size first
+    put(cache, "c", 61)
+    assert [k for k in "abc" if cache.lookup(k, count=False)] == ["c"]
+    assert cache.stats()["bytes"] == 61
+
+    # a payload bigger than the whole cache is not stored and evicts nothing
+    put(cache, "d", 101)
+    assert cache.lookup("d", count=False) is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (1, 61, 2)
+
+
+def test_counts_hits_and_misses(clock):
+    cache = CanvasResponseCache()
+    assert cache.lookup("a") is None
+    put(cache, "a", 10)
+    assert cache.lookup("a").fresh
+    assert cache.lookup("a").fresh
+    clock.now += 61
+    assert not cache.lookup("a").fresh  # an expired entry counts as a miss
+    assert cache.lookup("a", count=False) is not None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (2, 2, 0.5)
+
+
+def test_disabled_cache_stores_nothing(clock):
+    cache = CanvasResponseCache(max_entries=0)
+    put(cache, "a", 10)
+    assert cache.lookup("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entry_is_revalidated_with_if_none_match(canvas, clock):
+    course = canvas_service.get_course(COURSE)
+    first = canvas.requests[0]
+    assert first["status"] == 200 and first["bytes"] > 0
+
+    clock.now += 901
+    assert canvas_service.get_course(COURSE) == course
+    revalidation = canvas.requests[1]
+    assert "If-None-Match" not in first["headers"]
+    assert "If-None-Match" in revalidation["headers"]
+    # 304: the body is not transferred again
+    assert (revalidation["status"], revalidation["bytes"]) == (304, 0)
+    assert canvas_service.cache.stats()["revalidations"] == 1
+
+    # the revalidated entry is fresh for another TTL
+    canvas_service.get_course(COURSE)
+    assert len(canvas.requests) == 2
+
+
+def test_changed_resource_replaces_the_entry_on_revalidation(canvas, clock):
+    canvas_service.get_course(COURSE)
+    canvas.resources[f"/courses/{COURSE}"] = {"id": COURSE, "name": "Biology II"}
+
+    clock.now += 901
+    assert canvas_service.get_course(COURSE)["name"] == "Biology II"
+    assert canvas.statuses() == [200, 200]
+    assert canvas_service.cache.stats()["revalidations"] == 0
+
+    clock.now += 901
+    assert canvas_service.get_course(COURSE)["name"] == "Biology II"
+    assert canvas.statuses() == [200, 200, 304]
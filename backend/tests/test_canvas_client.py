@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from app.services import canvas_service
+from app.services.canvas_cache import CanvasResponseCache
+from app.services.canvas_client import CanvasClient
+from fake_canvas import FakeCanvas
+
+
+@pytest.fixture
+def canvas():
+    fake = FakeCanvas(capacity=10_000, refill_rate=1_000).start()
+    fake.resources["/users/self"] = {"id": 1, "name": "Sam"}
+    yield fake
+    fake.stop()
+
+
+def test_unpooled_requests_open_a_connection_each(canvas):
+    # baseline for the tests below
+    for _ in range(5):
+        requests.get(f"{canvas.url}/users/self", timeout=5)
+    assert canvas.connections() == 5
+
+
+def test_sequential_calls_reuse_one_connection(canvas):
+    client = CanvasClient(canvas.url, "token")
+    session = client.session
+    for _ in range(20):
+        assert client.get("users/self").json()["name"] == "Sam"
+
+    assert client.session is session
+    # http and https share one pooled adapter
+    assert len({id(adapter) for adapter in session.adapters.values()}) == 1
+    assert canvas.connections() == 1
+    client.close()
+
+
+def test_concurrent_calls_stay_within_the_pool(canvas):
+    canvas.latency = 0.01
+    client = CanvasClient(canvas.url, "token", pool_size=4)
+
+    def work():
+        for _ in range(10):
+            client.get("users/self")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(canvas.statuses()) == 80
+    assert canvas.connections() <= 4
+    client.close()
+
+
+def test_service_helpers_share_the_client_session(canvas, monkeypatch):
+    monkeypatch.setattr(canvas_service, "client", CanvasClient(canvas.url, "token"))
+    monkeypatch.setattr(canvas_service, "cache", CanvasResponseCache(max_entries=0))
+    for _ in range(10):
+        assert canvas_service.get_user_information()["id"] == 1
+
+    assert len(canvas.statuses()) == 10
+    assert canvas.connections() == 1
+    canvas_service.client.close()
+
+
+def test_close_drops_the_session(canvas):
+    client = CanvasClient(canvas.url, "token")
+    first = client.session
+    client.get("users/self")
+    client.close()
+    assert client.session is not first
+    client.get("users/self")
+    assert canvas.connections() == 2
+    client.close()
+
+
+@pytest.mark.benchmark
+def test_pooled_calls_are_faster_than_unpooled(benchmark_report):
+    # 5ms per request, plus 20ms for every new connection (the handshake)
+    canvas = FakeCanvas(capacity=10_000, refill_rate=1_000, latency=0.005, connect_latency=0.02).start()
+    canvas.resources["/users/self"] = {"id": 1, "name": "Sam"}
+    calls = 20
+    try:
+        started = time.perf_counter()
+        for _ in range(calls):
+            requests.get(f"{canvas.url}/users/self", timeout=5)
+        unpooled = (time.perf_counter() - started) / calls
+
+        client = CanvasClient(canvas.url, "token")
+        client.get("users/self")  # open the pooled connection
+        started = time.perf_counter()
+        for _ in range(calls):
+            client.get("users/self")
+        pooled = (time.perf_counter() - started) / calls
+        client.close()
+    finally:
+        canvas.stop()
+
+    benchmark_report(f"canvas client: unpooled {unpooled * 1000:.1f} ms/call, pooled {pooled * 1000:.1f} ms/call")
+    # every unpooled call pays the handshake again; pooled calls pay it once
+    assert canvas.connections() == calls + 1
+    assert pooled < unpooled - 0.01
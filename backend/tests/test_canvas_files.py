@@ -0,0 +1,140 @@
+import os
+import threading
+
+import pytest
+
+from app.api.canvas import canvas_blp
+from app.services import canvas_files, canvas_service
+from app.services.canvas_cache import CanvasResponseCache
+from app.services.canvas_client import CanvasClient
+from app.services.canvas_files import ContentAddressedFileCache
+from fake_canvas import FakeCanvas
+
+PDF = bytes(range(256)) * 400  # 100 kB
+DOWNLOAD = "/files/5/download"
+
+
+def blobs(cache):
+    return sorted(path for path, _size, _mtime in cache._blobs())
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ContentAddressedFileCache(str(tmp_path / "files"), max_bytes=10_000_000)
+
+
+def test_miss_tees_and_commits_then_hits(cache):
+    assert cache.lookup(5, "v1") is None
+    chunks = [PDF[:1000], b"", PDF[1000:]]
+    assert b"".join(cache.tee(5, "v1", chunks, {"content_type": "application/pdf"})) == PDF
+
+    path, ref = cache.lookup(5, "v1")
+    with open(path, "rb") as fh:
+        assert fh.read() == PDF
+    assert (ref["size"], ref["content_type"]) == (len(PDF), "application/pdf")
+    assert cache.lookup(5, "v2") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    # the same bytes under another course's file id are stored once
+    cache.fill(6, "v1", [PDF])
+    assert len(blobs(cache)) == 1
+
+
+def test_interrupted_download_is_discarded(cache):
+    stream = cache.tee(5, "v1", iter([PDF[:1000], PDF[1000:]]))
+    next(stream)
+    stream.close()  # client went away
+    assert cache.lookup(5, "v1") is None
+    assert blobs(cache) == []
+    assert [n for n in os.listdir(os.path.join(cache.root, "tmp"))] == []
+
+
+def test_lru_eviction_by_bytes(tmp_path):
+    cache = ContentAddressedFileCache(str(tmp_path / "files"), max_bytes=250)
+    for file_id, byte in ((1, b"a"), (2, b"b")):
+        cache.fill(file_id, "v", [byte * 100])
+        path, _ = cache.lookup(file_id, "v")
+        os.utime(path, (file_id, file_id))  # distinct, ordered mtimes
+    cache.lookup(1, "v")  # 1 is now the most recently used
+
+    cache.fill(3, "v", [b"c" * 100])
+    assert cache.lookup(2, "v") is None
+    assert cache.lookup(1, "v") is not None and cache.lookup(3, "v") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 200
+
+
+@pytest.fixture
+def canvas(monkeypatch, tmp_path):
+    fake = FakeCanvas(capacity=10_000, refill_rate=1_000).start()
+    fake.resources["/files/5"] = {
+        "id": 5, "display_name": "lecture.pdf", "size": len(PDF), "content-type": "application/pdf",
+        "updated_at": "2026-10-01T12:00:00Z", "url": f"{fake.origin}{DOWNLOAD}",
+    }
+    fake.downloads[DOWNLOAD] = PDF
+    monkeypatch.setattr(canvas_service, "client", CanvasClient(fake.url, "token"))
+    monkeypatch.setattr(canvas_service, "cache", CanvasResponseCache())
+    monkeypatch.setattr(canvas_files, "_file_cache", ContentAddressedFileCache(str(tmp_path / "files")))
+    yield fake
+    fake.stop()
+
+
+def downloads(canvas):
+    return canvas.paths().count(DOWNLOAD)
+
+
+def test_cached_file_is_served_with_ranges(canvas, make_client):
+    client = make_client(canvas_blp)
+    resp = client.get("/canvas/files/5/content")
+    assert resp.status_code == 200
+    assert resp.data == PDF
+    assert resp.headers["Accept-Ranges"] == "bytes"
+    etag = resp.headers["ETag"]
+
+    resp = client.get("/canvas/files/5/content", headers={"Range": "bytes=1000-1999"})
+    assert resp.status_code == 206
+    assert resp.data == PDF[1000:2000]
+    assert client.get("/canvas/files/5/content", headers={"If-None-Match": etag}).status_code == 304
+    assert downloads(canvas) == 1
+
+
+def test_range_request_on_a_cold_cache(canvas, make_client):
+    resp = make_client(canvas_blp).get("/canvas/files/5/content", headers={"Range": "bytes=-10"})
+    assert resp.status_code == 206
+    assert resp.data == PDF[-10:]
+
+
+def test_concurrent_misses_share_one_download(canvas, make_client):
+    canvas.latency = 0.2
+    # the metadata is cached; only the download itself is slow and shared
+    canvas_service.get_file(5)
+
+    app = make_client(canvas_blp).application
+    bodies = []
+    barrier = threading.Barrier(8)
+
+    def request():
+        with app.test_client() as client:
+            barrier.wait()
+            resp = client.get("/canvas/files/5/content")
+            bodies.append((resp.status_code, resp.data))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert bodies == [(200, PDF)] * 8
+    assert downloads(canvas) == 1
+    stats = canvas_files._file_cache.inflight.stats()
+    assert stats["executed"] == 1 and stats["coalesced"] == 7
+
+
+def test_file_larger_than_the_cache_is_streamed(canvas, make_client, monkeypatch):
+    monkeypatch.setattr(canvas_files._file_cache, "max_bytes", 1000)
+    client = make_client(canvas_blp)
+    for _ in range(2):
+        assert client.get("/canvas/files/5/content").data == PDF
+    assert downloads(canvas) == 2
+    assert blobs(canvas_files._file_cache) == []
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from app.api.canvas import canvas_blp
+from app.services import canvas_service
+from app.services.canvas_cache import CanvasResponseCache
+from app.services.canvas_client import CanvasClient
+from fake_canvas import FakeCanvas
+
+COURSE = 10
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+@pytest.fixture
+def canvas(monkeypatch):
+    fake = FakeCanvas(capacity=10_000, refill_rate=1_000).start()
+    fake.resources[f"/courses/{COURSE}/files"] = [
+        {"id": i, "display_name": f"slides-{i}.pdf", "updated_at": "2026-10-01T12:00:00Z"} for i in range(250)
+    ]
+    monkeypatch.setattr(canvas_service, "client", CanvasClient(fake.url, "token"))
+    monkeypatch.setattr(canvas_service, "cache", CanvasResponseCache())
+    yield fake
+    fake.stop()
+
+
+def test_streamed_listing_is_not_cached(canvas, make_client):
+    client = make_client(canvas_blp)
+
+    resp = client.get(f"/canvas/courses/{COURSE}/files", headers=NDJSON)
+    assert resp.mimetype == "application/x-ndjson"
+    assert [json.loads(line)["canvas_file_id"] for line in resp.data.splitlines()] == list(range(250))
+    assert len(canvas.paths()) == 3
+    assert canvas_service.cache.stats()["entries"] == 0
+
+    # a second stream goes upstream again instead of pinning the pages
+    assert len(client.get(f"/canvas/courses/{COURSE}/files", headers=NDJSON).data.splitlines()) == 250
+    assert len(canvas.paths()) == 6
+    assert canvas_service.cache.stats()["entries"] == 0
+
+
+def test_json_listing_is_still_cached_and_reused_by_streams(canvas, make_client):
+    client = make_client(canvas_blp)
+
+    assert len(client.get(f"/canvas/courses/{COURSE}/files").json) == 250
+    assert canvas_service.cache.stats()["entries"] == 3
+
+    # fresh pages already in the cache are served from it
+    resp = client.get(f"/canvas/courses/{COURSE}/files", headers=NDJSON)
+    assert len(resp.data.splitlines()) == 250
+    assert len(canvas.paths()) == 3
@@ -0,0 +1,146 @@
+import gc
+import sqlite3
+import threading
+
+import pytest
+
+from app.services import canvas_service, canvas_sync
+from app.services.canvas_cache import CanvasResponseCache
+from app.services.canvas_client import CanvasClient
+from app.services.canvas_sync import CanvasSnapshotStore, CanvasSyncEngine
+from fake_canvas import FakeCanvas
+
+COURSE = 10
+
+
+def stamp(minute):
+    return f"2026-10-01T12:{minute:02d}:00Z"
+
+
+@pytest.fixture
+def canvas(monkeypatch):
+    fake = FakeCanvas(capacity=10_000, refill_rate=1_000).start()
+    fake.resources.update({
+        "/users/self": {"id": 1, "name": "Sam"},
+        "/users/1/courses": [{"id": COURSE, "name": "Biology"}],
+        f"/courses/{COURSE}": {"id": COURSE, "name": "Biology", "syllabus_body": "<p>hi</p>"},
+        # as listed with include[]=items: Week 2 has too many items to inline
+        f"/courses/{COURSE}/modules": [
+            {"id": 1, "name": "Week 1", "position": 1, "items_count": 2, "items": [
+                {"id": 11, "title": "Intro", "position": 1}, {"id": 12, "title": "Cells", "position": 2},
+            ]},
+            {"id": 2, "name": "Week 2", "position": 2, "items_count": 1},
+        ],
+        f"/courses/{COURSE}/modules/2/items": [{"id": 21, "title": "Genes", "position": 1}],
+        f"/courses/{COURSE}/assignments": [{"id": 21, "name": "Essay"}],
+        f"/courses/{COURSE}/quizzes": [{"id": 31, "title": "Quiz 1"}],
+        # more than one page of 100, so a delta can stop early
+        f"/courses/{COURSE}/files": [
+            {"id": 100 + i, "display_name": f"slides-{i}.pdf", "updated_at": stamp(i % 50)} for i in range(150)
+        ],
+        f"/courses/{COURSE}/pages": [
+            {"page_id": 41, "title": "Notes", "updated_at": stamp(1)},
+            {"page_id": 42, "title": "Reading", "updated_at": stamp(2)},
+        ],
+    })
+    monkeypatch.setattr(canvas_service, "client", CanvasClient(fake.url, "token"))
+    # left on, like in production: sync reads must not be served from it
+    monkeypatch.setattr(canvas_service, "cache", CanvasResponseCache())
+    monkeypatch.setattr(canvas_service, "CANVAS_STALE_WHILE_REVALIDATE", True)
+    yield fake
+    fake.stop()
+
+
+def test_full_then_delta_sync(canvas, tmp_path):
+    store = CanvasSnapshotStore(str(tmp_path / "snapshot.sqlite3"))
+    engine = CanvasSyncEngine(store)
+
+    report = engine.sync()
+    assert report["full"] == [COURSE]
+    assert report["changed"]["file"] == 150
+    assert len(store.list("file", course_id=COURSE)) == 150
+    assert [i["id"] for i in store.list("module_item", course_id=COURSE, parent_id=1)] == [11, 12]
+    assert [i["id"] for i in store.list("module_item", course_id=COURSE, parent_id=2)] == [21]
+    assert "items" not in store.get("module", 1)
+    assert len([p for p in canvas.paths() if p.endswith("/files")]) == 2
+    # every listing above is now fresh in the response cache
+    assert canvas_service.cache.stats()["entries"] > 0
+
+    # upstream changes: a file, a new page, a new file sharing the newest
+    # stored updated_at, and items edited inside otherwise unchanged modules
+    files = canvas.resources[f"/courses/{COURSE}/files"]
+    files[7] = {**files[7], "display_name": "slides-7-v2.pdf", "updated_at": stamp(59)}
+    files.append({"id": 250, "display_name": "late.pdf", "updated_at": stamp(49)})
+    canvas.resources[f"/courses/{COURSE}/pages"].append({"page_id": 43, "title": "New", "updated_at": stamp(58)})
+    canvas.resources[f"/courses/{COURSE}/modules"][0]["items"][0]["title"] = "Intro (updated)"
+    canvas.resources[f"/courses/{COURSE}/modules/2/items"][0]["title"] = "Genes (updated)"
+    canvas.reset_requests()
+
+    report = engine.sync()
+    assert report["full"] == []
+    assert report["changed"]["file"] == 2
+    assert report["changed"]["page"] == 1
+    assert report["changed"]["module_item"] == 2
+    assert "module" not in report["changed"] or report["changed"]["module"] == 0
+    assert store.get("file", 107)["display_name"] == "slides-7-v2.pdf"
+    assert store.get("file", 250)["display_name"] == "late.pdf"
+    assert store.get("page", 43)["title"] == "New"
+    assert store.get("module_item", 11)["title"] == "Intro (updated)"
+    assert store.get("module_item", 21)["title"] == "Genes (updated)"
+
+    paths = canvas.paths()
+    # the files listing stopped below the watermark: first page only
+    assert len([p for p in paths if p.endswith("/files")]) == 1
+    # inline items need no request of their own
+    assert [p for p in paths if p.endswith("/items")] == [f"/courses/{COURSE}/modules/2/items"]
+    store.close()
+
+
+def test_connections_are_closed_with_their_thread(tmp_path):
+    store = CanvasSnapshotStore(str(tmp_path / "snapshot.sqlite3"))
+    opened = []
+
+    def work():
+        store.list("file", course_id=COURSE)
+        opened.append(store._local.conn)
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+    del thread
+    gc.collect()
+
+    assert opened[0] not in store._conns
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("select 1")
+    store.close()
+
+
+def test_only_one_process_leads_the_periodic_sync(tmp_path, monkeypatch):
+    lock = str(tmp_path / "snapshot.leader.lock")
+    monkeypatch.setattr(canvas_sync, "_leader_fd", None)
+    assert canvas_sync.acquire_sync_leadership(lock)
+
+    # a second worker: its own open file description of the same lock
+    fd = canvas_sync.os.open(lock, canvas_sync.os.O_RDWR)
+    with pytest.raises(OSError):
+        canvas_sync.fcntl.flock(fd, canvas_sync.fcntl.LOCK_EX | canvas_sync.fcntl.LOCK_NB)
+    canvas_sync.os.close(fd)
+    canvas_sync.os.close(canvas_sync._leader_fd)
+
+
+def test_manual_sync_requires_token(make_client, monkeypatch):
+    from app.api.canvas import canvas_blp
+
+    started = []
+    monkeypatch.setattr("app.api.canvas.start_sync", lambda force_full=False: started.append(force_full) or True)
+    monkeypatch.setattr("app.api.canvas.get_sync_engine", lambda: CanvasSyncEngine(CanvasSnapshotStore(":memory:")))
+    monkeypatch.delenv("CANVAS_SYNC_TOKEN", raising=False)
+    assert make_client(canvas_blp).post("/canvas/sync").status_code == 404
+
+    client = make_client(canvas_blp, CANVAS_SYNC_TOKEN="s3cret")
+    assert client.post("/canvas/sync").status_code == 401
+    assert client.post("/canvas/sync", headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert started == []
+    assert client.post("/canvas/sync?full=true", headers={"Authorization": "Bearer s3cret"}).status_code == 202
+    assert started == [True]
@@ -0,0 +1,42 @@
+import time
+import importlib
+
+import jwt
+import pytest
+import requests
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.auth.jwt_verifier import LocalVerificationUnavailable, SupabaseJWTVerifier
+
+# app.auth re-exports the `jwt_verifier` instance under the module's name
+verifier_module = importlib.import_module("app.auth.jwt_verifier")
+
+SUPABASE_URL = "http://127.0.0.1:1"
+
+
+def rs256_token(kid):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    claims = {"sub": "u1", "aud": "authenticated", "iss": f"{SUPABASE_URL}/auth/v1", "exp": int(time.time()) + 60}
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+
+def test_unknown_kids_do_not_refetch_while_jwks_is_down(monkeypatch):
+    fetches = []
+
+    def unreachable(url, timeout):
+        fetches.append(url)
+        raise requests.ConnectionError("JWKS endpoint down")
+
+    monkeypatch.setattr(verifier_module.requests, "get", unreachable)
+    verifier = SupabaseJWTVerifier(SUPABASE_URL, refresh_interval=3600)
+
+    for i in range(5):
+        with pytest.raises(LocalVerificationUnavailable):
+            verifier.verify(rs256_token(f"kid-{i}"))
+    assert len(fetches) == 1
+
+    # once the throttle window has passed, one more attempt is allowed
+    verifier._last_attempt -= verifier_module.JWKS_MIN_REFETCH_SECONDS
+    with pytest.raises(LocalVerificationUnavailable):
+        verifier.verify(rs256_token("kid-late"))
+    assert len(fetches) == 2
@@ -0,0 +1,167 @@
+import json
+import os
+import itertools
+import threading
+
+import pytest
+
+from app.services import log_archive
+from app.services.log_archive import ColumnarArchive, LogArchiver, write_columnar
+
+
+def record(i, **fields):
+    return {
+        "ts_server": f"2026-10-01T12:{i // 60:02d}:{i % 60:02d}.000000Z",
+        "level": "error" if i % 4 == 0 else "info",
+        "ip": f"10.0.0.{i % 3}",
+        "message": f"event {i}",
+        "meta": {"i": i, "tags": ["a", "b"]} if i % 2 else None,
+        **fields,
+    }
+
+
+def ms(i):
+    return log_archive._ts_ms(record(i)["ts_server"])
+
+
+@pytest.fixture
+def archiver(tmp_path):
+    return LogArchiver(str(tmp_path / "logs"), compact_interval=3600)
+
+
+_segments = itertools.count(1)
+
+
+def spool(archiver, tmp_path, records):
+    """Hand a rotated frontend segment to the archiver and gzip it now."""
+    path = tmp_path / f"frontend_logs.txt.{next(_segments)}"
+    path.write_text("".join(json.dumps(r) + "\n" for r in records) + "not json\n")
+    archiver.submit(str(path))
+    archiver._compress(archiver.queue.get_nowait())
+
+
+def test_roundtrip_keeps_values_and_types(tmp_path):
+    records = [record(i, flag=[1, True, 0, False, None][i % 5], score=[1.5, 2, "2"][i % 3]) for i in range(50)]
+    records[3]["extra"] = "only here"
+    path = str(tmp_path / "a.col")
+    write_columnar(path, records)
+
+    archive = ColumnarArchive(path)
+    assert archive.rows == 50
+    assert archive.header["columns"]["ts_server"]["encoding"] == "ts"
+    assert archive.header["columns"]["meta"]["encoding"] == "json"
+    assert archive.header["columns"]["flag"]["cardinality"] == 5
+    assert archive.timestamps() == [ms(i) for i in range(50)]
+    for name in ("level", "ip", "message", "meta", "flag", "score", "extra"):
+        got = archive.column(name)
+        want = [r.get(name) for r in records]
+        assert got == want
+        # 1 == True in Python: compare the types as well
+        assert [type(v) for v in got] == [type(v) for v in want]
+    assert archive.column("ts_server")[7] == records[7]["ts_server"]
+    assert archive.column("missing") == [None] * 50
+
+
+def test_empty_archive(tmp_path):
+    path = str(tmp_path / "empty.col")
+    write_columnar(path, [])
+    archive = ColumnarArchive(path)
+    assert archive.rows == 0
+    assert not archive.overlaps(None, None)
+
+
+def test_select_filters(tmp_path):
+    path = str(tmp_path / "a.col")
+    write_columnar(path, [record(i) for i in range(100)])
+    archive = ColumnarArchive(path)
+
+    assert archive.select(ms(10), ms(19)) == list(range(10, 20))
+    assert archive.select(equals={"level": "error", "ip": "10.0.0.0"}) == [i for i in range(0, 100, 12)]
+    assert archive.select(contains={"message": "EVENT 9"}) == [9] + list(range(90, 100))
+    assert archive.select(equals={"nope": 1}) == []
+    assert archive.overlaps(ms(99), None) and not archive.overlaps(ms(99) + 1, None)
+
+
+def test_compact_and_query(archiver, tmp_path):
+    spool(archiver, tmp_path, [record(i) for i in range(50, 100)])
+    spool(archiver, tmp_path, [record(i, flag=[1, True][i % 2]) for i in range(50)])
+    assert archiver.counters["segments_compressed"] == 2
+    assert os.listdir(archiver.spool_dir) == []
+
+    assert archiver.compact() == 100
+    directory = archiver.stem_dir("frontend_logs")
+    [name] = os.listdir(directory)
+    assert name.endswith(".col")
+    # a second round finds nothing left to fold in
+    assert archiver.compact() == 0
+
+    result = archiver.query(since=ms(10) / 1000, until=ms(29) / 1000, level="error", columns=["message"])
+    assert result["records"] == [{"message": f"event {i}"} for i in (12, 16, 20, 24, 28)]
+
+    groups = archiver.query(group_by="level")["groups"]
+    assert groups == [{"value": "info", "count": 75}, {"value": "error", "count": 25}]
+
+    # 1 and True stay separate groups
+    flags = {(type(g["value"]), g["value"]): g["count"] for g in archiver.query(group_by="flag")["groups"]}
+    assert flags == {(int, 1): 25, (bool, True): 25, (type(None), None): 50}
+
+    assert archiver.query(group_by="meta", limit=1)["groups"][0] == {"value": None, "count": 50}
+
+
+def test_only_one_worker_compacts_at_a_time(archiver, tmp_path):
+    spool(archiver, tmp_path, [record(i) for i in range(10)])
+    # another worker holds the compaction lock
+    fd = os.open(os.path.join(archiver.archive_dir, ".compact.lock"), os.O_RDWR | os.O_CREAT)
+    log_archive.fcntl.flock(fd, log_archive.fcntl.LOCK_EX)
+    try:
+        assert archiver.compact() == 0
+    finally:
+        os.close(fd)
+    assert archiver.compact() == 10
+
+
+def test_workers_sharing_the_archive_never_duplicate_rows(tmp_path):
+    logs = str(tmp_path / "logs")
+    first = LogArchiver(logs)
+    for i in range(20):
+        spool(first, tmp_path, [record(i * 10 + j) for j in range(10)])
+
+    # several "workers" (separate lock descriptors) compacting together
+    workers = [LogArchiver(logs) for _ in range(4)]
+    barrier = threading.Barrier(len(workers))
+
+    def run(worker):
+        barrier.wait()
+        for _ in range(3):
+            worker.compact()
+
+    threads = [threading.Thread(target=run, args=(w,)) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(w.counters["rows_compacted"] for w in workers) == 200
+    messages = first.query(columns=["message"], limit=1000)["records"]
+    assert sorted(r["message"] for r in messages) == sorted(f"event {i}" for i in range(200))
+
+
+def test_spooled_segment_is_archived_once(tmp_path):
+    logs = str(tmp_path / "logs")
+    first, second = LogArchiver(logs), LogArchiver(logs)
+    segment = tmp_path / "frontend_logs.txt.1"
+    segment.write_text(json.dumps(record(1)) + "\n")
+    first.submit(str(segment))
+    spooled = first.queue.get_nowait()
+
+    # both workers found the segment in the spool (start() re-queues it)
+    with open(spooled, "rb") as held:
+        log_archive.fcntl.flock(held.fileno(), log_archive.fcntl.LOCK_EX)
+        second._compress(spooled)
+        assert os.path.exists(spooled)
+    first._compress(spooled)
+    second._compress(spooled)
+
+    assert first.counters["segments_compressed"] + second.counters["segments_compressed"] == 1
+    assert first.counters["errors"] == second.counters["errors"] == 0
+    assert len(os.listdir(first.stem_dir("frontend_logs"))) == 1
@@ -0,0 +1,64 @@
+import io
+import logging
+
+from app.services.log_writer import BufferedRotatingFileHandler, LogWriter
+
+
+class CountingFileIO(io.FileIO):
+    writes = 0
+
+    def write(self, data):
+        CountingFileIO.writes += 1
+        return super().write(data)
+
+
+def counting_open(path, mode, encoding=None, errors=None):
+    return io.TextIOWrapper(io.BufferedWriter(CountingFileIO(path, mode)), encoding=encoding, errors=errors)
+
+
+def make_handler(path, **kwargs):
+    handler = BufferedRotatingFileHandler(str(path), encoding="utf-8", delay=True, **kwargs)
+    handler._builtin_open = counting_open
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def records(n, start=0):
+    return [
+        logging.LogRecord("test", logging.INFO, __file__, 1, f"record {i}", None, None)
+        for i in range(start, start + n)
+    ]
+
+
+def test_one_write_per_commit(tmp_path):
+    CountingFileIO.writes = 0
+    path = tmp_path / "app.log"
+    handler = make_handler(path, maxBytes=1_000_000, backupCount=2)
+    writer = LogWriter([handler], fsync="never")
+
+    for batch in range(3):
+        for record in records(100, batch * 100):
+            handler.handle(record)
+        assert CountingFileIO.writes == batch  # nothing hit the file yet
+        writer._write([])  # commit
+        assert CountingFileIO.writes == batch + 1
+
+    assert path.read_text().splitlines()[-1] == "record 299"
+    handler.close()
+
+
+def test_rollover_from_tracked_size(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("x" * 40 + "\n")
+    handler = make_handler(path, maxBytes=100, backupCount=2)
+
+    for record in records(12):  # "record N\n": 9 bytes each
+        handler.handle(record)
+    handler.commit()
+
+    rotated = (tmp_path / "app.log.1").read_text()
+    assert rotated.startswith("x" * 40) and len(rotated) < 100
+    current = path.read_text()
+    assert current.startswith("record 6\n") and current.endswith("record 11\n")
+    assert handler._size == len(current.encode())
+    handler.close()
@@ -0,0 +1,171 @@
+import io
+import json
+import time
+import logging
+
+import pytest
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from app.api.logs import logs_blp
+
+LIMITS = dict(FRONTEND_LOG_MAX_BYTES=1_000, FRONTEND_LOG_BATCH_MAX_BYTES=5_000, FRONTEND_LOG_MAX_MESSAGE_CHARS=100, FRONTEND_LOG_MAX_META_DEPTH=3)
+
+
+class CountingStream(io.BytesIO):
+    """Request body that records how many bytes the app read from it."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+    def readinto(self, buffer):
+        n = super().readinto(buffer)
+        self.consumed += n
+        return n
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client(logs_blp, **LIMITS)
+
+
+@pytest.fixture
+def written(caplog):
+    caplog.set_level(logging.DEBUG, logger="frontend")
+    return lambda: [json.loads(r.getMessage()) for r in caplog.records if r.name == "frontend"]
+
+
+def nested(depth):
+    meta = {}
+    for _ in range(depth - 1):
+        meta = {"a": meta}
+    return meta
+
+
+def post_stream(client, path, data, content_length=None, content_type="application/json"):
+    # run without the test client: it recomputes Content-Length from the body
+    stream = CountingStream(data)
+    environ = EnvironBuilder(path=path, method="POST", content_type=content_type).get_environ()
+    environ["wsgi.input"] = stream
+    if content_length is None:
+        # read like a chunked request, up to the end of the stream
+        environ.pop("CONTENT_LENGTH", None)
+        environ["wsgi.input_terminated"] = True
+    else:
+        environ["CONTENT_LENGTH"] = str(content_length)
+    app = client.application
+    app_iter, status, headers = run_wsgi_app(app, environ, buffered=True)
+    return app.response_class(app_iter, status, headers), stream
+
+
+def test_valid_record_is_written(client, written):
+    resp = client.post("/logs", json={"level": "warn", "message": " slow render ", "meta": nested(3)})
+    assert resp.status_code == 200
+    [record] = written()
+    assert (record["level"], record["message"]) == ("warn", "slow render")
+
+
+def test_oversized_content_length_is_rejected_unread(client, written):
+    resp, stream = post_stream(client, "/logs", b"x" * 50_000, content_length=50_000)
+    assert resp.status_code == 413
+    assert stream.consumed == 0
+    assert written() == []
+
+
+def test_undeclared_length_stops_after_the_limit(client):
+    resp, stream = post_stream(client, "/logs", b" " * 50_000)
+    assert resp.status_code == 413
+    assert stream.consumed == LIMITS["FRONTEND_LOG_MAX_BYTES"] + 1
+
+
+def test_body_larger_than_its_declared_length_is_not_read_past_it(client, written):
+    body = json.dumps({"message": "hi"}).encode() + b" " * 50_000
+    resp, stream = post_stream(client, "/logs", body, content_length=len(body) - 50_000)
+    assert resp.status_code == 200
+    assert stream.consumed == len(body) - 50_000
+    assert [r["message"] for r in written()] == ["hi"]
+
+    # a declared length that cuts the JSON short is a bad record, not a crash
+    resp, _ = post_stream(client, "/logs", body, content_length=5)
+    assert resp.status_code == 400
+
+
+def test_too_deep_meta_is_rejected(client, written):
+    resp = client.post("/logs", json={"message": "hi", "meta": nested(4)})
+    assert resp.status_code == 400
+    assert "nested too deeply" in resp.json["message"]
+
+    # deeper than the JSON parser itself allows
+    resp = client.post("/logs", data="[" * 100_000, content_type="application/json")
+    assert resp.status_code in (400, 413)
+    assert written() == []
+
+
+def test_message_over_the_cap_is_rejected(client):
+    resp = client.post("/logs", json={"message": "x" * 101})
+    assert resp.status_code == 400
+    assert "too long" in resp.json["message"]
+    assert client.post("/logs", json={"message": "x" * 100}).status_code == 200
+
+
+def test_batch_reports_rejections_by_index(client, written):
+    items = [
+        {"message": "ok 0"},
+        {"message": "x" * 101},
+        {"message": "ok 2", "meta": nested(4)},
+        {"message": "ok 3", "level": "fatal"},
+        {"message": "y" * 999},
+        {"message": "ok 5"},
+    ]
+    resp = client.post("/logs/batch", json=items)
+    assert resp.status_code == 200
+    assert resp.json["accepted"] == 2
+    assert [r["index"] for r in resp.json["rejected"]] == [1, 2, 3, 4]
+    assert "too large" in resp.json["rejected"][-1]["error"]
+    assert [r["message"] for r in written()] == ["ok 0", "ok 5"]
+
+    ndjson = b"\n".join(json.dumps(i).encode() for i in items) + b"\n{broken\n"
+    resp = client.post("/logs/batch", data=ndjson, content_type="application/x-ndjson")
+    assert [r["index"] for r in resp.json["rejected"]] == [1, 2, 3, 4, 6]
+
+
+def test_oversized_batch_is_rejected(client):
+    resp, stream = post_stream(client, "/logs/batch", b"[" + b" " * 10_000 + b"]")
+    assert resp.status_code == 413
+    assert stream.consumed == LIMITS["FRONTEND_LOG_BATCH_MAX_BYTES"] + 1
+
+
+@pytest.mark.parametrize("declared", [True, False], ids=["content-length", "undeclared"])
+def test_rejection_reads_the_same_bytes_for_any_payload_size(client, declared):
+    consumed = []
+    for size in (10_000, 10_000_000):
+        resp, stream = post_stream(client, "/logs", b"x" * size, content_length=size if declared else None)
+        assert resp.status_code == 413
+        consumed.append(stream.consumed)
+    assert consumed[0] == consumed[1] <= LIMITS["FRONTEND_LOG_MAX_BYTES"] + 1
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("declared", [True, False], ids=["content-length", "undeclared"])
+def test_rejection_time_does_not_grow_with_the_payload(client, declared, benchmark_report):
+    """Rejecting 10 MB costs about as much as rejecting 10 kB."""
+
+    def best_of(size, runs=15):
+        payload, timings = b"x" * size, []
+        for _ in range(runs):
+            started = time.perf_counter()
+            resp, _stream = post_stream(client, "/logs", payload, content_length=size if declared else None)
+            timings.append(time.perf_counter() - started)
+            assert resp.status_code == 413
+        return min(timings)
+
+    small, large = best_of(10_000), best_of(10_000_000)
+    label = "content-length" if declared else "undeclared"
+    benchmark_report(f"log ingest 413 ({label}): 10 kB {small * 1000:.2f} ms, 10 MB {large * 1000:.2f} ms")
+    # generous bound: only the (unread) request setup may depend on the size
+    assert large < small * 5 + 0.005
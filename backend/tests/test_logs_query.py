@@ -0,0 +1,67 @@
+import json
+import logging
+
+import pytest
+
+from app.api.logs import logs_blp
+from app.services.log_writer import RedactSecretsFilter
+
+TOKEN = "query-token"
+BEARER = {"Authorization": f"Bearer {TOKEN}"}
+
+
+@pytest.fixture
+def client(make_client, tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    (logs / "backend_logs.txt.1").write_text(
+        "2026-10-01 12:00:00,000 werkzeug INFO 10.0.0.1 - - \"GET /projects/ HTTP/1.1\" 200 -\n"
+        "2026-10-01 12:05:00,000 app.api ERROR Supabase timeout\n"
+        "Traceback (most recent call last):\n"
+        "  ...\n"
+    )
+    (logs / "backend_logs.txt").write_text("2026-10-01 13:00:00,000 app.api WARNING slow request\n")
+    (logs / "frontend_logs.txt").write_text(
+        json.dumps({"ts_server": "2026-10-01T12:30:00Z", "level": "error", "ip": "10.0.0.2", "message": "Chunk load failed"}) + "\n"
+    )
+    return make_client(logs_blp, root_path=str(tmp_path), LOGS_QUERY_TOKEN=TOKEN)
+
+
+def test_search_across_rotated_files(client):
+    resp = client.get("/logs/search?source=backend&level=error", headers=BEARER)
+    assert resp.status_code == 200
+    [record] = resp.json["records"]
+    assert record["message"].startswith("Supabase timeout\nTraceback")
+
+    resp = client.get("/logs/search?q=chunk&ip=10.0.0.2", headers=BEARER)
+    assert [r["source"] for r in resp.json["records"]] == ["frontend"]
+
+
+def test_token_is_not_accepted_in_the_url(client):
+    assert client.get("/logs/search").status_code == 401
+    assert client.get(f"/logs/search?token={TOKEN}").status_code == 401
+    assert client.get(f"/logs/tail?token={TOKEN}").status_code == 401
+
+
+def test_tail_opens_with_a_short_lived_ticket(client):
+    assert client.post("/logs/tail/ticket").status_code == 401
+    resp = client.post("/logs/tail/ticket", headers=BEARER)
+    assert resp.status_code == 201
+    ticket = resp.json["ticket"]
+    assert TOKEN not in ticket
+
+    resp = client.get(f"/logs/tail?ticket={ticket}")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    resp.close()
+
+    assert client.get(f"/logs/tail?ticket={ticket[:-2]}xx").status_code == 401
+
+
+def test_credentials_in_logged_urls_are_redacted():
+    record = logging.LogRecord(
+        "werkzeug", logging.INFO, __file__, 1, '%s - - "%s" %s',
+        ("10.0.0.1", "GET /logs/tail?source=backend&ticket=abc.def HTTP/1.1", 200), None,
+    )
+    assert RedactSecretsFilter().filter(record)
+    assert record.getMessage() == '10.0.0.1 - - "GET /logs/tail?source=backend&ticket=[redacted] HTTP/1.1" 200'
@@ -0,0 +1,135 @@
+import uuid
+
+import pytest
+
+from app.api import auth as auth_api
+from app.api.projects import projects_blp
+from app.services import projects_service
+from app.services.projects_cache import MemoryBackend, ProjectsCache
+from fake_supabase import FakeSupabase
+
+ALICE = {"Authorization": "Bearer alice"}
+BOB = {"Authorization": "Bearer bob"}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeSupabase()
+    monkeypatch.setattr(projects_service, "supabase", fake)
+    monkeypatch.setattr(projects_service, "projects_cache", ProjectsCache(MemoryBackend()))
+    return fake
+
+
+@pytest.fixture
+def client(make_client, monkeypatch, db):
+    # the bearer token is the user id
+    monkeypatch.setattr(auth_api, "_resolve_user", lambda token: {"id": token})
+    auth_api.token_cache.clear()
+    return make_client(projects_blp)
+
+
+def add_projects(db, user_id, n, **fields):
+    rows = [db.new_row("projects", {
+        "user_id": user_id, "title": f"Project {i}", "description": "", "subject": "General",
+        "priority": "medium", "due_date": None, "status": "active", **fields,
+    }) for i in range(n)]
+    db.rows("projects").extend(rows)
+    return [r["id"] for r in rows]
+
+
+def batch(client, operations, headers=ALICE):
+    resp = client.post("/projects/batch", json={"operations": operations}, headers=headers)
+    assert resp.status_code == 200
+    return resp.json["results"]
+
+
+def test_batch_reports_a_result_per_item(client, db):
+    keep, drop = add_projects(db, "alice", 2)
+    results = batch(client, [
+        {"op": "create", "data": {"title": "New"}},
+        {"op": "update", "id": keep, "data": {"status": "archived"}},
+        {"op": "delete", "id": drop},
+        {"op": "update", "id": str(uuid.uuid4()), "data": {"title": "Ghost"}},
+        {"op": "delete", "id": drop},
+        {"op": "update", "id": "not-a-uuid", "data": {}},
+        {"op": "create", "data": {"priority": "urgent"}},
+    ])
+    assert [r["status"] for r in results] == [201, 200, 204, 404, 204, 400, 400]
+    assert results[0]["project"]["title"] == "New"
+    assert results[1]["project"]["status"] == "archived"
+    assert {r["title"] for r in db.rows("projects")} == {"Project 0", "New"}
+
+
+def test_batch_only_touches_the_callers_projects(client, db):
+    [theirs] = add_projects(db, "bob", 1)
+    results = batch(client, [
+        {"op": "update", "id": theirs, "data": {"title": "Mine now"}},
+        {"op": "delete", "id": theirs},
+    ])
+    assert [r["status"] for r in results] == [404, 404]
+    assert db.rows("projects")[0]["title"] == "Project 0"
+
+
+def test_batch_updates_send_only_patched_columns(client, db):
+    ids = add_projects(db, "alice", 4)
+    deleted, edited = ids[0], ids[1]
+
+    def concurrently(query):
+        # another request lands between the batch starting and its update
+        if query.action == "update" and db.before_execute is concurrently:
+            db.before_execute = None
+            db.rows("projects")[:] = [r for r in db.rows("projects") if r["id"] != deleted]
+            next(r for r in db.rows("projects") if r["id"] == edited)["description"] = "edited elsewhere"
+
+    db.before_execute = concurrently
+    db.calls.clear()
+    results = batch(client, [{"op": "update", "id": i, "data": {"status": "archived"}} for i in ids] + [
+        {"op": "update", "id": ids[3], "data": {"priority": "high"}},
+    ])
+
+    assert [r["status"] for r in results] == [404, 200, 200, 200, 200]
+    # a deleted project is not brought back, a concurrent edit is not overwritten
+    assert deleted not in {r["id"] for r in db.rows("projects")}
+    assert results[1]["project"]["description"] == "edited elsewhere"
+    assert results[3]["project"]["priority"] == results[4]["project"]["priority"] == "high"
+    # one statement per distinct patch, no read first
+    assert db.calls == [("projects", "update"), ("projects", "update")]
+
+
+def test_keyset_pages_cover_every_project_once(client, db):
+    add_projects(db, "alice", 7)
+    add_projects(db, "bob", 3)
+    seen, cursor = [], None
+    for _ in range(4):
+        query = "?limit=3&sort=created_at" + (f"&cursor={cursor}" if cursor else "")
+        resp = client.get(f"/projects/{query}", headers=ALICE)
+        assert resp.status_code == 200
+        seen += [p["title"] for p in resp.json]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == [f"Project {i}" for i in range(7)]
+
+    # a cursor is tied to its sort order
+    assert client.get("/projects/?cursor=" + cursor_of(client), headers=ALICE).status_code == 400
+
+
+def cursor_of(client):
+    return client.get("/projects/?limit=1&sort=updated_at", headers=ALICE).headers["X-Next-Cursor"]
+
+
+def test_etag_answers_304_until_the_list_changes(client, db):
+    [first, _] = add_projects(db, "alice", 2)
+    resp = client.get("/projects/", headers=ALICE)
+    etag = resp.headers["ETag"]
+
+    db.calls.clear()
+    resp = client.get("/projects/", headers={**ALICE, "If-None-Match": etag})
+    assert resp.status_code == 304
+    # answered from the version lookup, without reading the page
+    assert db.calls == []
+
+    batch(client, [{"op": "update", "id": first, "data": {"title": "Renamed"}}])
+    resp = client.get("/projects/", headers={**ALICE, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
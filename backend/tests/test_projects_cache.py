@@ -0,0 +1,48 @@
+import pytest
+
+from app.services import projects_cache
+from app.services.projects_cache import MemoryBackend, ProjectsCache, SQLiteBackend, make_backend
+
+
+def test_auto_backend_follows_worker_count(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.delenv("GUNICORN_CMD_ARGS", raising=False)
+    assert isinstance(make_backend("auto"), MemoryBackend)
+
+    monkeypatch.setattr(projects_cache, "SQLiteBackend", lambda: "shared")
+    monkeypatch.setenv("GUNICORN_CMD_ARGS", "--bind 0.0.0.0:8000 --workers 4")
+    assert make_backend("auto") == "shared"
+    monkeypatch.delenv("GUNICORN_CMD_ARGS")
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert make_backend("auto") == "shared"
+
+
+def test_memory_backend_refused_with_several_workers(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    with pytest.raises(ValueError):
+        make_backend("memory")
+
+
+def test_sqlite_invalidation_is_seen_by_every_worker(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a, worker_b = ProjectsCache(SQLiteBackend(path)), ProjectsCache(SQLiteBackend(path))
+    data = {"rows": ["v1"]}
+
+    assert worker_b.get_or_load("u1", "list", {}, lambda: data["rows"]) == ["v1"]
+    data["rows"] = ["v2"]
+    worker_a.invalidate("u1")
+    assert worker_b.get_or_load("u1", "list", {}, lambda: data["rows"]) == ["v2"]
+
+
+def test_memory_versions_are_bounded_and_never_reused():
+    backend = MemoryBackend(max_entries=2)
+    cache = ProjectsCache(backend)
+    assert cache.get_or_load("u1", "list", {}, lambda: "old") == "old"
+    cache.invalidate("u1")
+    assert cache.get_or_load("u1", "list", {}, lambda: "new") == "new"
+
+    # push u1's version out of the bounded map
+    backend.version("u2")
+    backend.version("u3")
+    assert len(backend._versions) == 2
+    assert cache.get_or_load("u1", "list", {}, lambda: "fresh") == "fresh"
@@ -0,0 +1,65 @@
+import uuid
+
+import pytest
+
+from app.api import auth as auth_api
+from app.api.projects import projects_blp
+from app.services import projects_service
+
+
+class FakeSupabase:
+    """Records every query the service builds; rpc() answers with canned rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def rpc(self, name, params):
+        self.calls.append(("rpc", name))
+        return self
+
+    def table(self, name):
+        self.calls.append(("table", name))
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": self.rows})()
+
+
+def project(i, **fields):
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Project {i}",
+        "description": "",
+        "subject": "General",
+        "priority": "medium",
+        "due_date": None,
+        "status": "active",
+        "created_at": "2026-10-01T12:00:00+00:00",
+        "updated_at": "2026-10-01T12:00:00+00:00",
+        "task_count": i,
+        "completed_count": 0,
+        "completion_ratio": 0,
+        "overdue": False,
+        "due_soon": False,
+        **fields,
+    }
+
+
+@pytest.fixture
+def client(make_client, monkeypatch):
+    monkeypatch.setattr(auth_api, "_resolve_user", lambda token: {"id": "user-1"})
+    auth_api.token_cache.clear()
+    return make_client(projects_blp)
+
+
+@pytest.mark.parametrize("projects", [1, 25, 500])
+def test_dashboard_is_one_query_for_any_number_of_projects(client, monkeypatch, projects):
+    fake = FakeSupabase([project(i) for i in range(projects)])
+    monkeypatch.setattr(projects_service, "supabase", fake)
+
+    resp = client.get("/projects/dashboard", headers={"Authorization": "Bearer token"})
+    assert resp.status_code == 200
+    assert len(resp.json) == projects
+    assert fake.calls == [("rpc", "project_dashboard")]
+
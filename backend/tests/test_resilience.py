@@ -0,0 +1,101 @@
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services import resilience
+from app.services.resilience import CircuitBreaker, CircuitOpenError, is_transient, resilient_call
+
+
+def api_error(code):
+    return APIError({"message": "upstream error", "code": code, "hint": None, "details": None})
+
+
+@pytest.mark.parametrize("code", [500, 502, 503, "503", 429, "PGRST001", "08006", "57P01", "40001"])
+def test_transient_api_errors(code):
+    assert is_transient(api_error(code))
+
+
+@pytest.mark.parametrize("code", [400, 404, "PGRST116", "23505", "42501", None])
+def test_client_api_errors_are_not_transient(code):
+    assert not is_transient(api_error(code))
+
+
+def test_supabase_5xx_is_retried_and_trips_the_breaker(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience.time, "sleep", lambda _s: None)
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise api_error(503)
+
+    with pytest.raises(APIError):
+        resilient_call("supabase", failing, attempts=3)
+    assert len(calls) == 3
+    # the 5th consecutive failure opens the breaker; the 3rd attempt fails fast
+    with pytest.raises(CircuitOpenError):
+        resilient_call("supabase", failing, attempts=3)
+    assert len(calls) == 5
+    snapshot = resilience.get_breaker("supabase").snapshot()
+    assert snapshot["state"] == "open"
+    assert snapshot["consecutive_failures"] == 5
+
+    with pytest.raises(CircuitOpenError):
+        resilient_call("supabase", failing)
+    assert len(calls) == 5
+
+
+def test_client_error_does_not_reset_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3)
+
+    def fail(exc):
+        def fn():
+            raise exc
+        return fn
+
+    for exc in (api_error(503), api_error(503), api_error("23505")):
+        with pytest.raises(APIError):
+            breaker.call(fail(exc))
+    assert breaker.snapshot()["consecutive_failures"] == 2
+
+    with pytest.raises(APIError):
+        breaker.call(fail(api_error(503)))
+    assert breaker.snapshot()["state"] == "open"
+
+
+def test_client_error_in_half_open_frees_the_probe(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+
+    def raise_(exc):
+        raise exc
+
+    with pytest.raises(APIError):
+        breaker.call(lambda: raise_(api_error(503)))
+    with pytest.raises(APIError):
+        breaker.call(lambda: raise_(api_error("23505")))
+    assert breaker.state == "half_open"
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.parametrize("error, status", [
+    (CircuitOpenError("supabase", retry_after=12.5), 503),
+    (api_error(500), 502),
+])
+def test_blueprints_map_upstream_failures(make_client, monkeypatch, error, status):
+    from app.api import auth as auth_api, canvas, projects, tasks
+
+    def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(auth_api, "_resolve_user", lambda token: {"id": "user-1"})
+    auth_api.token_cache.clear()
+    monkeypatch.setattr(canvas, "get_user_information", fail)
+    monkeypatch.setattr(projects, "project_dashboard", fail)
+    monkeypatch.setattr(tasks, "list_tasks", fail)
+    client = make_client(canvas.canvas_blp, projects.projects_blp, tasks.tasks_blp)
+
+    auth = {"Authorization": "Bearer token"}
+    for path in ("/canvas/user/information", "/projects/dashboard", "/projects/p1/tasks"):
+        resp = client.get(path, headers=auth)
+        assert resp.status_code == status
+        assert resp.headers.get("Retry-After") == ("13" if status == 503 else None)
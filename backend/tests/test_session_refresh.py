@@ -0,0 +1,158 @@
+import time
+import threading
+from types import SimpleNamespace
+from http.cookies import SimpleCookie
+
+import jwt
+import pytest
+from cachetools import TTLCache
+
+from app.api import auth as auth_api
+from app.api.auth import auth_blp
+from app.auth.token_cache import TokenValidationCache
+from app.services.singleflight import SingleFlight
+
+WINDOW = 300
+
+
+def token(sub="u1", expires_in=3600):
+    return jwt.encode({"sub": sub, "exp": int(time.time() + expires_in)}, "secret", algorithm="HS256")
+
+
+class FakeAuth:
+    """Supabase auth stub: every refresh rotates both tokens."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.refreshed = []
+        self._lock = threading.Lock()
+
+    def refresh_session(self, refresh_token):
+        time.sleep(self.delay)
+        with self._lock:
+            self.refreshed.append(refresh_token)
+            n = len(self.refreshed)
+        session = SimpleNamespace(access_token=token(expires_in=3600), refresh_token=f"refresh-{n + 1}")
+        return SimpleNamespace(session=session, user=None)
+
+
+class RecentClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def auth(monkeypatch):
+    fake = FakeAuth()
+    monkeypatch.setattr(auth_api, "supabase_client", SimpleNamespace(auth=fake))
+    monkeypatch.setattr(auth_api, "_resolve_user", lambda t: {"id": "u1"})
+    monkeypatch.setattr(auth_api, "token_cache", TokenValidationCache())
+    monkeypatch.setattr(auth_api.supabase_config, "SUPABASE_SESSION_REFRESH_WINDOW", WINDOW)
+    monkeypatch.setattr(auth_api, "_session_refresh", SingleFlight())
+    fake.clock = RecentClock()
+    monkeypatch.setattr(auth_api, "_recent_refreshes", TTLCache(maxsize=1024, ttl=30, timer=fake.clock))
+    return fake
+
+
+@pytest.fixture
+def app(make_client, auth):
+    return make_client(auth_blp).application
+
+
+def get_me(app, access, refresh="refresh-1"):
+    """GET /auth/me with the given cookies; returns (status, cookies set on the response)."""
+    client = app.test_client()
+    client.set_cookie("access_token", access)
+    client.set_cookie("refresh_token", refresh)
+    resp = client.get("/auth/me")
+    cookies = SimpleCookie()
+    for header in resp.headers.getlist("Set-Cookie"):
+        cookies.load(header)
+    return resp.status_code, {name: morsel.value for name, morsel in cookies.items()}
+
+
+def test_token_far_from_expiry_is_not_refreshed(app, auth):
+    status, cookies = get_me(app, token(expires_in=WINDOW + 60))
+    assert status == 200
+    assert cookies == {}
+    assert auth.refreshed == []
+
+
+def test_token_inside_the_window_is_refreshed_on_the_response(app, auth):
+    expiring = token(expires_in=WINDOW - 60)
+    auth_api.token_cache.get_or_validate(expiring, lambda t: {"id": "u1"})
+
+    status, cookies = get_me(app, expiring)
+    assert status == 200
+    assert auth.refreshed == ["refresh-1"]
+    assert cookies["refresh_token"] == "refresh-2"
+    assert cookies["access_token"] not in ("", expiring)
+    # the replaced access token no longer resolves from the cache
+    assert auth_api.token_cache.stats()["invalidations"] == 1
+
+
+def test_refresh_is_skipped_when_disabled_or_unauthenticated(app, auth, monkeypatch):
+    assert get_me(app, token(expires_in=WINDOW - 60), refresh="")[1] == {}
+
+    monkeypatch.setattr(auth_api, "_resolve_user", lambda t: None)
+    assert get_me(app, token("u2", expires_in=WINDOW - 60))[0] == 401
+
+    monkeypatch.setattr(auth_api, "_resolve_user", lambda t: {"id": "u1"})
+    monkeypatch.setattr(auth_api.supabase_config, "SUPABASE_SESSION_REFRESH_WINDOW", 0)
+    assert get_me(app, token(expires_in=WINDOW - 60))[1] == {}
+    assert auth.refreshed == []
+
+
+def test_concurrent_requests_share_one_refresh(app, auth):
+    auth.delay = 0.2  # every request arrives while the refresh is in flight
+    expiring = token(expires_in=WINDOW - 60)
+    start = threading.Barrier(8)
+    results = []
+
+    def request():
+        start.wait()
+        results.append(get_me(app, expiring))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert auth.refreshed == ["refresh-1"]
+    assert [status for status, _ in results] == [200] * 8
+    # everyone gets the same rotated session
+    assert len({cookies["access_token"] for _, cookies in results}) == 1
+    assert {cookies["refresh_token"] for _, cookies in results} == {"refresh-2"}
+
+
+def test_late_requests_with_old_cookies_reuse_the_recent_refresh(app, auth):
+    expiring = token(expires_in=WINDOW - 60)
+    _, first = get_me(app, expiring)
+
+    # a request sent before the browser stored the new cookies
+    auth.clock.now += 29
+    _, late = get_me(app, expiring)
+    assert late == first
+    assert auth.refreshed == ["refresh-1"]
+
+    # after 30s the old refresh token is sent upstream again
+    auth.clock.now += 2
+    _, later = get_me(app, expiring)
+    assert auth.refreshed == ["refresh-1", "refresh-1"]
+    assert later["refresh_token"] == "refresh-3"
+
+
+def test_failed_refresh_leaves_the_response_alone(app, auth, monkeypatch):
+    def unavailable(refresh_token):
+        auth.refreshed.append(refresh_token)
+        raise ConnectionError("auth server down")
+
+    monkeypatch.setattr(auth, "refresh_session", unavailable)
+    status, cookies = get_me(app, token(expires_in=WINDOW - 60))
+    assert status == 200
+    assert cookies == {}
+    assert auth.refreshed == ["refresh-1"]
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+import requests
+
+from app.services import canvas_service
+from app.services.canvas_cache import CanvasResponseCache
+from app.services.canvas_client import CanvasClient
+from app.services.singleflight import SingleFlight
+from fake_canvas import FakeCanvas
+
+CALLERS = 10
+
+
+@pytest.fixture
+def canvas(monkeypatch):
+    # slow enough that every caller arrives while the first request is in flight
+    fake = FakeCanvas(capacity=10_000, refill_rate=1_000, latency=0.3).start()
+    fake.resources["/courses/10"] = {"id": 10, "name": "Biology"}
+    monkeypatch.setattr(canvas_service, "client", CanvasClient(fake.url, "token"))
+    # no response cache: every call would go upstream if it were not coalesced
+    monkeypatch.setattr(canvas_service, "cache", CanvasResponseCache(max_entries=0))
+    monkeypatch.setattr(canvas_service, "inflight", SingleFlight())
+    yield fake
+    canvas_service.client.close()
+    fake.stop()
+
+
+def run_concurrently(fn, n=CALLERS):
+    """Call `fn(i)` from `n` threads at once; returns (results, errors)."""
+    start = threading.Barrier(n)
+    results, errors = [None] * n, [None] * n
+
+    def worker(i):
+        start.wait()
+        try:
+            results[i] = fn(i)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_upstream_call(canvas):
+    results, errors = run_concurrently(lambda i: canvas_service.get_course(10))
+
+    assert errors == [None] * CALLERS
+    assert results == [{"id": 10, "name": "Biology"}] * CALLERS
+    assert canvas.paths() == ["/courses/10"]
+    stats = canvas_service.inflight.stats()
+    assert (stats["calls"], stats["executed"], stats["coalesced"], stats["in_flight"]) == (CALLERS, 1, CALLERS - 1, 0)
+
+
+def test_concurrent_callers_share_the_upstream_error(canvas):
+    results, errors = run_concurrently(lambda i: canvas_service.get_course(404))
+
+    assert results == [None] * CALLERS
+    assert all(isinstance(e, requests.HTTPError) for e in errors)
+    assert len({id(e) for e in errors}) == 1  # the leader's exception, re-raised to everyone
+    assert canvas.statuses() == [404]
+
+    # a failure is not remembered: the next call goes upstream again
+    with pytest.raises(requests.HTTPError):
+        canvas_service.get_course(404)
+    assert canvas.statuses() == [404, 404]
+
+
+def test_different_keys_are_not_coalesced(canvas):
+    canvas.resources["/courses/11"] = {"id": 11, "name": "Chemistry"}
+    results, errors = run_concurrently(lambda i: canvas_service.get_course(10 + i % 2), n=6)
+
+    assert errors == [None] * 6
+    assert [r["id"] for r in results] == [10, 11] * 3
+    assert sorted(canvas.paths()) == ["/courses/10", "/courses/11"]
+    assert canvas_service.inflight.stats()["coalesced"] == 4
+
+
+def test_leader_result_is_not_shared_after_it_finished():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.stats() == {"calls": 2, "executed": 2, "coalesced": 0, "in_flight": 0}
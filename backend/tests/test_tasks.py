@@ -0,0 +1,151 @@
+import uuid
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.api import auth as auth_api
+from app.api.tasks import tasks_blp
+from app.services import tasks_service
+from app.services.tasks_service import POSITION_GAP
+from fake_supabase import FakeSupabase
+
+ALICE = {"Authorization": "Bearer alice"}
+
+
+def update_project_tasks(db, params):
+    """The update_project_tasks migration: update-only, all-or-nothing."""
+    tasks = {t["id"]: t for t in db.rows("project_tasks") if t["project_id"] == params["p_project_id"]}
+    missing = [u["id"] for u in params["p_updates"] if u["id"] not in tasks]
+    if missing:
+        raise APIError({"code": "P0002", "message": f"Tasks not found: {', '.join(missing)}", "details": None, "hint": None})
+    updated = []
+    for patch in params["p_updates"]:
+        row = tasks[patch["id"]]
+        row.update({k: v for k, v in patch.items() if k != "id"}, updated_at=db.now())
+        updated.append(dict(row))
+    return updated
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeSupabase()
+    fake.rpcs["update_project_tasks"] = update_project_tasks
+    monkeypatch.setattr(tasks_service, "supabase", fake)
+    return fake
+
+
+@pytest.fixture
+def client(make_client, monkeypatch, db):
+    # the bearer token is the user id
+    monkeypatch.setattr(auth_api, "_resolve_user", lambda token: {"id": token})
+    auth_api.token_cache.clear()
+    return make_client(tasks_blp)
+
+
+def add_project(db, user_id="alice", positions=(1024, 2048, 3072)):
+    project = db.new_row("projects", {"user_id": user_id, "title": "Biology"})
+    db.rows("projects").append(project)
+    tasks = [db.new_row("project_tasks", {"project_id": project["id"], "title": f"T{i}", "completed": False, "position": p})
+             for i, p in enumerate(positions)]
+    db.rows("project_tasks").extend(tasks)
+    return project["id"], [t["id"] for t in tasks]
+
+
+def board(client, project_id):
+    resp = client.get(f"/projects/{project_id}/tasks", headers=ALICE)
+    assert resp.status_code == 200
+    return [(t["title"], t["position"]) for t in resp.json]
+
+
+def move(client, project_id, task_id, **anchor):
+    return client.post(f"/projects/{project_id}/tasks/{task_id}/move", json=anchor, headers=ALICE)
+
+
+def test_create_appends_after_the_last_task(client, db):
+    project_id, _ = add_project(db)
+    resp = client.post(f"/projects/{project_id}/tasks", json={"title": "T3"}, headers=ALICE)
+    assert resp.status_code == 201
+    assert resp.json["position"] == 3072 + POSITION_GAP
+
+
+def test_move_takes_the_midpoint_and_writes_one_row(client, db):
+    project_id, (t0, t1, t2) = add_project(db)
+    db.calls.clear()
+    resp = move(client, project_id, t2, after_id=t0)
+    assert resp.status_code == 200
+    assert [t["position"] for t in resp.json] == [1536]
+    assert db.calls[-1] == ("project_tasks", "update")
+    assert board(client, project_id) == [("T0", 1024), ("T2", 1536), ("T1", 2048)]
+
+    # before_id lands in the same slot
+    move(client, project_id, t1, before_id=t2)
+    assert [title for title, _ in board(client, project_id)] == ["T0", "T1", "T2"]
+
+
+def test_move_to_the_top_and_to_the_bottom(client, db):
+    project_id, (t0, t1, t2) = add_project(db)
+    assert move(client, project_id, t2).json[0]["position"] == 1024 - POSITION_GAP
+    assert move(client, project_id, t0, after_id=t1).json[0]["position"] == 2048 + POSITION_GAP
+    assert [title for title, _ in board(client, project_id)] == ["T2", "T1", "T0"]
+
+
+def test_move_renumbers_when_there_is_no_gap(client, db):
+    project_id, (t0, t1, t2) = add_project(db, positions=(1, 2, 3))
+    db.calls.clear()
+    resp = move(client, project_id, t2, after_id=t0)
+    assert resp.status_code == 200
+    assert [t["position"] for t in resp.json] == [POSITION_GAP, 2 * POSITION_GAP, 3 * POSITION_GAP]
+    assert db.calls[-1] == ("rpc", "update_project_tasks")
+    assert [title for title, _ in board(client, project_id)] == ["T0", "T2", "T1"]
+
+
+def test_move_unknown_task_or_anchor_is_404(client, db):
+    project_id, (t0, _, _) = add_project(db)
+    assert move(client, project_id, str(uuid.uuid4())).status_code == 404
+    assert move(client, project_id, t0, after_id=str(uuid.uuid4())).status_code == 404
+    assert move(client, project_id, t0, after_id=t0).status_code == 404
+
+
+def test_bulk_update_writes_only_the_given_fields(client, db):
+    project_id, (t0, t1, _) = add_project(db)
+
+    def concurrently(call):
+        # another request renames a task just before the bulk update runs
+        if call.action == "rpc":
+            db.before_execute = None
+            db.rows("project_tasks")[0]["title"] = "renamed elsewhere"
+
+    db.before_execute = concurrently
+    resp = client.patch(f"/projects/{project_id}/tasks/batch", json={"tasks": [
+        {"id": t0, "completed": True},
+        {"id": t1, "completed": True},
+        {"id": t1, "position": 4096},
+    ]}, headers=ALICE)
+    assert resp.status_code == 200
+    assert [(t["title"], t["completed"], t["position"]) for t in resp.json] == [
+        ("renamed elsewhere", True, 1024),
+        ("T1", True, 4096),
+    ]
+
+
+def test_bulk_update_is_all_or_nothing(client, db):
+    project_id, (t0, _, _) = add_project(db)
+    _, (foreign, _, _) = add_project(db)
+    before = [dict(t) for t in db.rows("project_tasks")]
+    for unknown in (str(uuid.uuid4()), foreign):
+        resp = client.patch(f"/projects/{project_id}/tasks/batch", json={"tasks": [
+            {"id": t0, "completed": True},
+            {"id": unknown, "completed": True},
+        ]}, headers=ALICE)
+        assert resp.status_code == 404
+        assert unknown in resp.json["message"]
+    assert db.rows("project_tasks") == before
+
+
+def test_tasks_of_another_users_project_are_hidden(client, db):
+    project_id, (t0, _, _) = add_project(db, user_id="bob")
+    assert board(client, project_id) == []
+    assert move(client, project_id, t0).status_code == 404
+    resp = client.patch(f"/projects/{project_id}/tasks/batch", json={"tasks": [{"id": t0, "completed": True}]}, headers=ALICE)
+    assert resp.status_code == 404
+    assert client.post(f"/projects/{project_id}/tasks", json={"title": "x"}, headers=ALICE).status_code == 404
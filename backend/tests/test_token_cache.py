@@ -0,0 +1,171 @@
+import time
+import importlib
+from types import SimpleNamespace
+
+import jwt
+import pytest
+
+from app.api import auth as auth_api
+from app.api.auth import auth_blp
+
+# app.auth re-exports the `token_cache` instance under the module's name
+cache_module = importlib.import_module("app.auth.token_cache")
+
+
+class Clock:
+    """Stands in for the `time` module: wall clock and monotonic clock move together."""
+
+    def __init__(self):
+        self.now = 1_800_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return time.perf_counter()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def token(sub="u1", expires_in=None, now=None):
+    claims = {"sub": sub}
+    if expires_in is not None:
+        claims["exp"] = int((now if now is not None else time.time()) + expires_in)
+    return jwt.encode(claims, "secret", algorithm="HS256")
+
+
+class Validator:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, token):
+        self.calls.append(token)
+        return {"id": jwt.decode(token, options={"verify_signature": False})["sub"]}
+
+
+def test_entry_expires_with_the_token(clock):
+    cache = cache_module.TokenValidationCache(max_ttl=300)
+    validate = Validator()
+    short = token(expires_in=60, now=clock.now)
+
+    assert cache.get_or_validate(short, validate) == {"id": "u1"}
+    clock.now += 59
+    assert cache.get_or_validate(short, validate) == {"id": "u1"}
+    assert len(validate.calls) == 1
+
+    clock.now += 2  # past exp: the token is validated again (and rejected, in real life)
+    cache.get_or_validate(short, validate)
+    assert len(validate.calls) == 2
+
+
+def test_long_lived_token_is_capped_at_max_ttl(clock):
+    cache = cache_module.TokenValidationCache(max_ttl=300)
+    validate = Validator()
+    long_lived = token(expires_in=3600, now=clock.now)
+
+    cache.get_or_validate(long_lived, validate)
+    clock.now += 299
+    cache.get_or_validate(long_lived, validate)
+    clock.now += 2
+    cache.get_or_validate(long_lived, validate)
+    assert len(validate.calls) == 2
+
+
+def test_expired_or_failing_tokens_are_not_cached(clock):
+    cache = cache_module.TokenValidationCache()
+    validate = Validator()
+    expired = token(expires_in=-1, now=clock.now)
+    for _ in range(3):
+        cache.get_or_validate(expired, validate)
+    assert len(validate.calls) == 3
+
+    def reject(token):
+        validate.calls.append(token)
+        raise jwt.InvalidSignatureError("bad signature")
+
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidSignatureError):
+            cache.get_or_validate("not-a-jwt", reject)
+    assert len(validate.calls) == 5
+    assert cache.stats()["entries"] == 0
+
+
+def test_size_cap_evicts_least_recently_used(clock):
+    cache = cache_module.TokenValidationCache(max_entries=3)
+    validate = Validator()
+    tokens = [token(f"u{i}", expires_in=600, now=clock.now) for i in range(5)]
+    for t in tokens:
+        cache.get_or_validate(t, validate)
+
+    assert cache.stats()["entries"] == 3
+    cache.get_or_validate(tokens[-1], validate)  # still cached
+    assert len(validate.calls) == 5
+    cache.get_or_validate(tokens[0], validate)  # evicted
+    assert len(validate.calls) == 6
+    assert cache.stats()["entries"] == 3
+
+
+# ---------------------------
+# require_auth / signout / refresh
+# ---------------------------
+@pytest.fixture
+def app_client(make_client, monkeypatch):
+    resolved = []
+
+    def resolve(token):
+        resolved.append(token)
+        return {"id": jwt.decode(token, options={"verify_signature": False})["sub"], "email": "sam@example.com"}
+
+    rotated = SimpleNamespace(access_token=token("u1", expires_in=3600), refresh_token="refresh-2")
+    monkeypatch.setattr(auth_api, "_resolve_user", resolve)
+    monkeypatch.setattr(auth_api, "token_cache", cache_module.TokenValidationCache())
+    monkeypatch.setattr(auth_api, "supabase_client", SimpleNamespace(auth=SimpleNamespace(
+        sign_out=lambda token: None,
+        refresh_session=lambda refresh_token: SimpleNamespace(session=rotated, user=None),
+    )))
+    client = make_client(auth_blp)
+    client.resolved = resolved
+    return client
+
+
+def test_require_auth_reuses_the_validation(app_client):
+    access = token("u1", expires_in=3600)
+    app_client.set_cookie("access_token", access)
+    for _ in range(3):
+        assert app_client.get("/auth/me").json["id"] == "u1"
+    assert app_client.resolved == [access]
+    assert auth_api.token_cache.stats()["hits"] == 2
+
+
+def test_signout_evicts_the_token(app_client):
+    access = token("u1", expires_in=3600)
+    app_client.set_cookie("access_token", access)
+    app_client.get("/auth/me")
+    assert app_client.post("/auth/signout").status_code == 200
+    assert auth_api.token_cache.stats()["invalidations"] == 1
+
+    # a copy of the old cookie is validated again instead of served from the cache
+    app_client.set_cookie("access_token", access)
+    app_client.get("/auth/me")
+    assert app_client.resolved == [access, access]
+
+
+def test_refresh_evicts_the_replaced_token(app_client):
+    access = token("u1", expires_in=3600)
+    app_client.set_cookie("access_token", access)
+    app_client.set_cookie("refresh_token", "refresh-1")
+    app_client.get("/auth/me")
+    assert app_client.post("/auth/refresh", json={}).status_code == 200
+    assert auth_api.token_cache.stats()["invalidations"] == 1
+
+    app_client.set_cookie("access_token", access)
+    app_client.get("/auth/me")
+    assert app_client.resolved == [access, access]
@@ -0,0 +1,11 @@
+-- Keyset pagination for GET /projects/: every page is a range scan on
+-- (user_id, <sort column>, id) instead of a sort of all the user's rows.
+create index if not exists idx_projects_user_created_id
+  on public.projects (user_id, created_at desc, id desc);
+
+create index if not exists idx_projects_user_updated_id
+  on public.projects (user_id, updated_at desc, id desc);
+
+-- common filters on the same listing
+create index if not exists idx_projects_user_status_created_id
+  on public.projects (user_id, status, created_at desc, id desc);
@@ -0,0 +1,3 @@
+-- Board order of a project's tasks (GET /projects/<id>/tasks, moves)
+create index if not exists idx_project_tasks_project_position
+  on public.project_tasks (project_id, position);
@@ -0,0 +1,62 @@
+-- Projects with their task counts in one round trip (GET /projects/dashboard).
+-- Called by the backend with the service role; the user id is a parameter,
+-- so execution is not granted to client roles.
+create or replace function public.project_dashboard(
+  p_user_id uuid,
+  p_due_soon_days int default 7,
+  p_status text default null
+)
+returns table (
+  id uuid,
+  title text,
+  description text,
+  subject text,
+  priority text,
+  due_date date,
+  status text,
+  created_at timestamptz,
+  updated_at timestamptz,
+  task_count int,
+  completed_count int,
+  completion_ratio numeric,
+  overdue boolean,
+  due_soon boolean
+)
+language sql
+stable
+as $$
+  select
+    p.id,
+    p.title,
+    p.description,
+    p.subject,
+    p.priority,
+    p.due_date,
+    p.status,
+    p.created_at,
+    p.updated_at,
+    coalesce(t.total, 0)::int as task_count,
+    coalesce(t.done, 0)::int as completed_count,
+    case when coalesce(t.total, 0) = 0 then 0
+         else round(t.done::numeric / t.total, 4) end as completion_ratio,
+    -- a null due_date would make both flags null: no due date is never late
+    coalesce(p.status = 'active' and p.due_date < current_date, false) as overdue,
+    coalesce(p.status = 'active' and p.due_date >= current_date
+      and p.due_date <= current_date + p_due_soon_days, false) as due_soon
+  from public.projects p
+  left join (
+    select
+      pt.project_id,
+      count(*) as total,
+      count(*) filter (where pt.completed) as done
+    from public.project_tasks pt
+    join public.projects owned on owned.id = pt.project_id and owned.user_id = p_user_id
+    group by pt.project_id
+  ) t on t.project_id = p.id
+  where p.user_id = p_user_id
+    and (p_status is null or p.status = p_status)
+  order by p.created_at desc, p.id desc;
+$$;
+
+revoke execute on function public.project_dashboard(uuid, int, text) from public, anon, authenticated;
+grant execute on function public.project_dashboard(uuid, int, text) to service_role;
@@ -0,0 +1,50 @@
+-- Partial updates of many tasks of one project in one transaction
+-- (PATCH /projects/<id>/tasks/batch, renumbering on a move).
+-- Only the keys present in each patch are written, and rows are only ever
+-- updated, never inserted: when any id is not a task of the project the
+-- whole call fails with no_data_found (P0002) and nothing is changed.
+-- Called by the backend with the service role after its ownership check.
+create or replace function public.update_project_tasks(
+  p_project_id uuid,
+  p_updates jsonb
+)
+returns setof public.project_tasks
+language plpgsql
+as $$
+declare
+  v_expected int;
+  v_updated int;
+  v_missing text;
+begin
+  select count(distinct u->>'id') into v_expected
+  from jsonb_array_elements(p_updates) u;
+
+  return query
+  update public.project_tasks t
+  set
+    title = case when u.patch ? 'title' then u.patch->>'title' else t.title end,
+    completed = case when u.patch ? 'completed' then (u.patch->>'completed')::boolean else t.completed end,
+    position = case when u.patch ? 'position' then (u.patch->>'position')::int else t.position end
+  from (
+    select (e->>'id')::uuid as id, e as patch
+    from jsonb_array_elements(p_updates) e
+  ) u
+  where t.id = u.id
+    and t.project_id = p_project_id
+  returning t.*;
+
+  get diagnostics v_updated = row_count;
+  if v_updated < v_expected then
+    select string_agg(u->>'id', ', ') into v_missing
+    from jsonb_array_elements(p_updates) u
+    where not exists (
+      select 1 from public.project_tasks t
+      where t.id = (u->>'id')::uuid and t.project_id = p_project_id
+    );
+    raise exception 'Tasks not found: %', v_missing using errcode = 'P0002';
+  end if;
+end;
+$$;
+
+revoke execute on function public.update_project_tasks(uuid, jsonb) from public, anon, authenticated;
+grant execute on function public.update_project_tasks(uuid, jsonb) to service_role;